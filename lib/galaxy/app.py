@@ -35,6 +35,7 @@ from galaxy.managers.workflows import (
     WorkflowContentsManager,
     WorkflowsManager,
 )
+from galaxy.metadata.cache import claim_metadata_cache
 from galaxy.model.base import SharedModelMapping
 from galaxy.model.database_heartbeat import DatabaseHeartbeat
 from galaxy.model.mapping import GalaxyModelMapping
@@ -338,6 +339,20 @@ class UniverseApplication(StructuredApp, GalaxyManagerApplication):
                 time_execution=True)
             self.application_stack.register_postfork_function(self.prune_history_audit_task.start)
             self.haltables.append(("HistoryAuditTablePruneTask", self.prune_history_audit_task.shutdown))
+        if not self.config.enable_celery_tasks and self.config.disk_usage_ledger_compaction_interval > 0:
+            self.compact_disk_usage_ledger_task = IntervalTask(
+                func=lambda: galaxy.model.UserDiskUsageLedger.compact(self.model.session),
+                name="UserDiskUsageLedgerCompactTask",
+                interval=self.config.disk_usage_ledger_compaction_interval,
+                immediate_start=False,
+                time_execution=True)
+            self.application_stack.register_postfork_function(self.compact_disk_usage_ledger_task.start)
+            self.haltables.append(("UserDiskUsageLedgerCompactTask", self.compact_disk_usage_ledger_task.shutdown))
+        if self.config.metadata_cache_dir:
+            self.metadata_cache_monitor = claim_metadata_cache(self.config.metadata_cache_dir, self.config.metadata_cache_size)
+            if self.metadata_cache_monitor:
+                self.application_stack.register_postfork_function(self.metadata_cache_monitor.start)
+                self.haltables.append(("MetadataCacheMonitor", self.metadata_cache_monitor.shutdown))
         # Start the job manager
         self.application_stack.register_postfork_function(self.job_manager.start)
         # If app is not job handler but uses mule messaging.
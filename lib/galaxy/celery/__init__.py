@@ -60,16 +60,31 @@ def get_history_audit_table_prune_interval():
         return 3600
 
 
+def get_disk_usage_ledger_compaction_interval():
+    config = get_config()
+    if config:
+        return config.disk_usage_ledger_compaction_interval
+    else:
+        return 300
+
+
 broker = get_broker()
 celery_app = Celery('galaxy', broker=broker, include=['galaxy.celery.tasks'])
+beat_schedule = {}
 prune_interval = get_history_audit_table_prune_interval()
 if prune_interval > 0:
-    celery_app.conf.beat_schedule = {
-        'prune-history-audit-table': {
-            'task': 'galaxy.celery.tasks.prune_history_audit_table',
-            'schedule': prune_interval,
-        },
+    beat_schedule['prune-history-audit-table'] = {
+        'task': 'galaxy.celery.tasks.prune_history_audit_table',
+        'schedule': prune_interval,
+    }
+compaction_interval = get_disk_usage_ledger_compaction_interval()
+if compaction_interval > 0:
+    beat_schedule['compact-user-disk-usage-ledger'] = {
+        'task': 'galaxy.celery.tasks.compact_user_disk_usage_ledger',
+        'schedule': compaction_interval,
     }
+if beat_schedule:
+    celery_app.conf.beat_schedule = beat_schedule
 celery_app.conf.timezone = 'UTC'
 
 
@@ -105,3 +105,11 @@ def prune_history_audit_table(sa_session: scoped_session):
     timer = ExecutionTimer()
     model.HistoryAudit.prune(sa_session)
     log.debug(f"Successfully pruned history_audit table {timer}")
+
+
+@galaxy_task
+def compact_user_disk_usage_ledger(sa_session: scoped_session):
+    """Fold recorded disk usage changes into user disk usage."""
+    timer = ExecutionTimer()
+    model.UserDiskUsageLedger.compact(sa_session)
+    log.debug(f"Successfully compacted user_disk_usage_ledger table {timer}")
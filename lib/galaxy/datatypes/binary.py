@@ -13,8 +13,9 @@ import sys
 import tarfile
 import tempfile
 import zipfile
+from collections import OrderedDict
 from json import dumps
-from typing import Optional
+from typing import Optional, Tuple
 
 import h5py
 import numpy as np
@@ -99,6 +100,7 @@ class Ab1(Binary):
 class Idat(Binary):
     """Binary data in idat format"""
     file_ext = "idat"
+    sniff_magic = (b'IDAT',)
     edam_format = "format_2058"
     edam_data = "data_2603"
 
@@ -339,11 +341,11 @@ class _BamOrSam:
 
     def set_meta(self, dataset, overwrite=True, **kwd):
         try:
-            bam_file = pysam.AlignmentFile(dataset.file_name, mode='rb')
-            # TODO: Reference names, lengths, read_groups and headers can become very large, truncate when necessary
-            dataset.metadata.reference_names = list(bam_file.references)
-            dataset.metadata.reference_lengths = list(bam_file.lengths)
-            dataset.metadata.bam_header = dict(bam_file.header.items())
+            with pysam.AlignmentFile(dataset.file_name, mode='rb') as bam_file:
+                # TODO: Reference names, lengths, read_groups and headers can become very large, truncate when necessary
+                dataset.metadata.reference_names = list(bam_file.references)
+                dataset.metadata.reference_lengths = list(bam_file.lengths)
+                dataset.metadata.bam_header = dict(bam_file.header.items())
             dataset.metadata.read_groups = [read_group['ID'] for read_group in dataset.metadata.bam_header.get('RG', []) if 'ID' in read_group]
             dataset.metadata.sort_order = dataset.metadata.bam_header.get('HD', {}).get('SO', None)
             dataset.metadata.bam_version = dataset.metadata.bam_header.get('HD', {}).get('VN', None)
@@ -358,6 +360,7 @@ class BamNative(CompressedArchive, _BamOrSam):
     edam_format = "format_2572"
     edam_data = "data_0863"
     file_ext = "unsorted.bam"
+    sniff_magic = (b'BAM\x01',)
     sort_flag: Optional[str] = None
 
     MetadataElement(name="columns", default=12, desc="Number of columns", readonly=True, visible=False, no_value=0)
@@ -536,37 +539,71 @@ class Bam(BamNative):
     MetadataElement(name="bam_index", desc="BAM Index File", param=metadata.FileParameter, file_ext="bai", readonly=True, no_value=None, visible=False, optional=True)
     MetadataElement(name="bam_csi_index", desc="BAM CSI Index File", param=metadata.FileParameter, file_ext="bam.csi", readonly=True, no_value=None, visible=False, optional=True)
 
+    # Results of recent sorting checks, keyed on path, size and modification time,
+    # so that sniffing and grooming the same file only indexes it once.
+    _needs_grooming_cache: "OrderedDict[Tuple[str, int, int], bool]" = OrderedDict()
+    _needs_grooming_cache_size = 100
+
+    @staticmethod
+    def _index_flag_for_lengths(lengths):
+        if lengths and max(lengths) > (2 ** 29) - 1:
+            return '-c'  # csi index
+        return '-b'  # bai index
+
     def get_index_flag(self, file_name):
         """
         Return pysam flag for bai index (default) or csi index (contig size > (2**29 - 1) )
         """
-        index_flag = '-b'  # bai index
         try:
             with pysam.AlignmentFile(file_name) as alignment_file:
-                if max(alignment_file.header.lengths) > (2 ** 29) - 1:
-                    index_flag = '-c'  # csi index
+                return self._index_flag_for_lengths(alignment_file.header.lengths)
         except Exception:
             # File may not have a header, that's OK
-            pass
-        return index_flag
+            return '-b'
+
+    @staticmethod
+    def _index(index_flag, file_name, index_name):
+        if index_flag == '-b':
+            # IOError: No such file or directory: '-b' if index_flag is set to -b (pysam 0.15.4)
+            pysam.index(file_name, index_name)
+        else:
+            pysam.index(index_flag, file_name, index_name)
+
+    @staticmethod
+    def _grooming_cache_key(file_name):
+        stat = os.stat(file_name)
+        return (os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)
+
+    def _remember_needs_grooming(self, key, needs_sorting):
+        cache = Bam._needs_grooming_cache
+        cache[key] = needs_sorting
+        cache.move_to_end(key)
+        while len(cache) > self._needs_grooming_cache_size:
+            cache.popitem(last=False)
 
     def dataset_content_needs_grooming(self, file_name):
         """
         Check if file_name is a coordinate-sorted BAM file
         """
+        try:
+            key = self._grooming_cache_key(file_name)
+        except OSError:
+            key = None
+        if key in Bam._needs_grooming_cache:
+            return Bam._needs_grooming_cache[key]
         # The best way to ensure that BAM files are coordinate-sorted and indexable
         # is to actually index them.
         index_flag = self.get_index_flag(file_name)
         index_name = tempfile.NamedTemporaryFile(prefix="bam_index").name
         try:
-            # If pysam fails to index a file it will write to stderr,
-            # and this causes the set_meta script to fail. So instead
-            # we start another process and discard stderr.
-            if index_flag == '-b':
+            # If pysam fails to index a file it will write to stderr (or
+            # even exit), and this causes the set_meta script to fail. So
+            # instead we start another process and discard stderr.
+            index_args = [file_name, index_name]
+            if index_flag != '-b':
                 # IOError: No such file or directory: '-b' if index_flag is set to -b (pysam 0.15.4)
-                cmd = ['python', '-c', f"import pysam; pysam.set_verbosity(0); pysam.index('{file_name}', '{index_name}')"]
-            else:
-                cmd = ['python', '-c', f"import pysam; pysam.set_verbosity(0); pysam.index('{index_flag}', '{file_name}', '{index_name}')"]
+                index_args.insert(0, index_flag)
+            cmd = ['python', '-c', "import sys, pysam; pysam.set_verbosity(0); pysam.index(*sys.argv[1:])"] + index_args
             with open(os.devnull, 'w') as devnull:
                 subprocess.check_call(cmd, stderr=devnull, shell=False)
             needs_sorting = False
@@ -576,12 +613,26 @@ class Bam(BamNative):
             os.unlink(index_name)
         except Exception:
             pass
+        if key is not None:
+            self._remember_needs_grooming(key, needs_sorting)
         return needs_sorting
 
+    def groom_dataset_content(self, file_name):
+        super().groom_dataset_content(file_name)
+        # The file is now coordinate-sorted, no need to check it again.
+        try:
+            self._remember_needs_grooming(self._grooming_cache_key(file_name), False)
+        except OSError:
+            pass
+
     def set_meta(self, dataset, overwrite=True, **kwd):
         # These metadata values are not accessible by users, always overwrite
         super().set_meta(dataset=dataset, overwrite=overwrite, **kwd)
-        index_flag = self.get_index_flag(dataset.file_name)
+        if dataset.metadata.reference_lengths:
+            # Already read from the header, avoid opening the file again.
+            index_flag = self._index_flag_for_lengths(dataset.metadata.reference_lengths)
+        else:
+            index_flag = self.get_index_flag(dataset.file_name)
         if index_flag == '-b':
             spec_key = 'bam_index'
             index_file = dataset.metadata.bam_index
@@ -590,11 +641,7 @@ class Bam(BamNative):
             index_file = dataset.metadata.bam_csi_index
         if not index_file:
             index_file = dataset.metadata.spec[spec_key].param.new_file(dataset=dataset)
-        if index_flag == '-b':
-            # IOError: No such file or directory: '-b' if index_flag is set to -b (pysam 0.15.4)
-            pysam.index(dataset.file_name, index_file.file_name)
-        else:
-            pysam.index(index_flag, dataset.file_name, index_file.file_name)
+        self._index(index_flag, dataset.file_name, index_file.file_name)
         dataset.metadata.bam_index = index_file
 
     def sniff(self, file_name):
@@ -738,6 +785,7 @@ class BamQuerynameSorted(BamInputSorted):
 
 class CRAM(Binary):
     file_ext = "cram"
+    sniff_magic = (b'CRAM',)
     edam_format = "format_3462"
     edam_data = "data_0863"
 
@@ -800,6 +848,7 @@ class Bcf(BaseBcf):
 
     """
     file_ext = "bcf"
+    sniff_magic = (b'BCF',)
 
     MetadataElement(name="bcf_index", desc="BCF Index File", param=metadata.FileParameter, file_ext="csi", readonly=True, no_value=None, visible=False, optional=True)
 
@@ -849,6 +898,7 @@ class BcfUncompressed(BaseBcf):
     False
     """
     file_ext = "bcf_uncompressed"
+    sniff_magic = (b'BCF',)
 
     def sniff(self, filename):
         try:
@@ -874,6 +924,7 @@ class H5(Binary):
     False
     """
     file_ext = "h5"
+    sniff_magic = (b'\x89HDF\r\n\x1a\n',)
     edam_format = "format_3590"
 
     def __init__(self, **kwd):
@@ -1793,6 +1844,7 @@ class SQlite(Binary):
     MetadataElement(name="table_columns", default={}, param=DictParameter, desc="Database Table Columns", readonly=True, visible=True, no_value={})
     MetadataElement(name="table_row_count", default={}, param=DictParameter, desc="Database Table Row Count", readonly=True, visible=True, no_value={})
     file_ext = "sqlite"
+    sniff_magic = (b'SQLite format 3\x00',)
     edam_format = "format_3621"
 
     def init_meta(self, dataset, copy_from=None):
@@ -3299,6 +3351,7 @@ class JP2(Binary):
     False
     """
     file_ext = "jp2"
+    sniff_magic = (b'\x00\x00\x00\x0cjP  \r\n\x87\n',)
 
     def __init__(self, **kwd):
         super().__init__(**kwd)
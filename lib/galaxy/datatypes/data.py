@@ -2,11 +2,11 @@ import abc
 import logging
 import mimetypes
 import os
-import shutil
+import re
 import string
 import tempfile
 from inspect import isclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import webob.exc
 from markupsafe import escape
@@ -44,6 +44,8 @@ valid_strand = ['+', '-', '.']
 DOWNLOAD_FILENAME_PATTERN_DATASET = "Galaxy${hid}-[${name}].${ext}"
 DOWNLOAD_FILENAME_PATTERN_COLLECTION_ELEMENT = "Galaxy${hdca_hid}-[${hdca_name}__${element_identifier}].${ext}"
 DEFAULT_MAX_PEEK_SIZE = 1000000  # 1 MB
+# Matches the start of every blank or comment line of a block of text.
+NON_DATA_LINE_RE = re.compile(r'^[^\S\n]*(?:#|$)', re.MULTILINE)
 
 
 class DatatypeConverterNotFoundException(Exception):
@@ -145,6 +147,10 @@ class Data(metaclass=DataMeta):
     # The dataset contains binary data --> do not space_to_tab or convert newlines, etc.
     # Allow binary file uploads of this type when True.
     is_binary = True
+    # Byte strings one of which the (uncompressed) start of a file must match for
+    # this datatype's sniffer to succeed. Lets sniffing skip datatypes whose
+    # sniffers need to reopen and parse the file.
+    sniff_magic: Optional[Tuple[bytes, ...]] = None
     # Composite datatypes
     composite_type: Optional[str] = None
     composite_files: Dict[str, Any] = {}
@@ -737,17 +743,12 @@ class Data(metaclass=DataMeta):
     @staticmethod
     def merge(split_files, output_file):
         """
-            Merge files with copy.copyfileobj() will not hit the
-            max argument limitation of cat. gz and bz2 files are also working.
+            Merge files by concatenation, this will not hit the max argument
+            limitation of cat. gz and bz2 files are also working.
         """
         if not split_files:
             raise ValueError(f'Asked to merge zero files as {output_file}')
-        elif len(split_files) == 1:
-            shutil.copyfileobj(open(split_files[0], 'rb'), open(output_file, 'wb'))
-        else:
-            with open(output_file, 'wb') as fdst:
-                for fsrc in split_files:
-                    shutil.copyfileobj(open(fsrc, 'rb'), fdst)
+        util.concatenate_files(split_files, output_file)
 
     def get_visualizations(self, dataset):
         """
@@ -839,21 +840,33 @@ class Text(Data):
         """
         Count the number of lines of data in dataset,
         skipping all blank lines and comments.
+
+        The file is read in large blocks and the lines of each block are
+        counted with string operations instead of reading line by line.
         """
-        CHUNK_SIZE = 2 ** 15  # 32Kb
+        CHUNK_SIZE = 2 ** 20  # 1Mb
         data_lines = 0
         with compression_utils.get_fileobj(dataset.file_name) as in_file:
             # FIXME: Potential encoding issue can prevent the ability to iterate over lines
             # causing set_meta process to fail otherwise OK jobs. A better solution than
             # a silent try/except is desirable.
             try:
+                # Only the first non-whitespace character (if any) of a line
+                # spanning blocks decides whether it is a data line.
+                partial_line = ''
                 while True:
-                    line = in_file.readline(CHUNK_SIZE)
-                    if not line:
+                    chunk = in_file.read(CHUNK_SIZE)
+                    if not chunk:
                         break
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        data_lines += 1
+                    last_newline = chunk.rfind('\n')
+                    if last_newline == -1:
+                        partial_line = (partial_line + chunk).lstrip()[:1]
+                        continue
+                    lines = partial_line + chunk[:last_newline]
+                    data_lines += lines.count('\n') + 1 - len(NON_DATA_LINE_RE.findall(lines))
+                    partial_line = chunk[last_newline + 1:].lstrip()[:1]
+                if partial_line and partial_line != '#':
+                    data_lines += 1
             except UnicodeDecodeError:
                 log.error(f'Unable to count lines in file {dataset.file_name}')
                 data_lines = None
@@ -5,6 +5,7 @@ Provides mapping between extensions and datatypes, mime-types, etc.
 import imp
 import logging
 import os
+from inspect import isclass
 from string import Template
 from typing import Dict
 
@@ -77,6 +78,7 @@ class Registry:
         self._edam_formats_mapping = None
         self._edam_data_mapping = None
         self._converters_by_datatype = {}
+        self._conversion_destinations = {}
         # Build sites
         self.build_sites = {}
         self.display_sites = {}
@@ -385,6 +387,7 @@ class Registry:
             if use_build_sites:
                 self._load_build_sites(root)
         self.set_default_values()
+        self._reset_conversion_caches()
 
         def append_to_sniff_order():
             sniff_order_classes = {type(_) for _ in self.sniff_order}
@@ -647,6 +650,7 @@ class Registry:
                     self.log.exception(f"Error deactivating converter from ({converter_path})")
                 else:
                     self.log.exception(f"Error loading converter ({converter_path})")
+        self._reset_conversion_caches()
 
     def load_display_applications(self, app, installed_repository_dict=None, deactivate=False):
         """
@@ -863,6 +867,12 @@ class Registry:
                 tabular.CSV()
             ]
 
+    def _reset_conversion_caches(self):
+        # Replace rather than clear, so lookups in other threads see either
+        # the old or the new index.
+        self._converters_by_datatype = {}
+        self._conversion_destinations = {}
+
     def get_converters_by_datatype(self, ext):
         """Returns available converters by source type"""
         if ext not in self._converters_by_datatype:
@@ -898,24 +908,46 @@ class Registry:
             ext = dataset_or_ext
             dataset = None
 
-        if self.get_datatype_by_extension(ext) is not None and self.get_datatype_by_extension(ext).matches_any(accepted_formats):
+        direct_match, convert_exts = self._get_conversion_destinations(ext, accepted_formats)
+        if direct_match:
             return True, None, None
 
-        for convert_ext in self.get_converters_by_datatype(ext):
-            convert_ext_datatype = self.get_datatype_by_extension(convert_ext)
-            if convert_ext_datatype is None:
-                self.log.warning(f"Datatype class not found for extension '{convert_ext}', which is used as target for conversion from datatype '{dataset.ext}'")
-            elif convert_ext_datatype.matches_any(accepted_formats):
-                converted_dataset = dataset and dataset.get_converted_files_by_type(convert_ext)
-                if converted_dataset:
-                    ret_data = converted_dataset
-                elif not converter_safe:
-                    continue
-                else:
-                    ret_data = None
-                return False, convert_ext, ret_data
+        for convert_ext in convert_exts:
+            converted_dataset = dataset and dataset.get_converted_files_by_type(convert_ext)
+            if converted_dataset:
+                ret_data = converted_dataset
+            elif not converter_safe:
+                continue
+            else:
+                ret_data = None
+            return False, convert_ext, ret_data
         return False, None, None
 
+    def _get_conversion_destinations(self, ext, accepted_formats):
+        """
+        Returns (direct_match, convert_exts) for datasets of extension ``ext``,
+        where ``convert_exts`` lists the extensions (in converter order) that
+        datasets can be converted to and that match ``accepted_formats``.
+        Computed once per extension and set of accepted datatype classes.
+        """
+        accepted_classes = tuple(datatype if isclass(datatype) else datatype.__class__ for datatype in accepted_formats)
+        key = (ext, accepted_classes)
+        conversion_destinations = self._conversion_destinations
+        if key not in conversion_destinations:
+            datatype = self.get_datatype_by_extension(ext)
+            if datatype is not None and datatype.matches_any(accepted_classes):
+                conversion_destinations[key] = (True, ())
+            else:
+                convert_exts = []
+                for convert_ext in self.get_converters_by_datatype(ext):
+                    convert_ext_datatype = self.get_datatype_by_extension(convert_ext)
+                    if convert_ext_datatype is None:
+                        self.log.warning(f"Datatype class not found for extension '{convert_ext}', which is used as target for conversion from datatype '{ext}'")
+                    elif convert_ext_datatype.matches_any(accepted_classes):
+                        convert_exts.append(convert_ext)
+                conversion_destinations[key] = (False, tuple(convert_exts))
+        return conversion_destinations[key]
+
     def get_composite_extensions(self):
         return [ext for (ext, d_type) in self.datatypes_by_extension.items() if d_type.composite_type is not None]
 
@@ -125,14 +125,14 @@ class Sequence(data.Text):
         if split_params['split_mode'] == 'number_of_parts':
             # legacy basic mode - split into a specified number of parts
             parts = int(split_params['split_size'])
-            sequences_per_file = [total_sequences / parts for i in range(parts)]
+            sequences_per_file = [total_sequences // parts for i in range(parts)]
             for i in range(total_sequences % parts):
                 sequences_per_file[i] += 1
         elif split_params['split_mode'] == 'to_size':
             # loop through the sections and calculate the number of sequences
             chunk_size = int(split_params['split_size'])
             rem = total_sequences % chunk_size
-            sequences_per_file = [chunk_size for i in range(total_sequences / chunk_size)]
+            sequences_per_file = [chunk_size for i in range(total_sequences // chunk_size)]
             # TODO: Should we invest the time in a better way to handle small remainders?
             if rem > 0:
                 sequences_per_file.append(rem)
@@ -149,7 +149,7 @@ class Sequence(data.Text):
         else:
             with compression_utils.get_fileobj(input_datasets[0].file_name) as in_file:
                 total_sequences = sum(1 for line in in_file)
-            total_sequences /= 4
+            total_sequences //= 4
 
         sequences_per_file = cls.get_sequences_per_file(total_sequences, split_params)
         return cls.write_split_files(input_datasets, None, subdir_generator_function, sequences_per_file)
@@ -204,23 +204,26 @@ class Sequence(data.Text):
         raise NotImplementedError("Can't split generic sequence files")
 
     @staticmethod
-    def get_split_commands_with_toc(input_name, output_name, toc_file, start_sequence, sequence_count):
+    def get_split_commands_with_toc(input_name, output_name, toc_file, start_sequence, sequence_count, is_compressed=True):
         """
         Uses a Table of Contents dict, parsed from an FQTOC file, to come up with a set of
-        shell commands that will extract the parts necessary
+        shell commands that will extract the parts necessary. Sections of compressed
+        files are gzip members, sections of uncompressed files are copied as is.
         >>> three_sections=[dict(start=0, end=74, sequences=10), dict(start=74, end=148, sequences=10), dict(start=148, end=148+76, sequences=10)]
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=0, sequence_count=10)
-        ['dd bs=1 skip=0 count=74 if=./input.gz 2> /dev/null >> ./output.gz']
+        ['tail -c +1 ./input.gz 2> /dev/null | head -c 74 >> ./output.gz']
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=1, sequence_count=5)
-        ['(dd bs=1 skip=0 count=74 if=./input.gz 2> /dev/null )| zcat | ( tail -n +5 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
+        ['(tail -c +1 ./input.gz 2> /dev/null | head -c 74 )| zcat | ( tail -n +5 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=0, sequence_count=20)
-        ['dd bs=1 skip=0 count=148 if=./input.gz 2> /dev/null >> ./output.gz']
+        ['tail -c +1 ./input.gz 2> /dev/null | head -c 148 >> ./output.gz']
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=5, sequence_count=10)
-        ['(dd bs=1 skip=0 count=74 if=./input.gz 2> /dev/null )| zcat | ( tail -n +21 2> /dev/null) | head -20 | gzip -c >> ./output.gz', '(dd bs=1 skip=74 count=74 if=./input.gz 2> /dev/null )| zcat | ( tail -n +1 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
+        ['(tail -c +1 ./input.gz 2> /dev/null | head -c 74 )| zcat | ( tail -n +21 2> /dev/null) | head -20 | gzip -c >> ./output.gz', '(tail -c +75 ./input.gz 2> /dev/null | head -c 74 )| zcat | ( tail -n +1 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=10, sequence_count=10)
-        ['dd bs=1 skip=74 count=74 if=./input.gz 2> /dev/null >> ./output.gz']
+        ['tail -c +75 ./input.gz 2> /dev/null | head -c 74 >> ./output.gz']
         >>> Sequence.get_split_commands_with_toc('./input.gz', './output.gz', dict(sections=three_sections), start_sequence=5, sequence_count=20)
-        ['(dd bs=1 skip=0 count=74 if=./input.gz 2> /dev/null )| zcat | ( tail -n +21 2> /dev/null) | head -20 | gzip -c >> ./output.gz', 'dd bs=1 skip=74 count=74 if=./input.gz 2> /dev/null >> ./output.gz', '(dd bs=1 skip=148 count=76 if=./input.gz 2> /dev/null )| zcat | ( tail -n +1 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
+        ['(tail -c +1 ./input.gz 2> /dev/null | head -c 74 )| zcat | ( tail -n +21 2> /dev/null) | head -20 | gzip -c >> ./output.gz', 'tail -c +75 ./input.gz 2> /dev/null | head -c 74 >> ./output.gz', '(tail -c +149 ./input.gz 2> /dev/null | head -c 76 )| zcat | ( tail -n +1 2> /dev/null) | head -20 | gzip -c >> ./output.gz']
+        >>> Sequence.get_split_commands_with_toc('./input.fastq', './output.fastq', dict(sections=three_sections), start_sequence=5, sequence_count=10, is_compressed=False)
+        ['(tail -c +1 ./input.fastq 2> /dev/null | head -c 74 )| ( tail -n +21 2> /dev/null) | head -20 >> ./output.fastq', '(tail -c +75 ./input.fastq 2> /dev/null | head -c 74 )| ( tail -n +1 2> /dev/null) | head -20 >> ./output.fastq']
         """
         sections = toc_file['sections']
         result = []
@@ -238,7 +241,9 @@ class Sequence(data.Text):
         # can be copied verbatim (without decompressing)
         start_chunk = int(-1)
         end_chunk = int(-1)
-        copy_chunk_cmd = 'dd bs=1 skip=%s count=%s if=%s 2> /dev/null >> %s'
+        # tail seeks straight to the start offset of regular files and both
+        # ends of the pipe move large blocks, unlike a dd with bs=1.
+        copy_chunk_cmd = 'tail -c +%s %s 2> /dev/null | head -c %s >> %s'
 
         while sequence_count > 0 and i < len(sections):
             # we need to extract partial data. So, find the byte offsets of the chunks that contain the data we need
@@ -251,11 +256,15 @@ class Sequence(data.Text):
             end_copy = int(sections[i]['end'])
             if sequences_to_extract < sequences:
                 if start_chunk > -1:
-                    result.append(copy_chunk_cmd % (start_chunk, end_chunk - start_chunk, input_name, output_name))
+                    result.append(copy_chunk_cmd % (start_chunk + 1, input_name, end_chunk - start_chunk, output_name))
                     start_chunk = -1
                 # extract, unzip, trim, recompress
-                result.append('(dd bs=1 skip=%s count=%s if=%s 2> /dev/null )| zcat | ( tail -n +%s 2> /dev/null) | head -%s | gzip -c >> %s' %
-                              (start_copy, end_copy - start_copy, input_name, skip_sequences * 4 + 1, sequences_to_extract * 4, output_name))
+                if is_compressed:
+                    extract_section_cmd = '(tail -c +%s %s 2> /dev/null | head -c %s )| zcat | ( tail -n +%s 2> /dev/null) | head -%s | gzip -c >> %s'
+                else:
+                    extract_section_cmd = '(tail -c +%s %s 2> /dev/null | head -c %s )| ( tail -n +%s 2> /dev/null) | head -%s >> %s'
+                result.append(extract_section_cmd %
+                              (start_copy + 1, input_name, end_copy - start_copy, skip_sequences * 4 + 1, sequences_to_extract * 4, output_name))
             else:  # whole section - add it to the start_chunk/end_chunk accumulator
                 if start_chunk == -1:
                     start_chunk = start_copy
@@ -265,7 +274,7 @@ class Sequence(data.Text):
             current_sequence += sequences
             i += 1
         if start_chunk > -1:
-            result.append(copy_chunk_cmd % (start_chunk, end_chunk - start_chunk, input_name, output_name))
+            result.append(copy_chunk_cmd % (start_chunk + 1, input_name, end_chunk - start_chunk, output_name))
 
         if sequence_count > 0:
             raise Exception(f'{sequence_count} sequences not found in file')
@@ -643,11 +652,20 @@ class BaseFastq(Sequence):
     edam_format = "format_1930"
     file_ext = "fastq"
     bases_regexp = re.compile(r"^[NGTAC 0123\.]*$", re.IGNORECASE)
+    # Number of records per section of the sequence_index.
+    sequence_index_interval = 100000
+
+    MetadataElement(name="sequence_index", desc="FASTQ record offsets (FQTOC)", param=metadata.FileParameter, file_ext="fqtoc", readonly=True, no_value=None, visible=False, optional=True)
 
     def set_meta(self, dataset, **kwd):
         """
         Set the number of sequences and the number of data lines
-        in dataset.
+        in dataset. For uncompressed files with more than
+        `sequence_index_interval` sequences, the byte offsets of every
+        `sequence_index_interval`-th record are stored in the
+        `sequence_index` metadata file (in FQTOC format). Record
+        boundaries are taken from strict 4 line records, the index is only
+        written if every record has exactly 4 lines.
         FIXME: This does not properly handle line wrapping
         """
         if self.max_optional_metadata_filesize >= 0 and dataset.get_size() > self.max_optional_metadata_filesize:
@@ -657,15 +675,29 @@ class BaseFastq(Sequence):
         data_lines = 0
         sequences = 0
         seq_counter = 0     # blocks should be 4 lines long
-        with compression_utils.get_fileobj(dataset.file_name) as in_file:
+        lines_per_section = 4 * self.sequence_index_interval
+        sections = []
+        section_start = 0
+        offset = 0
+        compressed_format, in_file = compression_utils.get_fileobj_raw(dataset.file_name, 'rb')
+        with in_file:
             for line in in_file:
+                line_offset = offset
+                offset += len(line)
                 line = line.strip()
-                if line and line.startswith('#') and not data_lines:
+                if line and line.startswith(b'#') and not data_lines:
                     # We don't count comment lines for sequence data types
                     continue
+                if not data_lines:
+                    section_start = line_offset
                 seq_counter += 1
                 data_lines += 1
-                if line and line.startswith('@'):
+                if data_lines % lines_per_section == 0:
+                    # quality lines may start with '@' as well, so sections
+                    # end after every lines_per_section lines (as in fastq_to_fqtoc)
+                    sections.append(dict(start=section_start, end=offset, sequences=self.sequence_index_interval))
+                    section_start = offset
+                if line and line.startswith(b'@'):
                     if seq_counter >= 4:
                         # count previous block
                         # blocks should be 4 lines long
@@ -676,6 +708,17 @@ class BaseFastq(Sequence):
                 sequences += 1
             dataset.metadata.data_lines = data_lines
             dataset.metadata.sequences = sequences
+        if data_lines % lines_per_section:
+            sections.append(dict(start=section_start, end=offset, sequences=(data_lines % lines_per_section) // 4))
+        if compressed_format is None and len(sections) > 1 and data_lines == 4 * sequences:
+            index_file = dataset.metadata.sequence_index
+            if not index_file:
+                index_file = dataset.metadata.spec['sequence_index'].param.new_file(dataset=dataset)
+            with open(index_file.file_name, 'w') as fh:
+                json.dump(dict(sections=sections), fh)
+            dataset.metadata.sequence_index = index_file
+        else:
+            dataset.metadata.sequence_index = None
 
     def sniff_prefix(self, file_prefix):
         """
@@ -754,6 +797,9 @@ class BaseFastq(Sequence):
                 fqtoc_file = tmp_ds.get_converted_files_by_type('fqtoc')
                 tmp_ds = tmp_ds.copied_from_library_dataset_dataset_association
 
+            if fqtoc_file is None:
+                # Record offsets written while setting metadata.
+                fqtoc_file = ds.metadata.sequence_index
             if fqtoc_file is not None:
                 toc_file_datasets.append(fqtoc_file)
 
@@ -777,7 +823,7 @@ class BaseFastq(Sequence):
         if 'toc_file' in args:
             with open(args['toc_file']) as f:
                 toc_file = json.load(f)
-            commands = Sequence.get_split_commands_with_toc(input_name, output_name, toc_file, start_sequence, sequence_count)
+            commands = Sequence.get_split_commands_with_toc(input_name, output_name, toc_file, start_sequence, sequence_count, is_compressed=is_gzip(input_name))
         else:
             commands = Sequence.get_split_commands_sequential(is_gzip(input_name), input_name, output_name, start_sequence, sequence_count)
         for cmd in commands:
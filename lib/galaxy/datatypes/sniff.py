@@ -479,6 +479,11 @@ def run_sniffers_raw(filename_or_file_prefix, sniff_order, is_binary=False):
         successfully discovered.
         """
         try:
+            sniff_magic = getattr(datatype, "sniff_magic", None)
+            if sniff_magic and not file_prefix.startswith_bytes(sniff_magic):
+                # Cheap rejection without running the sniffer, which may need
+                # to reopen and parse the whole file.
+                continue
             if hasattr(datatype, "sniff_prefix"):
                 datatype_compressed = getattr(datatype, "compressed", False)
                 if datatype_compressed and not file_prefix.compressed_format:
@@ -543,6 +548,7 @@ class FilePrefix:
         self.contents_header = contents_header
         self.contents_header_bytes = contents_header_bytes
         self._file_size = None
+        self._lines = None
 
     @property
     def file_size(self):
@@ -557,17 +563,26 @@ class FilePrefix:
         return rval
 
     def startswith(self, prefix):
-        return self.string_io().read(len(prefix)) == prefix
+        if self.non_utf8_error is not None:
+            raise self.non_utf8_error
+        return self.contents_header.startswith(prefix)
+
+    def lines(self):
+        """Return the complete lines of the prefix.
+
+        The prefix is split once and the result shared by every sniffer run
+        against this FilePrefix.
+        """
+        if self._lines is None:
+            lines = self.string_io().readlines()
+            if lines and self.truncated and not lines[-1].endswith(("\n", "\r")):
+                # Drop the last line if it was truncated when reading it in.
+                lines.pop()
+            self._lines = lines
+        return self._lines
 
     def line_iterator(self):
-        s = self.string_io()
-        s_len = len(s.getvalue())
-        for line in s:
-            if line.endswith("\n") or line.endswith("\r"):
-                yield line
-            elif s.tell() == s_len and not self.truncated:
-                # At the end, return the last line if it wasn't truncated when reading it in.
-                yield line
+        yield from self.lines()
 
     # Convenience wrappers around contents_header, shielding contents_header means we can
     # potentially do a better job lazy loading this data later on.
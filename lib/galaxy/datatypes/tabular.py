@@ -34,6 +34,11 @@ from . import dataproviders
 
 log = logging.getLogger(__name__)
 
+# Leading bytes of the compressed formats get_fileobj() can transparently read.
+COMPRESSED_MAGIC = (b'\x1f\x8b', b'BZh', b'PK\x03\x04')
+# Size of the extra reads used to complete the last line of a chunk.
+CHUNK_LINE_READ_SIZE = 4096
+
 
 @dataproviders.decorators.has_dataproviders
 class TabularData(data.Text):
@@ -71,20 +76,47 @@ class TabularData(data.Text):
             return False
 
     def get_chunk(self, trans, dataset, offset=0, ck_size=None):
-        with compression_utils.get_fileobj(dataset.file_name) as f:
-            f.seek(offset)
-            ck_data = f.read(ck_size or trans.app.config.display_chunk_size)
-            if ck_data and ck_data[-1] != '\n':
-                cursor = f.read(1)
-                while cursor and cursor != '\n':
-                    ck_data += cursor
+        ck_size = ck_size or trans.app.config.display_chunk_size
+        ck_data = self._get_chunk_range(dataset, offset, ck_size)
+        if ck_data is not None:
+            last_read = offset + len(ck_data)
+        else:
+            with compression_utils.get_fileobj(dataset.file_name) as f:
+                f.seek(offset)
+                ck_data = f.read(ck_size)
+                if ck_data and ck_data[-1] != '\n':
                     cursor = f.read(1)
-            last_read = f.tell()
+                    while cursor and cursor != '\n':
+                        ck_data += cursor
+                        cursor = f.read(1)
+                last_read = f.tell()
         return dumps({'ck_data': util.unicodify(ck_data),
                       'offset': last_read,
                       'data_line_offset': self.data_line_offset,
                       })
 
+    def _get_chunk_range(self, dataset, offset, ck_size):
+        """
+        Read a chunk of an uncompressed dataset through the object store,
+        extended to the end of its last line, so that only the requested
+        bytes are fetched. Return None if the dataset is compressed.
+        """
+        object_store = getattr(dataset.dataset, 'object_store', None)
+        if object_store is None or dataset.dataset.external_filename:
+            return None
+        if object_store.get_data(dataset.dataset, count=4, binary=True).startswith(COMPRESSED_MAGIC):
+            return None
+        ck_data = object_store.get_data(dataset.dataset, start=offset, count=ck_size, binary=True)
+        while ck_data and not ck_data.endswith(b'\n'):
+            more = object_store.get_data(dataset.dataset, start=offset + len(ck_data), count=CHUNK_LINE_READ_SIZE, binary=True)
+            if not more:
+                break
+            newline = more.find(b'\n')
+            if newline != -1:
+                more = more[:newline + 1]
+            ck_data += more
+        return ck_data
+
     def display_data(self, trans, dataset, preview=False, filename=None, to_ext=None, offset=None, ck_size=None, **kwd):
         preview = util.string_as_bool(preview)
         if offset is not None:
@@ -383,6 +415,9 @@ class Tabular(TabularData):
                             for field_count, field in enumerate(fields):
                                 if field_count >= len(column_types):  # found a previously unknown column, we append None
                                     column_types.append(None)
+                                elif column_types[field_count] == default_column_type:
+                                    # Nothing overrules the default type, no need to guess
+                                    continue
                                 column_type = guess_column_type(field)
                                 if type_overrules_type(column_type, column_types[field_count]):
                                     column_types[field_count] = column_type
@@ -17,6 +17,7 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from concurrent.futures import ThreadPoolExecutor
 from json import loads
 from typing import Any, Dict, List
 
@@ -70,6 +71,7 @@ from galaxy.util import (
     parse_xml_string,
     RWXRWXRWX,
     safe_makedirs,
+    string_as_bool,
     unicodify
 )
 from galaxy.util.bunch import Bunch
@@ -132,6 +134,21 @@ class JobToolConfiguration(Bunch):
         return self.get("resources", None)
 
 
+def _touch_output_file(dataset_path):
+    """
+    Stat and chown the file of an output dataset to short circuit NFS
+    attribute caching. Return the dataset id and the error if the file is not
+    accessible (yet).
+    """
+    dataset_id, path = dataset_path
+    try:
+        os.stat(path)
+        os.chown(path, os.getuid(), -1)
+    except OSError as e:
+        return dataset_id, e
+    return dataset_id, None
+
+
 def config_exception(e, file):
     abs_path = os.path.abspath(file)
     message = f'Problem parsing the XML in file {abs_path}, '
@@ -297,6 +314,8 @@ class JobConfiguration(ConfiguresHandlers):
 
     DEFAULT_HANDLER_READY_WINDOW_SIZE = 100
 
+    DEFAULT_HANDLER_READINESS_FULL_CHECK_INTERVAL = 60
+
     JOB_RESOURCE_CONDITIONAL_XML = """<conditional name="__job_resource">
         <param name="__job_resource__select" type="select" label="Job Resource Parameters">
             <option value="no">Use default job resource parameters</option>
@@ -319,6 +338,8 @@ class JobConfiguration(ConfiguresHandlers):
         self.handler_assignment_methods_configured = False
         self.handler_max_grab = None
         self.handler_ready_window_size = None
+        self.handler_incremental_readiness = False
+        self.handler_readiness_full_check_interval = None
         self.destinations = {}
         self.default_destination_id = None
         self.tools = {}
@@ -411,6 +432,9 @@ class JobConfiguration(ConfiguresHandlers):
             log.info("Tag [%s] handlers: %s", tag, ', '.join(handlers))
         self.handler_ready_window_size = int(handling_config_dict.get(
             'ready_window_size', JobConfiguration.DEFAULT_HANDLER_READY_WINDOW_SIZE))
+        self.handler_incremental_readiness = string_as_bool(handling_config_dict.get('incremental_readiness', False))
+        self.handler_readiness_full_check_interval = int(handling_config_dict.get(
+            'readiness_full_check_interval', JobConfiguration.DEFAULT_HANDLER_READINESS_FULL_CHECK_INTERVAL))
 
         # Parse environments
         job_metrics = self.app.job_metrics
@@ -580,6 +604,7 @@ class JobConfiguration(ConfiguresHandlers):
         else:
             self.app.application_stack.init_job_handling(self)
         self.handler_ready_window_size = JobConfiguration.DEFAULT_HANDLER_READY_WINDOW_SIZE
+        self.handler_readiness_full_check_interval = JobConfiguration.DEFAULT_HANDLER_READINESS_FULL_CHECK_INTERVAL
         # Set the destination
         self.default_destination_id = 'local'
         self.destinations['local'] = [JobDestination(id='local', runner='local')]
@@ -1530,21 +1555,55 @@ class JobWrapper(HasResourceParameters):
         job.object_store_id = object_store_populator.object_store_id
         self._setup_working_directory(job=job)
 
+    def _wait_for_output_datasets(self, datasets):
+        """
+        Wait for the files backing the given datasets to become accessible.
+        Paths are resolved through the object store in the calling thread,
+        then up to ``finish_io_workers`` (a destination parameter, defaults
+        to 1) files are checked concurrently, so that jobs with many outputs
+        on slow shared file systems don't wait for each output in turn.
+        """
+        pending = [d for d in datasets if not d.purged and d.external_filename is None]
+        finish_io_workers = int(self.get_destination_configuration("finish_io_workers", 1))
+        executor = None
+        if finish_io_workers > 1 and len(pending) > 1:
+            executor = ThreadPoolExecutor(max_workers=finish_io_workers)
+        try:
+            for trynum in range(self.app.config.retry_job_output_collection):
+                if trynum:
+                    time.sleep(2)
+                # Model objects and the object store are not thread-safe, only
+                # (dataset id, path) pairs are handed to the worker threads.
+                paths = []
+                failed = []
+                for dataset in pending:
+                    try:
+                        paths.append((dataset.id, dataset.file_name))
+                    except ObjectNotFound as e:
+                        log.warning('Error accessing dataset with ID %i, will retry: %s', dataset.id, unicodify(e))
+                        failed.append(dataset)
+                errors = (executor.map if executor else map)(_touch_output_file, paths)
+                failed_ids = set()
+                for dataset_id, error in errors:
+                    if error:
+                        log.warning('Error accessing dataset with ID %i, will retry: %s', dataset_id, unicodify(error))
+                        failed_ids.add(dataset_id)
+                pending = failed + [d for d in pending if d.id in failed_ids]
+                if not pending:
+                    break
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def _finish_stage_timer(self, stage):
+        return self.app.execution_timer_factory.get_timer(
+            f'internals.galaxy.jobs.job_wrapper_finish.{stage}',
+            f'job_wrapper.finish stage {stage} for job ${{job_id}} executed'
+        )
+
     def _finish_dataset(self, output_name, dataset, job, context, final_job_state, remote_metadata_directory):
         implicit_collection_jobs = job.implicit_collection_jobs_association
         purged = dataset.dataset.purged
-        if not purged and dataset.dataset.external_filename is None:
-            trynum = 0
-            while trynum < self.app.config.retry_job_output_collection:
-                try:
-                    # Attempt to short circuit NFS attribute caching
-                    os.stat(dataset.dataset.file_name)
-                    os.chown(dataset.dataset.file_name, os.getuid(), -1)
-                    trynum = self.app.config.retry_job_output_collection
-                except (OSError, ObjectNotFound) as e:
-                    trynum += 1
-                    log.warning('Error accessing dataset with ID %i, will retry: %s', dataset.dataset.id, unicodify(e))
-                    time.sleep(2)
         if getattr(dataset, "hidden_beneath_collection_instance", None):
             dataset.visible = False
         dataset.blurb = 'done'
@@ -1679,6 +1738,7 @@ class JobWrapper(HasResourceParameters):
         else:
             final_job_state = job.states.ERROR
 
+        stage_timer = self._finish_stage_timer('collect_outputs')
         outputs_to_working_directory = util.asbool(self.get_destination_configuration("outputs_to_working_directory", False))
         if not extended_metadata and outputs_to_working_directory and not self.__link_file_check():
             # output will be moved by job if metadata_strategy is extended_metadata, so skip moving here
@@ -1723,6 +1783,7 @@ class JobWrapper(HasResourceParameters):
 
         if not extended_metadata:
             # importing metadata will discover outputs if extended metadata
+            self._wait_for_output_datasets([dataset_assoc.dataset.dataset for dataset_assoc in output_dataset_associations])
             for dataset_assoc in output_dataset_associations:
                 context = self.get_dataset_finish_context(job_context, dataset_assoc)
                 # should this also be checking library associations? - can a library item be added from a history before the job has ended? -
@@ -1737,8 +1798,12 @@ class JobWrapper(HasResourceParameters):
                     )
                 if not final_job_state == job.states.ERROR:
                     dataset_assoc.dataset.dataset.state = model.Dataset.states.OK
+            log.debug(stage_timer.to_str(job_id=self.job_id))
+            stage_timer = self._finish_stage_timer('discover_outputs')
             self.discover_outputs(job, inp_data, out_data, out_collections, final_job_state=final_job_state)
+        log.debug(stage_timer.to_str(job_id=self.job_id))
 
+        stage_timer = self._finish_stage_timer('post_job_actions')
         if job.states.ERROR == final_job_state:
             for dataset_assoc in output_dataset_associations:
                 log.debug("(%s) setting dataset %s state to ERROR", job.id, dataset_assoc.dataset.dataset.id)
@@ -1757,7 +1822,9 @@ class JobWrapper(HasResourceParameters):
         if tool_exit_code is not None:
             job.exit_code = tool_exit_code
         # custom post process setup
+        log.debug(stage_timer.to_str(job_id=self.job_id))
 
+        stage_timer = self._finish_stage_timer('update_disk_usage')
         collected_bytes = 0
         # Once datasets are collected, set the total dataset size (includes extra files)
         for dataset_assoc in job.output_datasets:
@@ -1766,9 +1833,11 @@ class JobWrapper(HasResourceParameters):
 
         if job.user:
             job.user.adjust_total_disk_usage(collected_bytes)
+        log.debug(stage_timer.to_str(job_id=self.job_id))
 
         # Certain tools require tasks to be completed after job execution
         # ( this used to be performed in the "exec_after_process" hook, but hooks are deprecated ).
+        stage_timer = self._finish_stage_timer('exec_after_process')
         param_dict = self.get_param_dict(job)
         try:
             self.tool.exec_after_process(self.app, inp_data, out_data, param_dict, job=job, final_job_state=final_job_state)
@@ -1782,6 +1851,7 @@ class JobWrapper(HasResourceParameters):
                             tool=self.tool, stdout=job.stdout, stderr=job.stderr)
 
         self._fix_output_permissions()
+        log.debug(stage_timer.to_str(job_id=self.job_id))
 
         # Empirically, we need to update job.user and
         # job.workflow_invocation_step.workflow_invocation in separate
@@ -1791,6 +1861,7 @@ class JobWrapper(HasResourceParameters):
         # differently and deadlocks can occur (one thread updates user and
         # waits on invocation and the other updates invocation and waits on
         # user).
+        stage_timer = self._finish_stage_timer('persist')
         self.sa_session.flush()
 
         # Finally set the job state.  This should only happen *after* all
@@ -1800,6 +1871,7 @@ class JobWrapper(HasResourceParameters):
             # If job was composed of tasks, don't attempt to recollect statistics
             self._collect_metrics(job, job_metrics_directory)
         self.sa_session.flush()
+        log.debug(stage_timer.to_str(job_id=self.job_id))
         if job.state == job.states.ERROR:
             self._report_error()
         cleanup_job = self.cleanup_job
@@ -2139,6 +2211,7 @@ class JobWrapper(HasResourceParameters):
                                                                         tool=self.tool,
                                                                         job=job,
                                                                         max_metadata_value_size=self.app.config.max_metadata_value_size,
+                                                                        metadata_cache_dir=self.app.config.metadata_cache_dir,
                                                                         validate_outputs=self.validate_outputs,
                                                                         link_data_only=self.__link_file_check(),
                                                                         **kwds)
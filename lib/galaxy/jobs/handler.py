@@ -39,6 +39,22 @@ log = get_logger(__name__)
 # States for running a job. These are NOT the same as data states
 JOB_WAIT, JOB_ERROR, JOB_INPUT_ERROR, JOB_INPUT_DELETED, JOB_READY, JOB_DELETED, JOB_ADMIN_DELETED, JOB_USER_OVER_QUOTA, JOB_USER_OVER_TOTAL_WALLTIME = 'wait', 'error', 'input_error', 'input_deleted', 'ready', 'deleted', 'admin_deleted', 'user_over_quota', 'user_over_total_walltime'
 DEFAULT_JOB_PUT_FAILURE_MESSAGE = 'Unable to run job due to a misconfiguration of the Galaxy job running system.  Please contact a site administrator.'
+# When checking job readiness incrementally, look back this far beyond the previous check to allow for clock skew
+# between Galaxy processes and for transactions that committed after the previous check started.
+READINESS_CHANGE_FEED_SLACK = datetime.timedelta(seconds=30)
+# Incremental readiness checks fall back to a full check rather than filter on more unchanged job ids than this
+READINESS_MAX_RECHECK_JOBS = 1000
+
+
+def ready_window_saturated(jobs, ready_window_size):
+    """
+    Return True if any user has ``ready_window_size`` jobs in ``jobs``, i.e. more of their ready jobs may have been
+    left out of the window.
+    """
+    jobs_per_user = defaultdict(int)
+    for job in jobs:
+        jobs_per_user[job.user_id] += 1
+    return any(count >= ready_window_size for count in jobs_per_user.values())
 
 
 class JobHandlerI:
@@ -181,6 +197,13 @@ class JobHandlerQueue(Monitors):
         self.waiting_jobs = []
         # Contains wrappers of jobs that are limited or ready (so they aren't created unnecessarily/multiple times)
         self.job_wrappers = {}
+        # Time of the last readiness check, number of incremental checks since the last full check and ids of jobs
+        # that were deferred or failed to be checked and have to be checked again, only used if incremental readiness
+        # checking is enabled
+        self.readiness_checked_at = None
+        self.readiness_checks_since_full_check = 0
+        self.readiness_window_saturated = False
+        self.readiness_recheck_job_ids = set()
         name = "JobHandlerQueue.monitor_thread"
         self._init_monitor_thread(name, target=self.__monitor, config=app.config)
         self.job_grabber = None
@@ -338,44 +361,7 @@ class JobHandlerQueue(Monitors):
         if self.track_jobs_in_database:
             # Clear the session so we get fresh states for job and all datasets
             self.sa_session.expunge_all()
-            # Fetch all new jobs
-            hda_not_ready = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
-                .join(model.JobToInputDatasetAssociation) \
-                .join(model.HistoryDatasetAssociation) \
-                .join(model.Dataset) \
-                .filter(and_(model.Job.state == model.Job.states.NEW,
-                             model.Dataset.state.in_(model.Dataset.non_ready_states))).subquery()
-            ldda_not_ready = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
-                .join(model.JobToInputLibraryDatasetAssociation) \
-                .join(model.LibraryDatasetDatasetAssociation) \
-                .join(model.Dataset) \
-                .filter(and_(model.Job.state == model.Job.states.NEW,
-                             model.Dataset.state.in_(model.Dataset.non_ready_states))).subquery()
-            rank = func.rank().over(partition_by=model.Job.table.c.user_id,
-                                    order_by=model.Job.table.c.id).label('rank')
-            job_filter_conditions = (
-                (model.Job.state == model.Job.states.NEW),
-                (model.Job.handler == self.app.config.server_name),
-                ~model.Job.table.c.id.in_(hda_not_ready),
-                ~model.Job.table.c.id.in_(ldda_not_ready))
-            if self.app.config.user_activation_on:
-                job_filter_conditions = job_filter_conditions + (
-                    or_((model.Job.user_id == null()), (model.User.active == true())),)
-            if self.sa_session.bind.name == 'sqlite':
-                query_objects = (model.Job,)
-            else:
-                query_objects = (model.Job, rank)
-            ready_query = self.sa_session.query(*query_objects).enable_eagerloads(False) \
-                .outerjoin(model.User) \
-                .filter(and_(*job_filter_conditions)) \
-                .order_by(model.Job.id)
-            if self.sa_session.bind.name == 'sqlite':
-                jobs_to_check = ready_query.all()
-            else:
-                ranked = ready_query.subquery()
-                jobs_to_check = self.sa_session.query(model.Job) \
-                    .join(ranked, model.Job.id == ranked.c.id) \
-                    .filter(ranked.c.rank <= self.app.job_config.handler_ready_window_size).all()
+            jobs_to_check = self._fetch_new_jobs()
             # Filter jobs with invalid input states
             jobs_to_check = self.__filter_jobs_with_invalid_input_states(jobs_to_check)
             # Fetch all "resubmit" jobs
@@ -412,6 +398,7 @@ class JobHandlerQueue(Monitors):
         # Iterate over new and waiting jobs and look for any that are
         # ready to run
         new_waiting_jobs = []
+        errored_jobs = []
         for job in jobs_to_check:
             try:
                 # Check the job's dependencies, requeue if they're not done.
@@ -464,14 +451,18 @@ class JobHandlerQueue(Monitors):
                     self.sa_session.add(job)
                 elif job_state == JOB_ERROR:
                     log.error("(%d) Error checking job readiness" % job.id)
+                    errored_jobs.append(job.id)
                 else:
                     log.error("(%d) Job in unknown state '%s'" % (job.id, job_state))
                     new_waiting_jobs.append(job.id)
             except Exception:
                 log.exception("failure running job %d", job.id)
+                errored_jobs.append(job.id)
         # Update the waiting list
         if not self.track_jobs_in_database:
             self.waiting_jobs = new_waiting_jobs
+        # Jobs that are still new but did not change will not show up in the next incremental readiness check
+        self.readiness_recheck_job_ids = set(new_waiting_jobs).union(errored_jobs)
         # Remove cached wrappers for any jobs that are no longer being tracked
         for id in set(self.job_wrappers.keys()) - set(new_waiting_jobs):
             del self.job_wrappers[id]
@@ -480,6 +471,100 @@ class JobHandlerQueue(Monitors):
         # Done with the session
         self.sa_session.remove()
 
+    def _fetch_new_jobs(self):
+        """
+        Fetch the new jobs assigned to this handler whose inputs are all ready, up to ``handler_ready_window_size`` jobs
+        per user. If incremental readiness checking is enabled only jobs that may have become ready since the previous
+        fetch are considered.
+        """
+        hda_not_ready = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+            .join(model.JobToInputDatasetAssociation) \
+            .join(model.HistoryDatasetAssociation) \
+            .join(model.Dataset) \
+            .filter(and_(model.Job.state == model.Job.states.NEW,
+                         model.Dataset.state.in_(model.Dataset.non_ready_states))).subquery()
+        ldda_not_ready = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+            .join(model.JobToInputLibraryDatasetAssociation) \
+            .join(model.LibraryDatasetDatasetAssociation) \
+            .join(model.Dataset) \
+            .filter(and_(model.Job.state == model.Job.states.NEW,
+                         model.Dataset.state.in_(model.Dataset.non_ready_states))).subquery()
+        rank = func.rank().over(partition_by=model.Job.table.c.user_id,
+                                order_by=model.Job.table.c.id).label('rank')
+        job_filter_conditions = (
+            (model.Job.state == model.Job.states.NEW),
+            (model.Job.handler == self.app.config.server_name),
+            ~model.Job.table.c.id.in_(hda_not_ready),
+            ~model.Job.table.c.id.in_(ldda_not_ready))
+        readiness_check_started = datetime.datetime.utcnow()
+        changed_jobs = self.__changed_job_ids_subquery()
+        if changed_jobs is not None:
+            job_filter_conditions = job_filter_conditions + (model.Job.table.c.id.in_(changed_jobs),)
+        if self.app.config.user_activation_on:
+            job_filter_conditions = job_filter_conditions + (
+                or_((model.Job.user_id == null()), (model.User.active == true())),)
+        if self.sa_session.bind.name == 'sqlite':
+            query_objects = (model.Job,)
+        else:
+            query_objects = (model.Job, rank)
+        ready_query = self.sa_session.query(*query_objects).enable_eagerloads(False) \
+            .outerjoin(model.User) \
+            .filter(and_(*job_filter_conditions)) \
+            .order_by(model.Job.id)
+        if self.sa_session.bind.name == 'sqlite':
+            jobs_to_check = ready_query.all()
+            self.readiness_window_saturated = False
+        else:
+            ready_window_size = self.app.job_config.handler_ready_window_size
+            ranked = ready_query.subquery()
+            jobs_to_check = self.sa_session.query(model.Job) \
+                .join(ranked, model.Job.id == ranked.c.id) \
+                .filter(ranked.c.rank <= ready_window_size).all()
+            self.readiness_window_saturated = ready_window_saturated(jobs_to_check, ready_window_size)
+        self.readiness_checked_at = readiness_check_started
+        return jobs_to_check
+
+    def __changed_job_ids_subquery(self):
+        """
+        If incremental readiness checking is enabled, return a subquery selecting the ids of new jobs assigned to this
+        handler that may have become ready since the last check: jobs that were created or (re)assigned, jobs with an
+        input dataset that changed state, and jobs that were deferred (e.g. by limits) or failed to be checked in the
+        last check. Returns ``None`` if all new jobs should be checked, which is always the case when incremental
+        checking is disabled, on the first check, after a check that filled the ready window (jobs cut off by the
+        window would not show up as changed again), after a check that left more than ``READINESS_MAX_RECHECK_JOBS``
+        jobs to check again, and every ``readiness_full_check_interval`` checks thereafter to catch changes not
+        reflected in ``update_time``.
+        """
+        if not self.app.job_config.handler_incremental_readiness or self.readiness_checked_at is None:
+            return None
+        full_check_interval = self.app.job_config.handler_readiness_full_check_interval
+        if self.readiness_window_saturated or len(self.readiness_recheck_job_ids) > READINESS_MAX_RECHECK_JOBS or \
+                (full_check_interval and self.readiness_checks_since_full_check >= full_check_interval):
+            self.readiness_checks_since_full_check = 0
+            return None
+        self.readiness_checks_since_full_check += 1
+        since = self.readiness_checked_at - READINESS_CHANGE_FEED_SLACK
+        new_job_conditions = and_(model.Job.state == model.Job.states.NEW,
+                                  model.Job.handler == self.app.config.server_name)
+        changed_jobs = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+            .filter(and_(new_job_conditions, model.Job.update_time >= since))
+        hda_changed = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+            .join(model.JobToInputDatasetAssociation) \
+            .join(model.HistoryDatasetAssociation) \
+            .join(model.Dataset) \
+            .filter(and_(new_job_conditions, model.Dataset.update_time >= since))
+        ldda_changed = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+            .join(model.JobToInputLibraryDatasetAssociation) \
+            .join(model.LibraryDatasetDatasetAssociation) \
+            .join(model.Dataset) \
+            .filter(and_(new_job_conditions, model.Dataset.update_time >= since))
+        changed = (hda_changed, ldda_changed)
+        if self.readiness_recheck_job_ids:
+            recheck_jobs = self.sa_session.query(model.Job.id).enable_eagerloads(False) \
+                .filter(and_(new_job_conditions, model.Job.id.in_(sorted(self.readiness_recheck_job_ids))))
+            changed = changed + (recheck_jobs,)
+        return changed_jobs.union(*changed).subquery()
+
     def __filter_jobs_with_invalid_input_states(self, jobs):
         """
         Takes  list of jobs and filters out jobs whose input datasets are in invalid state and
@@ -1081,6 +1166,7 @@ class DefaultJobDispatcher:
             log.debug(f"Stopping job {job_wrapper.get_id_tag()} in {runner_name} runner")
             try:
                 self.job_runners[runner_name].stop_job(job_wrapper)
+                self.job_runners[runner_name].expedite_monitoring(job.get_job_runner_external_id())
             except KeyError:
                 log.error(f'stop(): ({job_wrapper.get_id_tag()}) Invalid job runner: {runner_name}')
                 # Job and output dataset states have already been updated, so nothing is done here.
@@ -69,7 +69,12 @@ class RunnerParams(ParamsWithSpecs):
 class BaseJobRunner:
 
     start_methods = ['_init_monitor_thread', '_init_worker_threads']
-    DEFAULT_SPECS = dict(recheck_missing_job_retries=dict(map=int, valid=lambda x: int(x) >= 0, default=0))
+    DEFAULT_SPECS = dict(
+        recheck_missing_job_retries=dict(map=int, valid=lambda x: int(x) >= 0, default=0),
+        # Adaptive monitoring of asynchronous jobs, disabled unless a maximum interval is set
+        monitor_backoff_max_interval=dict(map=float, valid=lambda x: float(x) >= 0, default=0),
+        monitor_backoff_factor=dict(map=float, valid=lambda x: float(x) >= 1, default=2),
+    )
 
     def __init__(self, app, nworkers, **kwargs):
         """Start the job runner
@@ -275,6 +280,11 @@ class BaseJobRunner:
     def recover(self, job, job_wrapper):
         raise NotImplementedError()
 
+    def expedite_monitoring(self, external_job_id):
+        """Hint that the state of a job may have changed, runners that monitor
+        jobs on a schedule should check it as soon as possible.
+        """
+
     def build_command_line(self,
                            job_wrapper,
                            include_metadata=False,
@@ -621,9 +631,16 @@ class AsynchronousJobState(JobState):
         self._running = False
         self.check_count = 0
         self.start_time = None
+        # Adaptive monitoring schedule, see AsynchronousJobRunner.check_due_watched_items
+        self.next_check_time = 0
+        self.check_interval = None
 
         # job_id is the DRM's job id, not the Galaxy job id
         self.job_id = job_id
+        # Status of the job in the DRM as returned by the most recent batched
+        # status query (see AsynchronousJobRunner.get_watched_item_states),
+        # None if the job was not included in the results
+        self.remote_state = None
 
         self.job_file = job_file
         self.output_file = output_file
@@ -678,9 +695,20 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
         # 'queue' is used to add new watched jobs, and can be called from
         # any thread (usually by the 'queue_job' method). 'watched' must only
         # be modified by the monitor thread, which will move items from 'queue'
-        # to 'watched' and then manage the watched jobs.
+        # to 'watched' and then manage the watched jobs. Other threads that
+        # need to drop a job from 'watched' (e.g. to stop it) use 'unwatch'.
         self.watched = []
+        # Guards 'watched', 'not_due' and 'unwatched', it is not held while
+        # the monitor thread checks the state of jobs
+        self.watched_lock = threading.RLock()
+        # Watched jobs left out of the current check, see check_due_watched_items
+        self.not_due = []
+        # External job ids dropped by unwatch while jobs were being checked
+        self.unwatched = set()
         self.monitor_queue = Queue()
+        # External job ids of watched jobs that should be checked on the next
+        # iteration regardless of their monitoring schedule
+        self.expedite_queue = Queue()
 
     def _init_monitor_thread(self):
         name = f"{self.runner_name}.monitor_thread"
@@ -704,12 +732,13 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
                         # TODO: This is where any cleanup would occur
                         self.handle_stop()
                         return
-                    self.watched.append(async_job_state)
+                    with self.watched_lock:
+                        self.watched.append(async_job_state)
             except Empty:
                 pass
             # Iterate over the list of watched jobs and check state
             try:
-                self.check_watched_items()
+                self.check_due_watched_items()
             except Exception:
                 log.exception('Unhandled exception checking active jobs')
             # Sleep a bit before the next state check
@@ -718,6 +747,85 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
     def monitor_job(self, job_state):
         self.monitor_queue.put(job_state)
 
+    def expedite_monitoring(self, external_job_id):
+        if self.runner_params.monitor_backoff_max_interval:
+            self.expedite_queue.put(external_job_id)
+
+    def unwatch(self, external_job_id):
+        """
+        Stop watching the job with ``external_job_id``, return its job state
+        or None if it is not watched. Can be called from any thread.
+        """
+        with self.watched_lock:
+            job_state = None
+            for async_job_state in self.watched + self.not_due:
+                if async_job_state.job_id == external_job_id:
+                    job_state = async_job_state
+            self.watched = [ajs for ajs in self.watched if ajs.job_id != external_job_id]
+            self.not_due = [ajs for ajs in self.not_due if ajs.job_id != external_job_id]
+            self.unwatched.add(external_job_id)
+            return job_state
+
+    def check_due_watched_items(self):
+        """
+        Check the watched jobs that are due according to their monitoring
+        schedule. If the ``monitor_backoff_max_interval`` runner parameter is
+        set, the interval between checks of a job grows by a factor of
+        ``monitor_backoff_factor`` each time its state is found unchanged, up
+        to that maximum, and is reset when the state changes or the job
+        approaches the walltime limit. Otherwise every job is checked on every
+        iteration.
+        """
+        max_interval = self.runner_params.monitor_backoff_max_interval
+        expedited = set()
+        try:
+            while True:
+                expedited.add(self.expedite_queue.get_nowait())
+        except Empty:
+            pass
+        now = time.time()
+        with self.watched_lock:
+            due = []
+            not_due = []
+            for async_job_state in self.watched:
+                if not max_interval or async_job_state.next_check_time <= now or async_job_state.job_id in expedited:
+                    due.append(async_job_state)
+                else:
+                    not_due.append(async_job_state)
+            # check_watched_items works on self.watched, the jobs that are not
+            # due are kept aside until it is done.
+            self.watched = due
+            self.not_due = not_due
+            self.unwatched = set()
+        previous_states = {id(ajs): (ajs.old_state, ajs.running) for ajs in due}
+        try:
+            self.check_watched_items()
+        finally:
+            with self.watched_lock:
+                if max_interval:
+                    for async_job_state in self.watched:
+                        changed = previous_states.get(id(async_job_state)) != (async_job_state.old_state, async_job_state.running)
+                        self._schedule_next_check(async_job_state, changed, now, max_interval)
+                # jobs unwatched during the check may have been put back by check_watched_items
+                self.watched = [ajs for ajs in self.watched + self.not_due if ajs.job_id not in self.unwatched]
+                self.not_due = []
+                self.unwatched = set()
+
+    def _schedule_next_check(self, async_job_state, changed, now, max_interval):
+        min_interval = self.app.config.job_runner_monitor_sleep
+        if changed or async_job_state.check_interval is None:
+            interval = min_interval
+        else:
+            interval = min(async_job_state.check_interval * self.runner_params.monitor_backoff_factor, max_interval)
+        walltime = self.app.job_config.limits.walltime_delta
+        if walltime is not None and async_job_state.running and async_job_state.start_time is not None:
+            # poll quickly around the time the job is expected to be terminated
+            remaining = (async_job_state.start_time + walltime - datetime.datetime.now()).total_seconds()
+            if remaining <= interval:
+                interval = min_interval
+        async_job_state.check_interval = interval
+        async_job_state.next_check_time = now + interval
+
     def shutdown(self):
         """Attempts to gracefully shut down the monitor thread"""
         log.info(f"{self.runner_name}: Sending stop signal to monitor thread")
@@ -733,7 +841,12 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
         states. Subclasses can opt to override this directly (as older job runners will
         initially) or just override check_watched_item and allow the list processing to
         reuse the logic here.
+
+        Before the individual items are checked, the status of all watched jobs
+        is fetched at once with get_watched_item_states and stored on each job
+        state's ``remote_state`` attribute.
         """
+        self.prefetch_watched_item_states()
         new_watched = []
         for async_job_state in self.watched:
             new_async_job_state = self.check_watched_item(async_job_state)
@@ -741,6 +854,31 @@ class AsynchronousJobRunner(BaseJobRunner, Monitors):
                 new_watched.append(new_async_job_state)
         self.watched = new_watched
 
+    def prefetch_watched_item_states(self):
+        """
+        Query the status of all watched jobs using get_watched_item_states and
+        set ``remote_state`` on each watched job state. Jobs missing from the
+        results (or all jobs, if the batched query fails) get a ``remote_state``
+        of None and should be checked individually.
+        """
+        try:
+            remote_states = self.get_watched_item_states(self.watched)
+        except Exception:
+            log.exception("(%s) Batched job status check failed, falling back to checking jobs individually", self.runner_name)
+            remote_states = {}
+        for async_job_state in self.watched:
+            async_job_state.remote_state = remote_states.get(async_job_state.job_id)
+
+    def get_watched_item_states(self, job_states):
+        """
+        Return a dictionary mapping the external job ids of ``job_states`` to
+        their status in the DRM, using as few remote calls as possible. The
+        status values are runner-specific. Runners that can query many jobs at
+        once should override this, the default returns an empty dictionary,
+        so that each job is checked individually.
+        """
+        return {}
+
     # Subclasses should implement this unless they override check_watched_items all together.
     def check_watched_item(self, job_state):
         raise NotImplementedError()
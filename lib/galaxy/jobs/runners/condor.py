@@ -223,16 +223,7 @@ class CondorJobRunner(AsynchronousJobRunner):
         if job.container:
             try:
                 log.info(f"stop_job(): {job.id}: trying to stop container .... ({external_id})")
-                # self.watched = [cjs for cjs in self.watched if cjs.job_id != external_id]
-                new_watch_list = list()
-                cjs = None
-                for tcjs in self.watched:
-                    if tcjs.job_id != external_id:
-                        new_watch_list.append(tcjs)
-                    else:
-                        cjs = tcjs
-                        break
-                self.watched = new_watch_list
+                cjs = self.unwatch(external_id)
                 self._stop_container(job_wrapper)
                 # self.watched.append(cjs)
                 if cjs.job_wrapper.get_state() != model.Job.states.DELETED:
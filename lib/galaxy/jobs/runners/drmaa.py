@@ -278,7 +278,11 @@ class DRMAAJobRunner(AsynchronousJobRunner):
         state = None
         try:
             assert external_job_id not in (None, 'None'), f'({galaxy_id_tag}/{external_job_id}) Invalid job id'
-            state = self.ds.job_status(external_job_id)
+            if ajs.remote_state is not None:
+                # state was fetched by the batched status check
+                state = ajs.remote_state
+            else:
+                state = self.ds.job_status(external_job_id)
             # Reset exception retries
             for retry_exception in RETRY_EXCEPTIONS_LOWER:
                 setattr(ajs, f"{retry_exception}_retries", 0)
@@ -321,6 +325,9 @@ class DRMAAJobRunner(AsynchronousJobRunner):
         Called by the monitor thread to look at each watched job and deal
         with state changes.
         """
+        # DRMAA 1.0 has no call to query many jobs at once, subclasses may
+        # implement get_watched_item_states using DRM-specific tools
+        self.prefetch_watched_item_states()
         new_watched = []
         for ajs in self.watched:
             external_job_id = ajs.job_id
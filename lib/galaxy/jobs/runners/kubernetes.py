@@ -24,6 +24,7 @@ from galaxy.jobs.runners.util.pykube_util import (
     ensure_pykube,
     find_ingress_object_by_name,
     find_job_object_by_name,
+    find_job_objects_by_selector,
     find_pod_object_by_name,
     find_service_object_by_name,
     galaxy_instance_id,
@@ -165,6 +166,8 @@ class KubernetesJobRunner(AsynchronousJobRunner):
             k8s_job_prefix,
             self.__get_k8s_job_spec(ajs)
         )
+        # Label the job itself (not only its pods) so the batched status check can list all jobs of this handler
+        k8s_job_obj["metadata"]["labels"] = self.__get_k8s_job_labels()
 
         job = Job(self._pykube_api, k8s_job_obj)
         try:
@@ -306,6 +309,9 @@ class KubernetesJobRunner(AsynchronousJobRunner):
             label_val += 'x'
         return label_val
 
+    def __get_k8s_job_labels(self):
+        return {"app.galaxyproject.org/handler": self.__force_label_conformity(self.app.config.server_name)}
+
     def __get_k8s_job_spec_template(self, ajs):
         """The k8s spec template is nothing but a Pod spec, except that it is nested and does not have an apiversion
         nor kind. In addition to required fields for a Pod, a pod template in a job must specify appropriate labels
@@ -632,12 +638,23 @@ class KubernetesJobRunner(AsynchronousJobRunner):
                 new_params[each_param] = job_destination.params[each_param]
         return new_params
 
+    def get_watched_item_states(self, job_states):
+        """List all Kubernetes jobs submitted by this handler with a single label selector query."""
+        if not job_states:
+            return {}
+        jobs = find_job_objects_by_selector(self._pykube_api, self.__get_k8s_job_labels(), self.runner_params['k8s_namespace'])
+        return {job['metadata']['name']: job for job in jobs.response['items']}
+
     def check_watched_item(self, job_state):
         """Checks the state of a job already submitted on k8s. Job state is an AsynchronousJobState"""
-        jobs = find_job_object_by_name(self._pykube_api, job_state.job_id, self.runner_params['k8s_namespace'])
+        if job_state.remote_state is not None:
+            job_objs = [job_state.remote_state]
+        else:
+            # not found by the batched status check (e.g. submitted before jobs were labeled)
+            job_objs = find_job_object_by_name(self._pykube_api, job_state.job_id, self.runner_params['k8s_namespace']).response['items']
 
-        if len(jobs.response['items']) == 1:
-            job = Job(self._pykube_api, jobs.response['items'][0])
+        if len(job_objs) == 1:
+            job = Job(self._pykube_api, job_objs[0])
             job_destination = job_state.job_wrapper.job_destination
             succeeded = 0
             active = 0
@@ -697,7 +714,7 @@ class KubernetesJobRunner(AsynchronousJobRunner):
             else:
                 return self._handle_job_failure(job, job_state)
 
-        elif len(jobs.response['items']) == 0:
+        elif len(job_objs) == 0:
             if job_state.job_wrapper.get_job().state == model.Job.states.DELETED:
                 # Job has been deleted via stop_job and job has been deleted,
                 # cleanup and remove from watched_jobs by returning `None`
@@ -29,11 +29,44 @@ SLURM_MEMORY_LIMIT_EXCEEDED_PARTIAL_WARNINGS = [': Exceeded job memory limit at
 OUT_OF_MEMORY_MSG = 'This job was terminated because it used more memory than it was allocated.'
 PROBABLY_OUT_OF_MEMORY_MSG = 'This job was cancelled probably because it used more memory than it was allocated.'
 
+# Number of job ids passed to a single squeue invocation by the batched status check
+SQUEUE_BATCH_SIZE = 1000
+
 
 class SlurmJobRunner(DRMAAJobRunner):
     runner_name = "SlurmRunner"
     restrict_job_name_length = False
 
+    def get_watched_item_states(self, job_states):
+        """
+        Query the state of pending and running jobs with one ``squeue`` call
+        per batch of job ids. Jobs that are no longer known to ``squeue`` (or
+        that use the cluster-qualified job id syntax) are not returned and will
+        be checked individually through DRMAA, which reports the final state.
+        """
+        squeue_states = {
+            'PENDING': self.drmaa_job_states.QUEUED_ACTIVE,
+            'CONFIGURING': self.drmaa_job_states.RUNNING,
+            'RUNNING': self.drmaa_job_states.RUNNING,
+        }
+        job_ids = [ajs.job_id for ajs in job_states if ajs.job_id not in (None, 'None') and '.' not in ajs.job_id]
+        states = {}
+        for i in range(0, len(job_ids), SQUEUE_BATCH_SIZE):
+            cmd = ['squeue', '-h', '-o', '%i %T', '-j', ','.join(job_ids[i:i + SQUEUE_BATCH_SIZE])]
+            try:
+                stdout = commands.execute(cmd)
+            except commands.CommandLineException as e:
+                log.debug('Batched squeue status check failed, jobs will be checked individually: %s', e)
+                continue
+            for line in stdout.splitlines():
+                try:
+                    job_id, slurm_state = line.split()
+                except ValueError:
+                    continue
+                if slurm_state in squeue_states:
+                    states[job_id] = squeue_states[slurm_state]
+        return states
+
     def _complete_terminal_job(self, ajs, drmaa_state, **kwargs):
         def _get_slurm_state_with_sacct(job_id, cluster):
             cmd = ['sacct', '-n', '-o', 'state%-32']
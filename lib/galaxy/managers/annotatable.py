@@ -5,12 +5,15 @@ Mixins for Annotatable model managers and serializers.
 import logging
 from typing import Dict
 
+from sqlalchemy import sql
 from sqlalchemy.orm.scoping import scoped_session
 
+from galaxy import model
 from .base import (
     Deserializer,
-    FunctionFilterParsersType,
     ModelValidator,
+    OrmFilterParsersType,
+    raise_filter_err,
     Serializer,
 )
 
@@ -102,31 +105,40 @@ class AnnotatableDeserializerMixin:
 
 # TODO: I'm not entirely convinced this (or tags) are a good idea for filters since they involve a/the user
 class AnnotatableFilterMixin:
-    fn_filter_parsers: FunctionFilterParsersType
+    orm_filter_parsers: OrmFilterParsersType
 
-    def _owner_annotation(self, item):
-        """
-        Get the annotation by the item's owner.
-        """
-        return _match_by_user(item, item.user)
+    valid_ops = ('has', 'contains')
 
-    def filter_annotation_contains(self, item, val):
+    def create_annotation_filter(self, attr, op, val):
         """
-        Test whether `val` is in the owner's annotation.
+        Build a filter testing whether `val` is in the annotation made by the
+        item's owner, as an EXISTS subquery on the item's annotation association
+        table.
         """
-        owner_annotation = self._owner_annotation(item)
-        if owner_annotation is None:
-            return False
-        return val in owner_annotation
+
+        def _create_annotation_filter(model_class=None):
+            if op not in AnnotatableFilterMixin.valid_ops:
+                raise_filter_err(attr, op, val, 'bad op in filter')
+            if model_class is None:
+                return True
+            target_model = getattr(model, f"{model_class.__name__}AnnotationAssociation")
+            id_column = next(c for c in target_model.table.c if c.references(model_class.table.c.id))
+            return sql.exists().where(sql.expression.and_(
+                id_column == model_class.table.c.id,
+                target_model.table.c.user_id == self._owner_id_column(model_class),
+                target_model.table.c.annotation.contains(val, autoescape=True),
+            ))
+        return _create_annotation_filter
+
+    def _owner_id_column(self, model_class):
+        table = model_class.table
+        if 'user_id' in table.c:
+            return table.c.user_id
+        # history contents are owned by the owner of their history
+        history_table = model.History.table.alias()
+        return sql.select(history_table.c.user_id).where(history_table.c.id == table.c.history_id).scalar_subquery()
 
     def _add_parsers(self):
-        self.fn_filter_parsers.update(
-            {
-                'annotation': {
-                    'op': {
-                        'has': self.filter_annotation_contains,
-                        'contains': self.filter_annotation_contains,
-                    },
-                },
-            }
-        )
+        self.orm_filter_parsers.update({
+            'annotation': self.create_annotation_filter
+        })
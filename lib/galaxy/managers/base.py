@@ -191,6 +191,8 @@ class ModelManager:
     model_class: Type[model._HasTable]
     foreign_key_name: str
     app: BasicApp
+    #: number of models fetched per query when functional filters are applied in `list`
+    list_window_size = 1000
 
     def __init__(self, app: BasicApp):
         self.app = app
@@ -327,9 +329,8 @@ class ModelManager:
         Returns all objects matching the given filters
         """
         # list becomes a way of applying both filters generated in the orm (such as .user ==)
-        # and functional filters that aren't currently possible using the orm (such as instance calcluated values
-        # or annotations/tags). List splits those two filters and applies limits/offsets
-        # only after functional filters (if any) using python.
+        # and functional filters that aren't currently possible using the orm (such as instance calcluated values).
+        # List splits those two filters and applies limits/offsets only after functional filters (if any).
         orm_filters, fn_filters = self._split_filters(filters)
         if not fn_filters:
             # if no fn_filtering required, we can use the 'all orm' version with limit offset
@@ -337,8 +338,9 @@ class ModelManager:
                 limit=limit, offset=offset, **kwargs)
 
         # fn filters will change the number of items returnable by limit/offset - remove them here from the orm query
+        # and page through it instead, stopping once enough items have passed the fn filters
         query = self.query(filters=orm_filters, order_by=order_by, limit=None, offset=None, **kwargs)
-        items = query.all()
+        items = self._query_windows_gen(query)
 
         # apply limit, offset after SQL filtering
         items = self._apply_fn_filters_gen(items, fn_filters)
@@ -374,6 +376,22 @@ class ModelManager:
         query = query or self.query(**kwargs)
         return query.all()
 
+    def _query_windows_gen(self, query, window_size=None):
+        """
+        Yield the models found by `query`, fetching `window_size` of them at a
+        time using limit/offset.
+        """
+        window_size = window_size or self.list_window_size
+        # order by id last so that windows are stable when the requested order has ties
+        query = query.order_by(self.model_class.table.c.id)
+        window_offset = 0
+        while True:
+            window = query.limit(window_size).offset(window_offset).all()
+            yield from window
+            if len(window) < window_size:
+                return
+            window_offset += window_size
+
     def _apply_fn_filters_gen(self, items, filters):
         """
         If all the filter functions in `filters` return True for an item in `items`,
@@ -103,6 +103,23 @@ class DatasetManager(base.ModelManager, secured.AccessibleManagerMixin, deletabl
         roles = user.all_roles_exploiting_cache() if user else []
         return self.app.security_agent.can_access_dataset(roles, dataset)
 
+    def accessible_ids(self, dataset_ids, user, **kwargs):
+        """
+        Return the set of the Dataset ids in `dataset_ids` that are readable/viewable
+        to user, checking the access permissions of all of them in one query.
+        """
+        dataset_ids = set(dataset_ids)
+        if not dataset_ids or self.user_manager.is_admin(user, trans=kwargs.get("trans")):
+            return dataset_ids
+        user_role_ids = {model.cached_id(role) for role in user.all_roles_exploiting_cache()} if user else set()
+        access_action = self.app.security_agent.permitted_actions.DATASET_ACCESS.action
+        query = (self.session().query(model.DatasetPermissions.dataset_id, model.DatasetPermissions.role_id)
+            .filter(model.DatasetPermissions.dataset_id.in_(dataset_ids))
+            .filter(model.DatasetPermissions.action == access_action))
+        # as with can_access_dataset: user must have ALL associated access roles
+        inaccessible = {dataset_id for dataset_id, role_id in query if role_id not in user_role_ids}
+        return dataset_ids - inaccessible
+
     # TODO: implement above for groups
     # TODO: datatypes?
     # .... data, object_store
@@ -223,8 +240,8 @@ class DatasetSerializer(base.ModelSerializer[DatasetManager], deletable.Purgable
         management_permissions = self.dataset_manager.permissions.manage.by_dataset(dataset)
         access_permissions = self.dataset_manager.permissions.access.by_dataset(dataset)
         permissions = {
-            'manage': [self.app.security.encode_id(perm.role.id) for perm in management_permissions],
-            'access': [self.app.security.encode_id(perm.role.id) for perm in access_permissions],
+            'manage': self.app.security.encode_ids([perm.role.id for perm in management_permissions]),
+            'access': self.app.security.encode_ids([perm.role.id for perm in access_permissions]),
         }
         return permissions
 
@@ -722,32 +739,50 @@ class DatasetAssociationFilterParser(base.ModelFilterParser, deletable.PurgableF
             'state': {'column': '_state', 'op': ('eq', 'in')},
             'visible': {'op': ('eq'), 'val': base.parse_bool},
         })
+        self.orm_filter_parsers.update({
+            'data_type': self.create_datatype_filter,
+        })
         self.fn_filter_parsers.update({
             'genome_build': self.string_standard_ops('dbkey'),
-            'data_type': {
-                'op': {
-                    'eq': self.eq_datatype,
-                    'isinstance': self.isinstance_datatype
-                }
-            }
         })
 
-    def eq_datatype(self, dataset_assoc, class_str):
+    def create_datatype_filter(self, attr, op, val):
         """
-        Is the `dataset_assoc` datatype equal to the registered datatype `class_str`?
+        Build a filter on the extensions of the registered datatypes that are
+        equal to (`eq`) or derived from any of (`isinstance`) the datatypes
+        named in `val`.
         """
-        comparison_class = self.app.datatypes_registry.get_datatype_class_by_name(class_str)
-        return comparison_class and dataset_assoc.datatype.__class__ == comparison_class
 
-    def isinstance_datatype(self, dataset_assoc, class_strs):
+        def _create_datatype_filter(model_class=None):
+            if op == 'eq':
+                extensions = self._datatype_extensions([val], exact=True)
+            elif op == 'isinstance':
+                extensions = self._datatype_extensions(val.split(','))
+            else:
+                base.raise_filter_err(attr, op, val, 'bad op in filter')
+            if model_class is None:
+                return True
+            return model_class.table.c.extension.in_(extensions)
+        return _create_datatype_filter
+
+    def _datatype_extensions(self, class_strs, exact=False):
         """
-        Is the `dataset_assoc` datatype derived from any of the registered
-        datatypes in the comma separated string `class_strs`?
+        Return the extensions of the registered datatypes whose class is (or,
+        unless `exact`, is derived from) one of the datatypes in `class_strs`.
         """
         parse_datatype_fn = self.app.datatypes_registry.get_datatype_class_by_name
         comparison_classes: List[Type] = []
-        for class_str in class_strs.split(','):
+        for class_str in class_strs:
             datatype_class = parse_datatype_fn(class_str)
             if datatype_class:
                 comparison_classes.append(datatype_class)
-        return comparison_classes and isinstance(dataset_assoc.datatype, tuple(comparison_classes))
+        comparison_classes_tuple = tuple(comparison_classes)
+        extensions = []
+        for extension, datatype in self.app.datatypes_registry.datatypes_by_extension.items():
+            if exact:
+                matches = datatype.__class__ in comparison_classes_tuple
+            else:
+                matches = isinstance(datatype, comparison_classes_tuple)
+            if matches:
+                extensions.append(extension)
+        return extensions
@@ -460,12 +460,12 @@ class HistorySerializer(sharable.SharableModelSerializer, deletable.PurgableSeri
 
             'empty': lambda item, key, **context: (len(item.datasets) + len(item.dataset_collections)) <= 0,
             'count': lambda item, key, **context: len(item.datasets),
-            'hdas': lambda item, key, **context: [self.app.security.encode_id(hda.id) for hda in item.datasets],
+            'hdas': lambda item, key, **context: self.app.security.encode_ids([hda.id for hda in item.datasets]),
             'state_details': self.serialize_state_counts,
             'state_ids': self.serialize_state_ids,
             'contents': self.serialize_contents,
-            'non_ready_jobs': lambda item, key, **context: [self.app.security.encode_id(job.id) for job
-                                                 in self.manager.non_ready_jobs(item)],
+            'non_ready_jobs': lambda item, key, **context: self.app.security.encode_ids([job.id for job
+                                                 in self.manager.non_ready_jobs(item)]),
 
             'contents_states': self.serialize_contents_states,
             'contents_active': self.serialize_contents_active,
@@ -487,9 +487,10 @@ class HistorySerializer(sharable.SharableModelSerializer, deletable.PurgableSeri
             state_ids[state] = []
 
         # TODO:?? collections and coll. states?
-        for hda in history.datasets:
-            # TODO: do not encode ids at this layer
-            encoded_id = self.app.security.encode_id(hda.id)
+        hdas = history.datasets
+        # TODO: do not encode ids at this layer
+        encoded_ids = self.app.security.encode_ids([hda.id for hda in hdas])
+        for hda, encoded_id in zip(hdas, encoded_ids):
             state_ids[hda.state].append(encoded_id)
         return state_ids
 
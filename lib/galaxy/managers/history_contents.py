@@ -3,7 +3,7 @@ Heterogenous lists/contents are difficult to query properly since unions are
 not easily made.
 """
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from sqlalchemy import (
     asc,
@@ -78,6 +78,20 @@ class HistoryContentsManager(base.SortableManager):
     )
     default_order_by = 'hid'
 
+    #: columns that may be selected in addition to the common columns (e.g. in order
+    #  to serialize contents straight from the union rows), each available for both
+    #  subcontainers and non-subcontainers (as null where not applicable).
+    projectable_columns = (
+        "instance_state",
+        "collection_type",
+        "populated_state_message",
+        "element_count",
+        "collection_create_time",
+        "collection_update_time",
+        "job_id",
+        "implicit_collection_jobs_id",
+    )
+
     def __init__(self, app: MinimalManagerApp):
         self.app = app
         self.contained_manager = app[self.contained_class_manager_class]
@@ -188,6 +202,39 @@ class HistoryContentsManager(base.SortableManager):
                 returned['active'] += count
         return returned
 
+    def tag_strings(self, contents):
+        """
+        Return a dictionary of the (sorted) tag strings of each of the union query
+        rows in `contents`, keyed by the (history_content_type, id) of the row.
+
+        Uses one query per content type rather than loading each item's tags.
+        """
+        tag_association_classes = {
+            self.contained_class_type_name: model.HistoryDatasetAssociationTagAssociation,
+            self.subcontainer_class_type_name: model.HistoryDatasetCollectionTagAssociation,
+        }
+        component_classes = {
+            self.contained_class_type_name: self.contained_class,
+            self.subcontainer_class_type_name: self.subcontainer_class,
+        }
+        returned: Dict[Tuple[str, int], List[str]] = {}
+        for content_type, tag_class in tag_association_classes.items():
+            ids = [row.id for row in contents if row.history_content_type == content_type]
+            if not ids:
+                continue
+            component_table = component_classes[content_type].table
+            item_id_column = next(c for c in tag_class.table.c if c.references(component_table.c.id))
+            query = (self._session().query(item_id_column, tag_class.user_tname, tag_class.value, tag_class.user_value)
+                .filter(item_id_column.in_(ids)))
+            for item_id, user_tname, value, user_value in query:
+                tag_str = user_tname
+                if value is not None:
+                    tag_str += f":{user_value}"
+                returned.setdefault((content_type, item_id), []).append(tag_str)
+        for tag_strs in returned.values():
+            tag_strs.sort()
+        return returned
+
     def map_datasets(self, history, fn, **kwargs):
         """
         Iterate over the datasets of a given history, recursing into collections, and
@@ -272,10 +319,14 @@ class HistoryContentsManager(base.SortableManager):
                                  offset=None,
                                  order_by=None,
                                  user_id=None,
+                                 columns=None,
                                  **kwargs):
         """
         Returns a query for a limited and offset list of both types of contents,
         filtered and in some order.
+
+        Any `columns` (named in `projectable_columns`) are selected in addition
+        to the common columns.
         """
         order_by = order_by if order_by is not None else self.default_order_by
         order_by = order_by if isinstance(order_by, (tuple, list)) else (order_by, )
@@ -291,9 +342,11 @@ class HistoryContentsManager(base.SortableManager):
 
         # query 1: create a union of common columns for which the component_classes can be filtered/limited
         contained_query = self._contents_common_query_for_contained(history_id=container.id if container else None,
-                                                                    user_id=user_id)
+                                                                    user_id=user_id,
+                                                                    columns=columns)
         subcontainer_query = self._contents_common_query_for_subcontainer(history_id=container.id if container else None,
-                                                                          user_id=user_id)
+                                                                          user_id=user_id,
+                                                                          columns=columns)
 
         filters = filters or []
         # Apply filters that are specific to a model
@@ -323,11 +376,14 @@ class HistoryContentsManager(base.SortableManager):
                 qry = qry.filter(new_filter)
         return qry
 
-    def _contents_common_columns(self, component_class, **kwargs):
+    def _contents_common_columns(self, component_class, projected=None, **kwargs):
         columns = []
+        projected = projected or {}
         # pull column from class by name or override with kwargs if listed there, then label
-        for column_name in self.common_columns:
-            if column_name in kwargs:
+        for column_name in self.common_columns + tuple(projected):
+            if column_name in projected:
+                column = projected[column_name]
+            elif column_name in kwargs:
                 column = kwargs.get(column_name, None)
             elif column_name == "model_class":
                 column = literal(component_class.__name__)
@@ -337,10 +393,28 @@ class HistoryContentsManager(base.SortableManager):
             columns.append(column)
         return columns
 
-    def _contents_common_query_for_contained(self, history_id, user_id):
+    def _projected_columns(self, columns, available):
+        """
+        Return an (ordered) map of the requested projectable `columns` to the
+        columns in `available`, null for those not available.
+        """
+        projected = {}
+        for column_name in sorted(set(columns or [])):
+            if column_name not in self.projectable_columns:
+                raise glx_exceptions.RequestParameterInvalidException('Unknown contents column', column=column_name,
+                    available=self.projectable_columns)
+            projected[column_name] = available.get(column_name, literal(None))
+        return projected
+
+    def _contents_common_query_for_contained(self, history_id, user_id, columns=None):
         component_class = self.contained_class
+        projected = self._projected_columns(columns, {
+            # the hda's own state, used over the dataset's when set
+            "instance_state": component_class.table.c._state,
+        })
         # TODO: and now a join with Dataset - this is getting sad
         columns = self._contents_common_columns(component_class,
+            projected=projected,
             history_content_type=literal('dataset'),
             state=model.Dataset.state,
             # do not have inner collections
@@ -359,9 +433,19 @@ class HistoryContentsManager(base.SortableManager):
                                        model.History.table.c.user_id == user_id)
         return subquery
 
-    def _contents_common_query_for_subcontainer(self, history_id, user_id):
+    def _contents_common_query_for_subcontainer(self, history_id, user_id, columns=None):
         component_class = self.subcontainer_class
+        projected = self._projected_columns(columns, {
+            "collection_type": model.DatasetCollection.collection_type,
+            "populated_state_message": model.DatasetCollection.populated_state_message,
+            "element_count": model.DatasetCollection.element_count,
+            "collection_create_time": model.DatasetCollection.create_time,
+            "collection_update_time": model.DatasetCollection.update_time,
+            "job_id": component_class.job_id,
+            "implicit_collection_jobs_id": component_class.implicit_collection_jobs_id,
+        })
         columns = self._contents_common_columns(component_class,
+            projected=projected,
             history_content_type=literal('dataset_collection'),
             # do not have datasets
             dataset_id=literal(None),
@@ -449,6 +533,7 @@ class HistoryContentsSerializer(base.ModelSerializer, deletable.PurgableSerializ
             "create_time",
             "update_time",
         ])
+        self.add_row_serializers()
 
     # assumes: outgoing to json.dumps and sanitized
     def add_serializers(self):
@@ -468,6 +553,137 @@ class HistoryContentsSerializer(base.ModelSerializer, deletable.PurgableSerializ
             raise base.SkipAttribute('no such attribute')
         return self.serialize_id(item, key, **context)
 
+    # ---- serializing contents from the union query rows
+    def add_row_serializers(self):
+        """
+        Register the serializers that build the HDA and HDCA serializers' values
+        for a key straight from a union query row (keyed by history_content_type)
+        and the additional union columns each of those keys needs.
+        """
+        encode_id = self.app.security.encode_id
+        common: Dict[str, Serializer] = {
+            'id': self.serialize_id,
+            'type_id': self.serialize_type_id,
+            'history_id': self.serialize_id,
+            'hid': self.default_serializer,
+            'history_content_type': self.default_serializer,
+            'name': self.default_serializer,
+            'deleted': self.default_serializer,
+            'visible': self.default_serializer,
+            'tags': self.serialize_row_tags,
+        }
+        self.row_serializers: Dict[str, Dict[str, Serializer]] = {
+            'dataset': dict(common, **{
+                'create_time': self.serialize_date,
+                'update_time': self.serialize_date,
+                'dataset_id': self.serialize_id,
+                'state': lambda item, key, **context: item.instance_state or item.state,
+                'extension': self.default_serializer,
+                'purged': self.default_serializer,
+                'accessible': lambda item, key, accessible_dataset_ids=None, **context: item.dataset_id in accessible_dataset_ids,
+                'type': lambda item, key, **context: 'file',
+                'url': lambda item, key, **context: self.url_for('history_content',
+                                                                 history_id=encode_id(item.history_id),
+                                                                 id=encode_id(item.id)),
+            }),
+            'dataset_collection': dict(common, **{
+                # these are proxied from the dataset collection
+                'create_time': lambda item, key, **context: self.serialize_date(item, 'collection_create_time'),
+                'update_time': lambda item, key, **context: self.serialize_date(item, 'collection_update_time'),
+                'populated_state': lambda item, key, **context: item.state,
+                'populated_state_message': self.default_serializer,
+                'collection_type': self.default_serializer,
+                'element_count': self.default_serializer,
+                'collection_id': self.default_serializer,
+                'job_source_id': self.serialize_row_job_source_id,
+                'job_source_type': self.serialize_row_job_source_type,
+                'type': lambda item, key, **context: 'collection',
+                'url': lambda item, key, **context: self.url_for('history_content_typed',
+                                                                 history_id=encode_id(item.history_id),
+                                                                 id=encode_id(item.id),
+                                                                 type='dataset_collection'),
+                'contents_url': lambda item, key, **context: self.url_for('contents_dataset_collection',
+                                                                          hdca_id=encode_id(item.id),
+                                                                          parent_id=encode_id(item.collection_id)),
+            }),
+        }
+        self.row_key_columns: Dict[str, List[str]] = {
+            'state': ['instance_state'],
+            'create_time': ['collection_create_time'],
+            'update_time': ['collection_update_time'],
+            'populated_state_message': ['populated_state_message'],
+            'collection_type': ['collection_type'],
+            'element_count': ['element_count'],
+            'job_source_id': ['job_id', 'implicit_collection_jobs_id'],
+            'job_source_type': ['job_id', 'implicit_collection_jobs_id'],
+        }
+
+    def serialize_row_tags(self, item, key, row_tags=None, **context):
+        """
+        Return the tags of a union query row, from `row_tags` as returned by the
+        manager's `tag_strings`.
+        """
+        return (row_tags or {}).get((item.history_content_type, item.id), [])
+
+    def serialize_row_job_source_id(self, item, key, **context):
+        job_source_id = item.implicit_collection_jobs_id or item.job_id
+        return self.app.security.encode_id(job_source_id) if job_source_id is not None else None
+
+    def serialize_row_job_source_type(self, item, key, **context):
+        if item.implicit_collection_jobs_id:
+            return "ImplicitCollectionJobs"
+        elif item.job_id:
+            return "Job"
+        return None
+
+    def can_serialize_rows(self, keys_by_type, inaccessible_dataset_keys):
+        """
+        Return True if all the keys in `keys_by_type` (a map of history_content_type
+        to the list of keys to serialize for contents of that type) and the keys
+        used for inaccessible datasets can be served from the union query rows.
+        """
+        return all(set(keys) <= set(self.row_serializers[content_type])
+                   for content_type, keys in self._row_keys(keys_by_type, inaccessible_dataset_keys).items())
+
+    def row_columns(self, keys_by_type, inaccessible_dataset_keys):
+        """
+        Return the additional union query columns needed to serialize `keys_by_type`.
+        """
+        columns = set()
+        for keys in self._row_keys(keys_by_type, inaccessible_dataset_keys).values():
+            for key in keys:
+                columns.update(self.row_key_columns.get(key, []))
+        return sorted(columns)
+
+    def _row_keys(self, keys_by_type, inaccessible_dataset_keys):
+        row_keys = dict(keys_by_type)
+        row_keys['dataset'] = list(row_keys.get('dataset', [])) + list(inaccessible_dataset_keys)
+        return row_keys
+
+    def serialize_rows(self, rows, keys_by_type, inaccessible_dataset_keys, user=None, **context):
+        """
+        Serialize the union query `rows` (selected with `row_columns`) to the same
+        dictionaries the HDA and HDCA serializers would return for `keys_by_type`
+        without loading the models.
+
+        As with the HDA serializer, datasets `user` cannot access are serialized
+        using only `inaccessible_dataset_keys`.
+        """
+        dataset_ids = [row.dataset_id for row in rows if row.history_content_type == 'dataset']
+        dataset_manager = self.manager.contained_manager.dataset_manager
+        context['accessible_dataset_ids'] = dataset_manager.accessible_ids(dataset_ids, user, **context)
+        if any('tags' in keys for keys in keys_by_type.values()):
+            context['row_tags'] = self.manager.tag_strings(rows)
+        returned = []
+        for row in rows:
+            content_type = row.history_content_type
+            keys = keys_by_type[content_type]
+            if content_type == 'dataset' and row.dataset_id not in context['accessible_dataset_ids']:
+                keys = inaccessible_dataset_keys
+            serializers = self.row_serializers[content_type]
+            returned.append({key: serializers[key](row, key, user=user, **context) for key in keys})
+        return returned
+
 
 class HistoryContentsFilters(base.ModelFilterParser,
                              annotatable.AnnotatableFilterMixin,
@@ -48,6 +48,7 @@ class MetadataCollectionStrategy(metaclass=abc.ABCMeta):
                                 config_file=None, datatypes_config=None,
                                 job_metadata=None, provided_metadata_style=None, compute_tmp_dir=None,
                                 include_command=True, max_metadata_value_size=0,
+                                metadata_cache_dir=None,
                                 object_store_conf=None, tool=None, job=None,
                                 kwds=None):
         """Setup files needed for external metadata collection.
@@ -107,6 +108,7 @@ class PortableDirectoryMetadataGenerator(MetadataCollectionStrategy):
                                 config_file=None, datatypes_config=None,
                                 job_metadata=None, provided_metadata_style=None, compute_tmp_dir=None,
                                 include_command=True, max_metadata_value_size=0,
+                                metadata_cache_dir=None,
                                 validate_outputs=False,
                                 object_store_conf=None, tool=None, job=None, link_data_only=False,
                                 kwds=None):
@@ -152,6 +154,7 @@ class PortableDirectoryMetadataGenerator(MetadataCollectionStrategy):
             "provided_metadata_style": provided_metadata_style,
             "datatypes_config": datatypes_config,
             "max_metadata_value_size": max_metadata_value_size,
+            "metadata_cache_dir": metadata_cache_dir,
             "outputs": outputs,
         }
 
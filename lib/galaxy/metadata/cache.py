@@ -0,0 +1,174 @@
+"""Content addressed cache of the metadata computed by ``set_meta``.
+
+Identical dataset contents (reference files, copies and outputs of cached
+jobs) are frequently set metadata on over and over again. Entries are keyed
+on the dataset contents, the datatype, the datatypes configuration and Galaxy
+version, the ``set_meta`` keyword arguments and the metadata the dataset
+already carries, and hold the JSON serialized metadata collection.
+
+Hashing a dataset costs a full read, so lookups are keyed on cheap attributes
+first. Datasets are grouped by a signature of everything but their contents
+(the file size standing in for those) and a dataset is only hashed once its
+signature has been seen before. Content hashes are remembered by path, size,
+modification time and object store id so the same file is not hashed twice.
+
+The cache is local to the Galaxy host that created it: the Galaxy server
+claims the directory and evicts it in the background (see
+:func:`claim_metadata_cache`) and ``set_meta`` leaves the cache alone
+on any other host.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+
+from galaxy.objectstore.caching import (
+    CACHE_INDEX_FILENAME,
+    CacheIndex,
+    CacheMonitor,
+)
+from galaxy.util.hash_util import memory_bound_hexdigest
+from galaxy.version import VERSION
+
+log = logging.getLogger(__name__)
+
+# Named after the index so cache walks skip it.
+METADATA_CACHE_HOST_FILENAME = f"{CACHE_INDEX_FILENAME}-host"
+
+
+def _host_path(cache_dir):
+    return os.path.join(cache_dir, METADATA_CACHE_HOST_FILENAME)
+
+
+def metadata_cache_is_local(cache_dir):
+    """Return True if ``cache_dir`` was claimed by the Galaxy server on this host."""
+    try:
+        with open(_host_path(cache_dir)) as fh:
+            return fh.read().strip() == socket.gethostname()
+    except OSError:
+        return False
+
+
+def claim_metadata_cache(cache_dir, cache_size):
+    """Claim ``cache_dir`` for this host.
+
+    Return a monitor keeping the cache under ``cache_size`` bytes, or None if
+    the cache size is not limited.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(_host_path(cache_dir), "w") as fh:
+        fh.write(socket.gethostname())
+    if cache_size > 0:
+        return CacheMonitor(CacheIndex(cache_dir), cache_size)
+    return None
+
+
+def _digest(parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class MetadataCache:
+    """Store and look up metadata results in ``cache_dir``.
+
+    Entries are only added, eviction is left to the monitor of the Galaxy
+    server owning the directory.
+    """
+
+    def __init__(self, cache_dir, datatypes_config=None):
+        self.cache_dir = cache_dir
+        self.cache_index = CacheIndex(cache_dir)
+        self.hashed = 0
+        self.datatypes_config_hash = None
+        if datatypes_config and os.path.exists(datatypes_config):
+            self.datatypes_config_hash = memory_bound_hexdigest(hash_func=hashlib.sha1, path=datatypes_config)
+
+    def _path(self, kind, key, suffix=""):
+        return os.path.join(self.cache_dir, kind, key[:2], f"{key}{suffix}")
+
+    def _write(self, path, contents):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(mode='w', dir=directory, delete=False) as fh:
+            fh.write(contents)
+        os.replace(fh.name, path)
+        self.cache_index.record(path)
+
+    def _content_hash(self, dataset_instance, file_name, stat):
+        hash_key = _digest([
+            os.path.realpath(file_name),
+            stat.st_size,
+            stat.st_mtime_ns,
+            dataset_instance.dataset.object_store_id,
+        ])
+        hash_path = self._path("hashes", hash_key)
+        try:
+            with open(hash_path) as fh:
+                content_hash = fh.read()
+            self.cache_index.hit(hash_path)
+            return content_hash
+        except OSError:
+            pass
+        content_hash = memory_bound_hexdigest(hash_func=hashlib.sha256, path=file_name)
+        self.hashed += 1
+        self._write(hash_path, content_hash)
+        return content_hash
+
+    def key(self, dataset_instance, set_meta_kwds):
+        """Return the cache key for setting metadata on ``dataset_instance``.
+
+        Return None if its metadata cannot be cached or no dataset with the
+        same signature was seen before, in which case the signature is
+        remembered and the next such dataset gets a key.
+        """
+        datatype = dataset_instance.datatype
+        metadata = dataset_instance.metadata
+        if datatype.composite_type or metadata.requires_dataset_id:
+            # Metadata depends on extra files or produces metadata files.
+            return None
+        file_name = dataset_instance.file_name
+        try:
+            stat = os.stat(file_name)
+        except (OSError, TypeError):
+            return None
+        signature = _digest([
+            stat.st_size,
+            f"{datatype.__class__.__module__}.{datatype.__class__.__name__}",
+            dataset_instance.extension,
+            self.datatypes_config_hash,
+            VERSION,
+            sorted(set_meta_kwds.items()),
+            metadata.to_JSON_dict(),
+        ])
+        signature_path = self._path("signatures", signature)
+        if not os.path.exists(signature_path):
+            self.cache_index.miss()
+            self._write(signature_path, "")
+            return None
+        self.cache_index.hit(signature_path)
+        return _digest([signature, self._content_hash(dataset_instance, file_name, stat)])
+
+    def load(self, dataset_instance, key):
+        """Set the metadata of ``dataset_instance`` from the entry for ``key``.
+
+        Return False if there is no such entry.
+        """
+        path = self._path("entries", key, ".json")
+        try:
+            with open(path) as fh:
+                json_dict = fh.read()
+        except OSError:
+            self.cache_index.miss()
+            return False
+        self.cache_index.hit(path)
+        dataset_instance.metadata.from_JSON_dict(json_dict=json_dict)
+        return True
+
+    def store(self, dataset_instance, key):
+        self._write(self._path("entries", key, ".json"), dataset_instance.metadata.to_JSON_dict())
+
+    def close(self):
+        log.debug("Metadata cache %s: hits %s, misses %s, datasets hashed %s", self.cache_dir,
+                  self.cache_index.hits, self.cache_index.misses, self.hashed)
+        self.cache_index.close()
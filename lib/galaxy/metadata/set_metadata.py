@@ -37,6 +37,10 @@ from galaxy.job_execution.output_collect import (
     SessionlessJobContext,
 )
 from galaxy.job_execution.setup import TOOL_PROVIDED_JOB_METADATA_KEYS
+from galaxy.metadata.cache import (
+    metadata_cache_is_local,
+    MetadataCache,
+)
 from galaxy.model import (
     Dataset,
     HistoryDatasetAssociation,
@@ -73,7 +77,7 @@ def set_validated_state(dataset_instance):
     dataset_instance.metadata.__validated_state_message__ = datatype_validation.message
 
 
-def set_meta_with_tool_provided(dataset_instance, file_dict, set_meta_kwds, datatypes_registry, max_metadata_value_size):
+def set_meta_with_tool_provided(dataset_instance, file_dict, set_meta_kwds, datatypes_registry, max_metadata_value_size, metadata_cache=None):
     # This method is somewhat odd, in that we set the metadata attributes from tool,
     # then call set_meta, then set metadata attributes from tool again.
     # This is intentional due to interplay of overwrite kwd, the fact that some metadata
@@ -94,7 +98,11 @@ def set_meta_with_tool_provided(dataset_instance, file_dict, set_meta_kwds, data
 
     for metadata_name, metadata_value in file_dict.get('metadata', {}).items():
         setattr(dataset_instance.metadata, metadata_name, metadata_value)
-    dataset_instance.datatype.set_meta(dataset_instance, **set_meta_kwds)
+    cache_key = metadata_cache and metadata_cache.key(dataset_instance, set_meta_kwds)
+    if not (cache_key and metadata_cache.load(dataset_instance, cache_key)):
+        dataset_instance.datatype.set_meta(dataset_instance, **set_meta_kwds)
+        if cache_key:
+            metadata_cache.store(dataset_instance, cache_key)
     for metadata_name, metadata_value in file_dict.get('metadata', {}).items():
         setattr(dataset_instance.metadata, metadata_name, metadata_value)
 
@@ -129,8 +137,18 @@ def set_metadata_portable():
     datatypes_registry = validate_and_load_datatypes_config(datatypes_config)
     tool_provided_metadata = load_job_metadata(job_metadata, provided_metadata_style)
 
+    metadata_cache = None
+    metadata_cache_dir = metadata_params.get("metadata_cache_dir")
+    if metadata_cache_dir and not metadata_cache_is_local(metadata_cache_dir):
+        log.debug("Metadata cache %s is not local to this host, metadata will be set without it.", metadata_cache_dir)
+    elif metadata_cache_dir:
+        try:
+            metadata_cache = MetadataCache(metadata_cache_dir, datatypes_config)
+        except Exception:
+            log.exception("Failed to open metadata cache %s, metadata will be set without it.", metadata_cache_dir)
+
     def set_meta(new_dataset_instance, file_dict):
-        set_meta_with_tool_provided(new_dataset_instance, file_dict, set_meta_kwds, datatypes_registry, max_metadata_value_size)
+        set_meta_with_tool_provided(new_dataset_instance, file_dict, set_meta_kwds, datatypes_registry, max_metadata_value_size, metadata_cache)
 
     object_store_conf_path = os.path.join("metadata", "object_store_conf.json")
     extended_metadata_collection = os.path.exists(object_store_conf_path)
@@ -371,6 +389,8 @@ def set_metadata_portable():
     if export_store:
         export_store._finalize()
     write_job_metadata(tool_job_working_directory, job_metadata, set_meta, tool_provided_metadata)
+    if metadata_cache:
+        metadata_cache.close()
 
 
 def validate_and_load_datatypes_config(datatypes_config):
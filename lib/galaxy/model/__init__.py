@@ -83,6 +83,8 @@ from sqlalchemy.orm import (
     reconstructor,
     registry,
     relationship,
+    selectinload,
+    undefer,
 )
 from sqlalchemy.orm.collections import attribute_mapped_collection
 from sqlalchemy.orm.decl_api import DeclarativeMeta
@@ -650,6 +652,7 @@ class User(Base, Dictifiable, RepresentById):
         rval = 0
         if self.disk_usage is not None:
             rval = self.disk_usage
+        rval += self._pending_disk_usage()
         if nice_size:
             rval = galaxy.util.nice_size(rval)
         return rval
@@ -662,9 +665,30 @@ class User(Base, Dictifiable, RepresentById):
 
     total_disk_usage = property(get_disk_usage, set_disk_usage)
 
+    def _pending_disk_usage(self):
+        """
+        Return the sum of the disk usage changes recorded in the ledger but not
+        yet compacted into `disk_usage`.
+        """
+        sa_session = object_session(self)
+        if sa_session is None or self.id is None:
+            return 0
+        return UserDiskUsageLedger.pending_amount(sa_session, self.id)
+
     def adjust_total_disk_usage(self, amount):
+        """
+        Record a change of `amount` bytes to the disk space used by this user.
+
+        Changes are written to the disk usage ledger along with the rest of the
+        session (rather than updating this user's row) and periodically folded
+        into `disk_usage` by `UserDiskUsageLedger.compact`.
+        """
         if amount != 0:
-            self.disk_usage = func.coalesce(self.table.c.disk_usage, 0) + amount
+            sa_session = object_session(self)
+            if sa_session is None or self.id is None:
+                self.disk_usage = func.coalesce(self.table.c.disk_usage, 0) + amount
+            else:
+                sa_session.add(UserDiskUsageLedger(user_id=self.id, amount=amount))
 
     @property
     def nice_total_disk_usage(self):
@@ -683,7 +707,11 @@ class User(Base, Dictifiable, RepresentById):
 
     def calculate_and_set_disk_usage(self):
         """
-        Calculates and sets user disk usage.
+        Calculates and sets user disk usage, discarding any changes pending in
+        the disk usage ledger.
+
+        Disk usage is kept up to date incrementally by the ledger, this full
+        recalculation is meant to verify and repair it.
         """
         self._calculate_or_set_disk_usage(dryrun=False)
 
@@ -713,8 +741,12 @@ class User(Base, Dictifiable, RepresentById):
                 AND library_dataset_dataset_association.id IS NULL
         """
         sa_session = object_session(self)
+        # changes recorded after this point may not be part of the calculated usage, keep them
+        ledger_max_id = None if dryrun else UserDiskUsageLedger.max_id(sa_session, self.id)
         usage = sa_session.scalar(sql_calc, {'id': self.id})
         if not dryrun:
+            if ledger_max_id is not None:
+                UserDiskUsageLedger.discard(sa_session, self.id, max_id=ledger_max_id)
             self.set_disk_usage(usage)
             sa_session.flush()
         return usage
@@ -2545,27 +2577,28 @@ class History(Base, HasTags, Dictifiable, UsesAnnotations, HasName, Serializable
             self.copy_item_annotation(db_session, self.user, self, target_user, new_history)
             new_history.copy_tags_from(target_user=target_user, source=self)
 
+        # Load the contents to copy along with their tags and annotations
+        # up front rather than one item at a time.
+        hdas, hdcas = self._contents_for_copy(all_hdas=activatable or all_datasets, all_hdcas=all_datasets)
+
         # Copy HDAs.
         if activatable:
-            hdas = self.activatable_datasets
-        elif all_datasets:
-            hdas = self.datasets
-        else:
-            hdas = self.active_datasets
+            hdas = [hda for hda in hdas if not hda.dataset.deleted]
+        quota_amount = 0
         for hda in hdas:
             # Copy HDA.
             new_hda = hda.copy(flush=False)
-            new_history.add_dataset(new_hda, set_hid=False, quota=applies_to_quota)
+            new_history.add_dataset(new_hda, set_hid=False, quota=False)
+            if applies_to_quota:
+                quota_amount += new_hda.quota_amount(target_user)
 
             if target_user:
                 new_hda.copy_item_annotation(db_session, self.user, hda, target_user, new_hda)
                 new_hda.copy_tags_from(target_user, hda)
+        if target_user:
+            target_user.adjust_total_disk_usage(quota_amount)
 
         # Copy history dataset collections
-        if all_datasets:
-            hdcas = self.dataset_collections
-        else:
-            hdcas = self.active_dataset_collections
         for hdca in hdcas:
             new_hdca = hdca.copy(flush=False)
             new_history.add_dataset_collection(new_hdca, set_hid=False)
@@ -2580,6 +2613,34 @@ class History(Base, HasTags, Dictifiable, UsesAnnotations, HasName, Serializable
 
         return new_history
 
+    def _contents_for_copy(self, all_hdas=False, all_hdcas=False):
+        """
+        Return the HDAs and HDCAs of this history, ordered by hid and loaded
+        with the datasets, collections, tags and annotations used when copying
+        them. Deleted items are only included if ``all_hdas``/``all_hdcas``.
+        """
+        db_session = object_session(self)
+        hdas = db_session.query(HistoryDatasetAssociation).filter(
+            HistoryDatasetAssociation.history_id == self.id
+        ).options(
+            joinedload(HistoryDatasetAssociation.dataset),
+            selectinload(HistoryDatasetAssociation.tags),
+            selectinload(HistoryDatasetAssociation.annotations),
+            undefer('_metadata'),
+        ).order_by(HistoryDatasetAssociation.hid)
+        hdcas = db_session.query(HistoryDatasetCollectionAssociation).filter(
+            HistoryDatasetCollectionAssociation.history_id == self.id
+        ).options(
+            joinedload(HistoryDatasetCollectionAssociation.collection),
+            selectinload(HistoryDatasetCollectionAssociation.tags),
+            selectinload(HistoryDatasetCollectionAssociation.annotations),
+        ).order_by(HistoryDatasetCollectionAssociation.hid)
+        if not all_hdas:
+            hdas = hdas.filter(HistoryDatasetAssociation.deleted == false())
+        if not all_hdcas:
+            hdcas = hdcas.filter(HistoryDatasetCollectionAssociation.deleted == false())
+        return hdas.all(), hdcas.all()
+
     @property
     def has_possible_members(self):
         return True
@@ -5368,7 +5429,7 @@ class DatasetCollection(Base, Dictifiable, UsesAnnotations, Serializable):
             collection_type=self.collection_type,
             element_count=self.element_count
         )
-        for element in self.elements:
+        for element in self._elements_for_copy():
             element.copy_to_collection(
                 new_collection,
                 destination=destination,
@@ -5381,6 +5442,22 @@ class DatasetCollection(Base, Dictifiable, UsesAnnotations, Serializable):
             object_session(self).flush()
         return new_collection
 
+    def _elements_for_copy(self):
+        """
+        Return the elements of this collection, loading them along with the
+        datasets and collections they hold in a single query if not loaded yet.
+        """
+        db_session = object_session(self)
+        if db_session is None or self.id is None or 'elements' not in inspect(self).unloaded:
+            return self.elements
+        return db_session.query(DatasetCollection).filter(
+            DatasetCollection.id == self.id
+        ).options(
+            selectinload(DatasetCollection.elements).joinedload(DatasetCollectionElement.hda),
+            selectinload(DatasetCollection.elements).joinedload(DatasetCollectionElement.ldda),
+            selectinload(DatasetCollection.elements).joinedload(DatasetCollectionElement.child_collection),
+        ).one().elements
+
     def replace_failed_elements(self, replacements):
         hda_id_to_element = dict(self._get_nested_collection_attributes(return_entities=[DatasetCollectionElement], hda_attributes=['id']))
         for failed, replacement in replacements.items():
@@ -8578,6 +8655,89 @@ class UserAction(Base, RepresentById):
     user = relationship('User')
 
 
+class LedgerEntriesClaimedException(Exception):
+    """Raised when changes read from the disk usage ledger were claimed by another process."""
+
+
+class UserDiskUsageLedger(Base, RepresentById):
+    """
+    A change to the disk space used by a user that has not yet been folded
+    into ``User.disk_usage``.
+    """
+    __tablename__ = 'user_disk_usage_ledger'
+
+    id = Column(Integer, primary_key=True)
+    create_time = Column(DateTime, default=now)
+    user_id = Column(Integer, ForeignKey('galaxy_user.id'), index=True, nullable=False)
+    amount = Column(Numeric(15, 0), nullable=False)
+    user = relationship('User')
+
+    @classmethod
+    def pending_amount(cls, sa_session, user_id):
+        """
+        Return the sum of the changes recorded for the user with `user_id`.
+        """
+        query = select(func.coalesce(func.sum(cls.amount), 0)).where(cls.user_id == user_id)
+        return sa_session.scalar(query)
+
+    @classmethod
+    def max_id(cls, sa_session, user_id):
+        """
+        Return the id of the latest change recorded for the user with `user_id`.
+        """
+        return sa_session.scalar(select(func.max(cls.id)).where(cls.user_id == user_id))
+
+    @classmethod
+    def discard(cls, sa_session, user_id, max_id=None):
+        """
+        Remove the changes recorded for the user with `user_id`, only those with
+        an id up to `max_id` if it is given.
+        """
+        statement = cls.__table__.delete().where(cls.user_id == user_id)
+        if max_id is not None:
+            statement = statement.where(cls.id <= max_id)
+        sa_session.execute(statement)
+
+    @classmethod
+    def compact(cls, sa_session, user_id=None, batch_size=10000):
+        """
+        Add recorded changes to the disk usage of their users and remove them
+        from the ledger, `batch_size` changes per transaction.
+
+        Only changes of the user with `user_id` are compacted if it is given.
+
+        Several processes may compact concurrently: changes are claimed by
+        deleting them before they are applied and a batch of which another
+        compactor already claimed some changes is rolled back (rows locked by
+        another compactor are skipped where the database supports it).
+        """
+        user_table = User.__table__
+        query = select(cls.id, cls.user_id, cls.amount).order_by(cls.id).limit(batch_size)
+        if user_id is not None:
+            query = query.where(cls.user_id == user_id)
+        query = query.with_for_update(skip_locked=True)
+        while True:
+            try:
+                with sa_session.begin():
+                    entries = sa_session.execute(query).fetchall()
+                    if entries:
+                        ids = [entry.id for entry in entries]
+                        deleted = sa_session.execute(cls.__table__.delete().where(cls.id.in_(ids))).rowcount
+                        if deleted != len(entries):
+                            raise LedgerEntriesClaimedException()
+                    amounts: Dict[int, int] = {}
+                    for _, entry_user_id, amount in entries:
+                        amounts[entry_user_id] = amounts.get(entry_user_id, 0) + amount
+                    for entry_user_id, amount in amounts.items():
+                        sa_session.execute(user_table.update().where(user_table.c.id == entry_user_id).values(
+                            disk_usage=func.coalesce(user_table.c.disk_usage, 0) + amount))
+            except LedgerEntriesClaimedException:
+                log.debug("User disk usage ledger changes claimed by a concurrent compaction, stopping")
+                break
+            if len(entries) < batch_size:
+                break
+
+
 class APIKeys(Base, RepresentById):
     __tablename__ = 'api_keys'
 
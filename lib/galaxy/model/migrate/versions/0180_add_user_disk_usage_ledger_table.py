@@ -0,0 +1,48 @@
+"""
+Add user_disk_usage_ledger table recording changes to user disk usage.
+"""
+
+import logging
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Numeric,
+    Table,
+)
+
+from galaxy.model.migrate.versions.util import (
+    create_table,
+    drop_table,
+)
+from galaxy.model.orm.now import now
+
+log = logging.getLogger(__name__)
+metadata = MetaData()
+
+UserDiskUsageLedger_table = Table(
+    "user_disk_usage_ledger",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("create_time", DateTime, default=now),
+    Column("user_id", Integer, ForeignKey("galaxy_user.id"), index=True, nullable=False),
+    Column("amount", Numeric(15, 0), nullable=False),
+)
+
+
+def upgrade(migrate_engine):
+    print(__doc__)
+    metadata.bind = migrate_engine
+    metadata.reflect()
+
+    create_table(UserDiskUsageLedger_table)
+
+
+def downgrade(migrate_engine):
+    metadata.bind = migrate_engine
+    metadata.reflect()
+
+    drop_table(UserDiskUsageLedger_table)
@@ -13,6 +13,11 @@ from collections import (
 )
 from typing import Any, NamedTuple, Optional
 
+from sqlalchemy.orm import (
+    selectinload,
+    undefer,
+)
+
 import galaxy.model
 from galaxy import util
 from galaxy.exceptions import (
@@ -224,7 +229,6 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
                 if len(chunk) == self.flush_per_n_datasets:
                     # In most cases we don't need to flush, that happens in the caller.
                     # Only flush here for saving memory.
-                    root_collection_builder.populate_partial()
                     self.flush()
         else:
             self._populate_elements(chunk=filenames.items(), name=name, root_collection_builder=root_collection_builder, metadata_source_name=metadata_source_name, final_job_state=final_job_state)
@@ -296,6 +300,13 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
 
         add_datasets_timer = ExecutionTimer()
         self.add_datasets_to_history(element_datasets['datasets'])
+        # Add the chunk's collection elements before anything is flushed, so they
+        # are inserted in the same unit of work as the datasets, permissions and
+        # job output associations instead of in a later flush.
+        root_collection_builder.populate_partial()
+        if self.flush_per_n_datasets and self.flush_per_n_datasets > 0:
+            self.flush()
+            self.load_flushed_datasets(element_datasets['datasets'])
         self.update_object_store_with_datasets(datasets=element_datasets['datasets'], paths=element_datasets['paths'], extra_files=element_datasets['extra_files'])
         log.debug(
             "(%s) Add dynamic collection datasets to history for output [%s] %s",
@@ -310,6 +321,24 @@ class ModelPersistenceContext(metaclass=abc.ABCMeta):
             for dataset, tags in zip(datasets, tag_lists):
                 self.tag_handler.add_tags_from_list(self.job.user, dataset, tags, flush=False)
 
+    def load_flushed_datasets(self, datasets):
+        """Reload just flushed HDAs with a few bulk queries.
+
+        A flush expires every object in the session, so setting size and metadata
+        would otherwise reload each new HDA, its metadata and its converted
+        dataset associations one dataset at a time.
+        """
+        if self.sa_session is None:
+            return
+        hda_ids = [galaxy.model.cached_id(dataset) for dataset in datasets if isinstance(dataset, galaxy.model.HistoryDatasetAssociation)]
+        HDA = galaxy.model.HistoryDatasetAssociation
+        for chunk in chunk_iterable(hda_ids, size=DEFAULT_CHUNK_SIZE):
+            self.sa_session.query(HDA).filter(HDA.id.in_(chunk)).options(
+                undefer(HDA._metadata),
+                selectinload(HDA.implicitly_converted_datasets),
+                selectinload(HDA.implicitly_converted_parent_datasets),
+            ).all()
+
     def update_object_store_with_datasets(self, datasets, paths, extra_files):
         for dataset, path, extra_file in zip(datasets, paths, extra_files):
             self.object_store.update_from_file(dataset.dataset, file_name=path, create=True)
@@ -667,6 +696,11 @@ def persist_hdas(elements, model_persistence_context, final_job_state='ok'):
 
     collect_elements_for_history(elements)
     model_persistence_context.add_datasets_to_history(datasets)
+    if storage_callbacks:
+        # Write the new HDAs and their permissions in one flush and reload them
+        # in bulk before the callbacks set their sizes and metadata.
+        model_persistence_context.flush()
+        model_persistence_context.load_flushed_datasets(datasets)
     for callback in storage_callbacks:
         callback()
 
@@ -12,6 +12,7 @@ import random
 import shutil
 import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Type
 
 import yaml
@@ -21,6 +22,7 @@ from galaxy.util import (
     directory_hash_id,
     force_symlink,
     parse_xml,
+    string_as_bool,
     umask_fix_perms,
 )
 from galaxy.util.bunch import Bunch
@@ -31,6 +33,12 @@ from galaxy.util.path import (
 from galaxy.util.sleeper import Sleeper
 
 NO_SESSION_ERROR_MESSAGE = "Attempted to 'create' object store entity in configuration with no database session present."
+DEFAULT_LOCATION_CACHE_SIZE = 10000
+DEFAULT_LOCATION_CACHE_TTL = 60
+# Keyword arguments that select which file of an object is addressed.
+LOCATION_CACHE_KWDS = ('base_dir', 'dir_only', 'extra_dir', 'extra_dir_at_root', 'alt_name', 'obj_dir')
+# How long a sampled backend usage percentage is trusted when placing objects.
+USAGE_SAMPLE_TTL = 10
 
 log = logging.getLogger(__name__)
 
@@ -126,17 +134,23 @@ class ObjectStore(metaclass=abc.ABCMeta):
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def get_data(self, obj, start=0, count=-1, base_dir=None, extra_dir=None, extra_dir_at_root=False, alt_name=None, obj_dir=False):
+    def get_data(self, obj, start=0, count=-1, base_dir=None, extra_dir=None, extra_dir_at_root=False, alt_name=None, obj_dir=False, binary=False):
         """
         Fetch `count` bytes of data offset by `start` bytes using `obj.id`.
 
-        If the object does not exist raises `ObjectNotFound`.
+        If the object does not exist raises `ObjectNotFound`. Only the
+        requested range is read, object stores backed by remote storage
+        fetch it directly if the object is not already cached.
 
         :type start: int
         :param start: Set the position to start reading the dataset file
 
         :type count: int
         :param count: Read at most `count` bytes from the dataset
+
+        :type binary: bool
+        :param binary: If `True` return the raw bytes read, otherwise a
+                       string.
         """
         raise NotImplementedError()
 
@@ -586,13 +600,11 @@ class DiskObjectStore(ConcreteObjectStore):
             log.critical(f'{self.__get_filename(obj, **kwargs)} delete error {ex}')
         return False
 
-    def _get_data(self, obj, start=0, count=-1, **kwargs):
+    def _get_data(self, obj, start=0, count=-1, binary=False, **kwargs):
         """Override `ObjectStore`'s stub; retrieve data directly from disk."""
-        data_file = open(self._get_filename(obj, **kwargs))  # Should be rb?
-        data_file.seek(start)
-        content = data_file.read(count)
-        data_file.close()
-        return content
+        with open(self._get_filename(obj, **kwargs), 'rb' if binary else 'r') as data_file:
+            data_file.seek(start)
+            return data_file.read(count)
 
     def _get_filename(self, obj, **kwargs):
         """
@@ -646,6 +658,73 @@ class DiskObjectStore(ConcreteObjectStore):
         return (float(st.f_blocks - st.f_bavail) / st.f_blocks) * 100
 
 
+class ObjectLocationCache:
+
+    """
+    Bounded, expiring map from objects to the id of the backend holding them.
+
+    Only positive lookups are cached, entries expire after `ttl` seconds and
+    the least recently used objects are dropped once `maxsize` objects are
+    tracked. Setting either to 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=DEFAULT_LOCATION_CACHE_SIZE, ttl=DEFAULT_LOCATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._locations = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    @staticmethod
+    def _obj_key(obj):
+        obj_id = getattr(obj, 'id', None)
+        if obj_id is None:
+            return None
+        return (obj.__class__.__name__, obj_id)
+
+    def get(self, obj, **kwargs):
+        """Return the cached backend id for `obj` or None."""
+        obj_key = self._obj_key(obj)
+        if not self.enabled or obj_key is None:
+            return None
+        kwds_key = tuple(kwargs.get(k) for k in LOCATION_CACHE_KWDS)
+        with self._lock:
+            location = self._locations.get(obj_key, {}).get(kwds_key)
+            if location is not None and location[1] > time.time():
+                self._locations.move_to_end(obj_key)
+                self.hits += 1
+                return location[0]
+            self.misses += 1
+        return None
+
+    def set(self, obj, backend_id, **kwargs):
+        obj_key = self._obj_key(obj)
+        if not self.enabled or obj_key is None:
+            return
+        kwds_key = tuple(kwargs.get(k) for k in LOCATION_CACHE_KWDS)
+        with self._lock:
+            self._locations.setdefault(obj_key, {})[kwds_key] = (backend_id, time.time() + self.ttl)
+            self._locations.move_to_end(obj_key)
+            while len(self._locations) > self.maxsize:
+                self._locations.popitem(last=False)
+
+    def invalidate(self, obj):
+        obj_key = self._obj_key(obj)
+        if obj_key is not None:
+            with self._lock:
+                self._locations.pop(obj_key, None)
+
+
 class NestedObjectStore(BaseObjectStore):
 
     """
@@ -654,15 +733,38 @@ class NestedObjectStore(BaseObjectStore):
     Example: DistributedObjectStore, HierarchicalObjectStore
     """
 
-    def __init__(self, config, config_xml=None):
+    def __init__(self, config, config_dict=None):
         """Extend `ObjectStore`'s constructor."""
         super().__init__(config)
+        config_dict = config_dict or {}
         self.backends = {}
+        self.location_cache = ObjectLocationCache(
+            maxsize=config_dict.get('location_cache_size', DEFAULT_LOCATION_CACHE_SIZE),
+            ttl=config_dict.get('location_cache_ttl', DEFAULT_LOCATION_CACHE_TTL),
+        )
+
+    @staticmethod
+    def _parse_location_cache_xml(element):
+        config_dict = {}
+        if element.get('location_cache_size') is not None:
+            config_dict['location_cache_size'] = int(element.get('location_cache_size'))
+        if element.get('location_cache_ttl') is not None:
+            config_dict['location_cache_ttl'] = float(element.get('location_cache_ttl'))
+        return config_dict
+
+    def to_dict(self):
+        as_dict = super().to_dict()
+        as_dict["location_cache_size"] = self.location_cache.maxsize
+        as_dict["location_cache_ttl"] = self.location_cache.ttl
+        return as_dict
 
     def shutdown(self):
         """For each backend, shuts them down."""
         for store in self.backends.values():
             store.shutdown()
+        if self.location_cache.enabled:
+            log.debug("Object store location cache: %s hits, %s misses (hit rate %.2f)",
+                      self.location_cache.hits, self.location_cache.misses, self.location_cache.hit_rate)
         super().shutdown()
 
     def _exists(self, obj, **kwargs):
@@ -675,6 +777,7 @@ class NestedObjectStore(BaseObjectStore):
 
     def _create(self, obj, **kwargs):
         """Create a backing file in a random backend."""
+        self.location_cache.invalidate(obj)
         random.choice(list(self.backends.values())).create(obj, **kwargs)
 
     def _empty(self, obj, **kwargs):
@@ -687,7 +790,10 @@ class NestedObjectStore(BaseObjectStore):
 
     def _delete(self, obj, **kwargs):
         """For the first backend that has this `obj`, delete it."""
-        return self._call_method('_delete', obj, False, False, **kwargs)
+        try:
+            return self._call_method('_delete', obj, False, False, **kwargs)
+        finally:
+            self.location_cache.invalidate(obj)
 
     def _get_data(self, obj, **kwargs):
         """For the first backend that has this `obj`, get data from it."""
@@ -699,6 +805,7 @@ class NestedObjectStore(BaseObjectStore):
 
     def _update_from_file(self, obj, **kwargs):
         """For the first backend that has this `obj`, update it from the given file."""
+        self.location_cache.invalidate(obj)
         if kwargs.get('create', False):
             self._create(obj, **kwargs)
             kwargs['create'] = False
@@ -725,12 +832,34 @@ class NestedObjectStore(BaseObjectStore):
         except AttributeError:
             return str(obj)
 
+    def _cached_location(self, obj, **kwargs):
+        """
+        Return the cached id of the backend holding `obj` if the object is
+        still there, otherwise drop the cache entry and return None.
+        """
+        backend_id = self.location_cache.get(obj, **kwargs)
+        if backend_id is not None and not self.backends[backend_id].exists(obj, **kwargs):
+            # Moved or removed by another process since it was cached.
+            self.location_cache.invalidate(obj)
+            backend_id = None
+        return backend_id
+
+    def _locate(self, obj, **kwargs):
+        """Return the id of the first backend holding `obj` (or None)."""
+        for backend_id, store in self.backends.items():
+            if store.exists(obj, **kwargs):
+                self.location_cache.set(obj, backend_id, **kwargs)
+                return backend_id
+        return None
+
     def _call_method(self, method, obj, default, default_is_exception,
             **kwargs):
         """Check all children object stores for the first one with the dataset."""
-        for store in self.backends.values():
-            if store.exists(obj, **kwargs):
-                return store.__getattribute__(method)(obj, **kwargs)
+        backend_id = self._cached_location(obj, **kwargs)
+        if backend_id is None:
+            backend_id = self._locate(obj, **kwargs)
+        if backend_id is not None:
+            return self.backends[backend_id].__getattribute__(method)(obj, **kwargs)
         if default_is_exception:
             raise default('objectstore, _call_method failed: %s on %s, kwargs: %s'
                           % (method, self._repr_object_for_exception(obj), str(kwargs)))
@@ -745,7 +874,8 @@ class DistributedObjectStore(NestedObjectStore):
 
     When getting objects the first store where the object exists is used.
     When creating objects they are created in a store selected randomly, but
-    with weighting.
+    with weighting. If `weight_by_free_space` is set, each backend's weight
+    is further scaled by its free space.
     """
     store_type = 'distributed'
 
@@ -771,6 +901,9 @@ class DistributedObjectStore(NestedObjectStore):
         self.original_weighted_backend_ids = []
         self.max_percent_full = {}
         self.global_max_percent_full = config_dict.get("global_max_percent_full", 0)
+        self.weight_by_free_space = config_dict.get("weight_by_free_space", False)
+        # backend id -> (usage percent, time sampled)
+        self.backend_usage: Dict[str, Any] = {}
         random.seed()
 
         for backend_def in config_dict["backends"]:
@@ -792,7 +925,8 @@ class DistributedObjectStore(NestedObjectStore):
         self.original_weighted_backend_ids = self.weighted_backend_ids
 
         self.sleeper = None
-        if fsmon and (self.global_max_percent_full or [_ for _ in self.max_percent_full.values() if _ != 0.0]):
+        self.monitor_usage = bool(fsmon and (self.global_max_percent_full or [_ for _ in self.max_percent_full.values() if _ != 0.0]))
+        if self.monitor_usage:
             self.sleeper = Sleeper()
             self.filesystem_monitor_thread = threading.Thread(target=self.__filesystem_monitor, args=[self.sleeper])
             self.filesystem_monitor_thread.daemon = True
@@ -809,8 +943,10 @@ class DistributedObjectStore(NestedObjectStore):
         backends: List[Dict[str, Any]] = []
         config_dict = {
             'global_max_percent_full': float(backends_root.get('maxpctfull', 0)),
+            'weight_by_free_space': string_as_bool(backends_root.get('weight_by_free_space', False)),
             'backends': backends,
         }
+        config_dict.update(clazz._parse_location_cache_xml(backends_root))
 
         for b in [e for e in backends_root if e.tag == 'backend']:
             store_id = b.get("id")
@@ -853,6 +989,7 @@ class DistributedObjectStore(NestedObjectStore):
     def to_dict(self) -> Dict[str, Any]:
         as_dict = super().to_dict()
         as_dict["global_max_percent_full"] = self.global_max_percent_full
+        as_dict["weight_by_free_space"] = self.weight_by_free_space
         backends: List[Dict[str, Any]] = []
         for backend_id, backend in self.backends.items():
             backend_as_dict = backend.to_dict()
@@ -872,20 +1009,61 @@ class DistributedObjectStore(NestedObjectStore):
     def __filesystem_monitor(self, sleeper: Sleeper):
         while self.running:
             new_weighted_backend_ids = self.original_weighted_backend_ids
-            for id, backend in self.backends.items():
+            for id in self.backends:
                 maxpct = self.max_percent_full[id] or self.global_max_percent_full
-                pct = backend.get_store_usage_percent()
+                pct = self._sample_usage(id)
                 if pct > maxpct:
                     new_weighted_backend_ids = [_ for _ in new_weighted_backend_ids if _ != id]
             self.weighted_backend_ids = new_weighted_backend_ids
             sleeper.sleep(120)  # Test free space every 2 minutes
 
+    def _sample_usage(self, backend_id):
+        pct = self.backends[backend_id].get_store_usage_percent()
+        self.backend_usage[backend_id] = (pct, time.time())
+        return pct
+
+    def _usage(self, backend_id):
+        """Return the usage percent of a backend, resampling stale values."""
+        usage = self.backend_usage.get(backend_id)
+        if usage is None or time.time() - usage[1] > USAGE_SAMPLE_TTL:
+            try:
+                return self._sample_usage(backend_id)
+            except Exception:
+                log.exception("Failed to sample usage of backend object store '%s'", backend_id)
+                return usage[0] if usage else 0.0
+        return usage[0]
+
+    def _over_limit(self, backend_id, pct):
+        maxpct = self.max_percent_full[backend_id] or self.global_max_percent_full
+        return bool(maxpct) and pct > maxpct
+
+    def _select_backend_id(self):
+        """Pick a backend for a new object.
+
+        Between monitor ticks backends that have gone over their limit are
+        skipped using recently sampled usage, so that they do not keep
+        receiving writes for up to the whole monitor interval.
+        """
+        backend_ids = self.weighted_backend_ids
+        if not (self.monitor_usage or self.weight_by_free_space):
+            return random.choice(backend_ids)
+        usage = {id: self._usage(id) for id in set(backend_ids)}
+        if self.monitor_usage:
+            backend_ids = [id for id in backend_ids if not self._over_limit(id, usage[id])]
+        if not self.weight_by_free_space:
+            return random.choice(backend_ids)
+        weights = [max(100.0 - usage[id], 0.0) for id in backend_ids]
+        if not any(weights):
+            raise IndexError("No backend object store with free space")
+        return random.choices(backend_ids, weights=weights)[0]
+
     def _create(self, obj, **kwargs):
         """The only method in which obj.object_store_id may be None."""
+        self.location_cache.invalidate(obj)
         if obj.object_store_id is None or not self._exists(obj, **kwargs):
             if obj.object_store_id is None or obj.object_store_id not in self.backends:
                 try:
-                    obj.object_store_id = random.choice(self.weighted_backend_ids)
+                    obj.object_store_id = self._select_backend_id()
                 except IndexError:
                     raise ObjectInvalid('objectstore.create, could not generate '
                                         'obj.object_store_id: %s, kwargs: %s'
@@ -917,13 +1095,15 @@ class DistributedObjectStore(NestedObjectStore):
         # if this instance has been switched from a non-distributed to a
         # distributed object store, or if the object's store id is invalid,
         # try to locate the object
-        for id, store in self.backends.items():
-            if store.exists(obj, **kwargs):
+        id = self._cached_location(obj, **kwargs)
+        if id is None:
+            id = self._locate(obj, **kwargs)
+            if id is not None:
                 log.warning('%s object with ID %s found in backend object store with ID %s'
                             % (obj.__class__.__name__, obj.id, id))
-                obj.object_store_id = id
-                return id
-        return None
+        if id is not None:
+            obj.object_store_id = id
+        return id
 
 
 class HierarchicalObjectStore(NestedObjectStore):
@@ -949,14 +1129,17 @@ class HierarchicalObjectStore(NestedObjectStore):
     @classmethod
     def parse_xml(clazz, config_xml):
         backends_list = []
-        for b in sorted(config_xml.find('backends'), key=lambda b: int(b.get('order'))):
+        backends_root = config_xml.find('backends')
+        for b in sorted(backends_root, key=lambda b: int(b.get('order'))):
             store_type = b.get("type")
             objectstore_class, _ = type_to_object_store_class(store_type)
             backend_config_dict = objectstore_class.parse_xml(b)
             backend_config_dict["type"] = store_type
             backends_list.append(backend_config_dict)
 
-        return {"backends": backends_list}
+        config_dict = {"backends": backends_list}
+        config_dict.update(clazz._parse_location_cache_xml(backends_root))
+        return config_dict
 
     def to_dict(self):
         as_dict = super().to_dict()
@@ -969,13 +1152,13 @@ class HierarchicalObjectStore(NestedObjectStore):
 
     def _exists(self, obj, **kwargs):
         """Check all child object stores."""
-        for store in self.backends.values():
-            if store.exists(obj, **kwargs):
-                return True
-        return False
+        if self._cached_location(obj, **kwargs) is not None:
+            return True
+        return self._locate(obj, **kwargs) is not None
 
     def _create(self, obj, **kwargs):
         """Call the primary object store."""
+        self.location_cache.invalidate(obj)
         self.backends[0].create(obj, **kwargs)
 
 
@@ -5,8 +5,6 @@ Object Store plugin for the Microsoft Azure Block Blob Storage system
 import logging
 import os
 import shutil
-import threading
-import time
 from datetime import datetime
 
 try:
@@ -23,14 +21,12 @@ from galaxy.exceptions import (
 )
 from galaxy.util import (
     directory_hash_id,
-    umask_fix_perms
+    umask_fix_perms,
+    unicodify,
 )
 from galaxy.util.path import safe_relpath
-from galaxy.util.sleeper import Sleeper
-from ..objectstore import (
-    ConcreteObjectStore,
-    convert_bytes,
-)
+from .caching import CacheTrackingMixin
+from ..objectstore import ConcreteObjectStore
 
 NO_BLOBSERVICE_ERROR_MESSAGE = ("ObjectStore configured, but no azure.storage.blob dependency available."
                                 "Please install and properly configure azure.storage.blob or modify Object Store configuration.")
@@ -51,6 +47,7 @@ def parse_config_xml(config_xml):
 
         c_xml = config_xml.findall('cache')[0]
         cache_size = float(c_xml.get('size', -1))
+        cache_reconcile_interval = int(c_xml.get('reconcile_interval', 0))
         staging_path = c_xml.get('path', None)
 
         tag, attrs = 'extra_dir', ('type', 'path')
@@ -72,6 +69,7 @@ def parse_config_xml(config_xml):
             'cache': {
                 'size': cache_size,
                 'path': staging_path,
+                'reconcile_interval': cache_reconcile_interval,
             },
             'extra_dirs': extra_dirs,
         }
@@ -81,7 +79,7 @@ def parse_config_xml(config_xml):
         raise
 
 
-class AzureBlobObjectStore(ConcreteObjectStore):
+class AzureBlobObjectStore(ConcreteObjectStore, CacheTrackingMixin):
     """
     Object store that stores objects as blobs in an Azure Blob Container. A local
     cache exists that is used as an intermediate location for files between
@@ -106,6 +104,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
 
         self.cache_size = cache_dict.get('size', -1)
         self.staging_path = cache_dict.get('path') or self.config.object_store_cache_path
+        self.cache_reconcile_interval = cache_dict.get('reconcile_interval', 0)
 
         self._initialize()
 
@@ -117,13 +116,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
 
         # Clean cache only if value is set in galaxy.ini
         if self.cache_size != -1:
-            # Convert GBs to bytes for comparison
-            self.cache_size = self.cache_size * 1073741824
-            # Helper for interruptable sleep
-            self.sleeper = Sleeper()
-            self.cache_monitor_thread = threading.Thread(target=self.__cache_monitor)
-            self.cache_monitor_thread.start()
-            log.info("Cache cleaner manager started")
+            self._start_cache_monitor()
 
     def to_dict(self):
         as_dict = super().to_dict()
@@ -139,6 +132,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
             'cache': {
                 'size': self.cache_size,
                 'path': self.staging_path,
+                'reconcile_interval': self.cache_reconcile_interval,
             }
         })
         return as_dict
@@ -247,13 +241,29 @@ class AzureBlobObjectStore(ConcreteObjectStore):
         if not os.path.exists(self._get_cache_path(rel_path_dir)):
             os.makedirs(self._get_cache_path(rel_path_dir))
         # Now pull in the file
+        self._record_cache_miss(rel_path)
         file_ok = self._download(rel_path)
+        if file_ok:
+            self._record_cached(rel_path)
         self._fix_permissions(self._get_cache_path(rel_path_dir))
         return file_ok
 
     def _transfer_cb(self, complete, total):
         self.transfer_progress = float(complete) / float(total) * 100  # in percent
 
+    def _get_range(self, rel_path, start, count):
+        if count == 0:
+            return b''
+        end = None if count < 0 else start + count - 1
+        try:
+            return self.service.get_blob_to_bytes(self.container_name, rel_path, start_range=start, end_range=end).content
+        except AzureHttpError as e:
+            if e.status_code == 416:
+                # Requested range starts past the end of the blob.
+                return b''
+            log.exception("Problem reading '%s' from Azure", rel_path)
+            raise ObjectNotFound(f"objectstore.get_data, could not read blob: {rel_path}")
+
     def _download(self, rel_path):
         local_destination = self._get_cache_path(rel_path)
         try:
@@ -392,6 +402,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
                 rel_path = os.path.join(rel_path, alt_name if alt_name else f"dataset_{self._get_object_id(obj)}.dat")
                 open(os.path.join(self.staging_path, rel_path), 'w').close()
                 self._push_to_os(rel_path, from_string='')
+                self._record_cached(rel_path)
 
     def _empty(self, obj, **kwargs):
         if self._exists(obj, **kwargs):
@@ -429,6 +440,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
             # but requires iterating through each individual blob in Azure and deleing it.
             if entire_dir and extra_dir:
                 shutil.rmtree(self._get_cache_path(rel_path))
+                self._record_uncached(rel_path)
                 blobs = self.service.list_blobs(self.container_name, prefix=rel_path)
                 for blob in blobs:
                     log.debug("Deleting from Azure: %s", blob)
@@ -437,6 +449,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
             else:
                 # Delete from cache first
                 os.unlink(self._get_cache_path(rel_path))
+                self._record_uncached(rel_path)
                 # Delete from S3 as well
                 if self._in_azure(rel_path):
                     log.debug("Deleting from Azure: %s", rel_path)
@@ -448,17 +461,18 @@ class AzureBlobObjectStore(ConcreteObjectStore):
             log.exception('%s delete error', self._get_filename(obj, **kwargs))
         return False
 
-    def _get_data(self, obj, start=0, count=-1, **kwargs):
+    def _get_data(self, obj, start=0, count=-1, binary=False, **kwargs):
         rel_path = self._construct_path(obj, **kwargs)
-        # Check cache first and get file if not there
+        # Read from the cache if the file is there, otherwise fetch just the
+        # requested range rather than pulling the whole object into cache.
         if not self._in_cache(rel_path):
-            self._pull_into_cache(rel_path)
-        # Read the file content from cache
-        data_file = open(self._get_cache_path(rel_path))
-        data_file.seek(start)
-        content = data_file.read(count)
-        data_file.close()
-        return content
+            self._record_cache_miss(rel_path)
+            content = self._get_range(rel_path, start, count)
+            return content if binary else unicodify(content)
+        self._record_cache_hit(rel_path)
+        with open(self._get_cache_path(rel_path), 'rb' if binary else 'r') as data_file:
+            data_file.seek(start)
+            return data_file.read(count)
 
     def _get_filename(self, obj, **kwargs):
         rel_path = self._construct_path(obj, **kwargs)
@@ -481,6 +495,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
         #     return cache_path
         # Check if the file exists in the cache first
         if self._in_cache(rel_path):
+            self._record_cache_hit(rel_path)
             return cache_path
         # Check if the file exists in persistent storage and, if it does, pull it into cache
         elif self._exists(obj, **kwargs):
@@ -516,6 +531,7 @@ class AzureBlobObjectStore(ConcreteObjectStore):
                 source_file = self._get_cache_path(rel_path)
 
             self._push_to_os(rel_path, source_file)
+            self._record_cached(rel_path)
 
         else:
             raise ObjectNotFound(f'objectstore.update_from_file, object does not exist: {str(obj)}, kwargs: {str(kwargs)}')
@@ -533,53 +549,6 @@ class AzureBlobObjectStore(ConcreteObjectStore):
     def _get_store_usage_percent(self):
         return 0.0
 
-    ##################
-    # Secret Methods #
-    ##################
-
-    def __cache_monitor(self):
-        time.sleep(2)  # Wait for things to load before starting the monitor
-        while self.running:
-            total_size = 0
-            # Is this going to be too expensive of an operation to be done frequently?
-            file_list = []
-            for dirpath, _, filenames in os.walk(self.staging_path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    file_size = os.path.getsize(filepath)
-                    total_size += file_size
-                    # Get the time given file was last accessed
-                    last_access_time = time.localtime(os.stat(filepath)[7])
-                    # Compose a tuple of the access time and the file path
-                    file_tuple = last_access_time, filepath, file_size
-                    file_list.append(file_tuple)
-            # Sort the file list (based on access time)
-            file_list.sort()
-            # Initiate cleaning once within 10% of the defined cache size?
-            cache_limit = self.cache_size * 0.9
-            if total_size > cache_limit:
-                log.info("Initiating cache cleaning: current cache size: %s; clean until smaller than: %s",
-                         convert_bytes(total_size), convert_bytes(cache_limit))
-                # How much to delete? If simply deleting up to the cache-10% limit,
-                # is likely to be deleting frequently and may run the risk of hitting
-                # the limit - maybe delete additional #%?
-                # For now, delete enough to leave at least 10% of the total cache free
-                delete_this_much = total_size - cache_limit
-                # Keep deleting datasets from file_list until deleted_amount does not
-                # exceed delete_this_much; start deleting from the front of the file list,
-                # which assumes the oldest files come first on the list.
-                deleted_amount = 0
-                for entry in enumerate(file_list):
-                    if deleted_amount < delete_this_much:
-                        deleted_amount += entry[2]
-                        os.remove(entry[1])
-                        # Debugging code for printing deleted files' stats
-                        # folder, file_name = os.path.split(f[1])
-                        # file_date = time.strftime("%m/%d/%y %H:%M:%S", f[0])
-                        # log.debug("%s. %-25s %s, size %s (deleted %s/%s)" \
-                        #     % (i, file_name, convert_bytes(f[2]), file_date, \
-                        #     convert_bytes(deleted_amount), convert_bytes(delete_this_much)))
-                    else:
-                        log.debug("Cache cleaning done. Total space freed: %s", convert_bytes(deleted_amount))
-
-            self.sleeper.sleep(30)  # Test cache size every 30 seconds?
+    def shutdown(self):
+        super().shutdown()
+        self._stop_cache_monitor()
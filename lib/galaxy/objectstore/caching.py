@@ -0,0 +1,377 @@
+"""Shared management of the local file caches used by cloud object stores.
+
+Rather than walking and stat'ing the whole cache directory on every pass,
+cached files are tracked in a small SQLite index (path, size and last access
+time) kept next to the cached data. Eviction walks the index in last access
+order and a trigger maintained running total gives the cache size in
+constant time.
+
+Cache hits only update access times in memory, the monitor writes them to
+the index in a single transaction on each pass. Files can land in the cache
+without going through the index (job outputs written by other processes or
+hosts, extra files, a stale index). If configured with a reconcile interval,
+the monitor of a single process reconciles the index against the directory.
+The index uses SQLite's default rollback journal rather than WAL, which
+requires shared memory and is unsafe when the cache directory is on a
+network filesystem shared between hosts.
+"""
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from galaxy.util.sleeper import Sleeper
+from ..objectstore import convert_bytes
+
+log = logging.getLogger(__name__)
+
+CACHE_INDEX_FILENAME = ".galaxy_cache_index.sqlite"
+# Start cleaning once the cache goes above the high watermark and stop once
+# it is back under the low watermark (both fractions of the cache size).
+CACHE_HIGH_WATERMARK = 0.9
+CACHE_LOW_WATERMARK = 0.8
+CACHE_MONITOR_INTERVAL = 30
+# Held by the process reconciling the index, named after the index so cache walks skip it.
+CACHE_RECONCILE_LOCK_FILENAME = f"{CACHE_INDEX_FILENAME}-reconcile.lock"
+EVICTION_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entry_last_access ON cache_entry (last_access);
+CREATE TABLE IF NOT EXISTS cache_total (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_total (id, size) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_total SET size = size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_total SET size = size - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update AFTER UPDATE OF size ON cache_entry BEGIN
+    UPDATE cache_total SET size = size - OLD.size + NEW.size WHERE id = 0;
+END;
+"""
+
+
+class CacheIndex:
+    """Persistent index of the files held in an object store cache directory.
+
+    Paths are stored relative to the cache directory. The index is created
+    in the cache directory itself and is populated by a single walk of the
+    directory the first time it is created.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = os.path.abspath(cache_path)
+        self.index_path = os.path.join(self.cache_path, CACHE_INDEX_FILENAME)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Access times of cache hits not yet written to the index
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+        needs_rebuild = not os.path.exists(self.index_path)
+        self._conn = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False, isolation_level=None)
+        # journal mode is persistent, switch back indexes created in WAL mode
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(SCHEMA)
+        if needs_rebuild:
+            self.rebuild()
+
+    def _relpath(self, path):
+        return os.path.relpath(os.path.abspath(path), self.cache_path)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetchall(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _walk(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_path):
+            for filename in filenames:
+                if filename.startswith(CACHE_INDEX_FILENAME):
+                    continue
+                filepath = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    continue
+                entries.append((self._relpath(filepath), stat.st_size, stat.st_atime))
+        return entries
+
+    def rebuild(self):
+        """Replace the index contents with the files currently on disk."""
+        entries = self._walk()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM cache_entry")
+                self._conn.execute("UPDATE cache_total SET size = 0 WHERE id = 0")
+                self._conn.executemany("INSERT OR REPLACE INTO cache_entry (path, size, last_access) VALUES (?, ?, ?)", entries)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        log.debug("Indexed %s files in object store cache %s", len(entries), self.cache_path)
+
+    def reconcile(self):
+        """Bring the index in line with the files currently on disk.
+
+        Files missing from the index are added, entries for files no longer on
+        disk are dropped and changed sizes are updated. The recorded access
+        times of indexed files are kept.
+        """
+        on_disk = {path: (size, atime) for path, size, atime in self._walk()}
+        indexed = {path: size for path, size in self._fetchall("SELECT path, size FROM cache_entry")}
+        added = [(path, size, atime) for path, (size, atime) in on_disk.items() if path not in indexed]
+        removed = [(path,) for path in indexed if path not in on_disk]
+        resized = [(on_disk[path][0], path) for path, size in indexed.items()
+                   if path in on_disk and on_disk[path][0] != size]
+        if not (added or removed or resized):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO cache_entry (path, size, last_access) VALUES (?, ?, ?)", added)
+                self._conn.executemany("DELETE FROM cache_entry WHERE path = ?", removed)
+                self._conn.executemany("UPDATE cache_entry SET size = ? WHERE path = ?", resized)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        log.debug("Reconciled object store cache index %s: %s added, %s removed, %s resized",
+                  self.cache_path, len(added), len(removed), len(resized))
+
+    def record(self, path):
+        """Add or refresh the entry for ``path`` after it was written to the cache."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self._execute(
+            "INSERT INTO cache_entry (path, size, last_access) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET size = excluded.size, last_access = excluded.last_access",
+            (self._relpath(path), size, time.time())
+        )
+
+    def hit(self, path):
+        """Mark ``path`` as just accessed from the cache.
+
+        The access time is written to the index by :meth:`flush`.
+        """
+        with self._accessed_lock:
+            self.hits += 1
+            self._accessed[self._relpath(path)] = time.time()
+
+    def flush(self):
+        """Write the access times of cache hits to the index."""
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+        if not accessed:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for rel_path, last_access in accessed.items():
+                    updated = self._conn.execute("UPDATE cache_entry SET last_access = ? WHERE path = ?", (last_access, rel_path)).rowcount
+                    if updated == 0:
+                        # Written to the cache without going through the object store.
+                        try:
+                            size = os.path.getsize(os.path.join(self.cache_path, rel_path))
+                        except OSError:
+                            continue
+                        self._conn.execute("INSERT OR IGNORE INTO cache_entry (path, size, last_access) VALUES (?, ?, ?)",
+                                           (rel_path, size, last_access))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def miss(self):
+        self.misses += 1
+
+    def remove(self, path):
+        """Drop ``path`` (a file or a directory) from the index."""
+        rel_path = self._relpath(path)
+        prefix = f"{rel_path}/"
+        with self._accessed_lock:
+            self._accessed = {p: t for p, t in self._accessed.items() if p != rel_path and not p.startswith(prefix)}
+        self._execute("DELETE FROM cache_entry WHERE path = ? OR substr(path, 1, ?) = ?", (rel_path, len(prefix), prefix))
+
+    def total_size(self):
+        return self._fetchall("SELECT size FROM cache_total WHERE id = 0")[0][0]
+
+    def evict(self, target_size):
+        """Delete least recently used files until the cache holds at most
+        ``target_size`` bytes. Return the number of bytes freed.
+        """
+        freed = 0
+        total_size = self.total_size()
+        while total_size > target_size:
+            rows = self._fetchall(
+                "SELECT path, size FROM cache_entry ORDER BY last_access LIMIT ?", (EVICTION_BATCH_SIZE,)
+            )
+            if not rows:
+                break
+            evicted = []
+            for rel_path, size in rows:
+                if total_size <= target_size:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_path, rel_path))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    log.exception("Failed to remove cached file %s", rel_path)
+                    continue
+                evicted.append((rel_path,))
+                total_size -= size
+                freed += size
+            if not evicted:
+                break
+            with self._lock:
+                self._conn.executemany("DELETE FROM cache_entry WHERE path = ?", evicted)
+            self.evictions += len(evicted)
+        return freed
+
+    def close(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Failed to write cache access times to index %s", self.index_path)
+        with self._lock:
+            self._conn.close()
+
+
+class CacheMonitor:
+    """Evict files from a :class:`CacheIndex` in a background thread.
+
+    If ``reconcile_interval`` is set, the index is reconciled with the cache
+    directory on the first pass and then every ``reconcile_interval`` seconds
+    by the monitor holding the reconcile lock of the cache directory.
+    """
+
+    def __init__(self, cache_index, cache_size, interval=CACHE_MONITOR_INTERVAL, reconcile_interval=0):
+        self.cache_index = cache_index
+        self.cache_size = cache_size
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.last_reconcile = None
+        self._reconcile_lock_fd = None
+        self.running = False
+        self.sleeper = Sleeper()
+        self.thread = threading.Thread(target=self._monitor, name="CacheMonitor", daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def shutdown(self):
+        self.running = False
+        self.sleeper.wake()
+        if self.thread.is_alive():
+            self.thread.join(5)
+        if self._reconcile_lock_fd is not None:
+            os.close(self._reconcile_lock_fd)
+            self._reconcile_lock_fd = None
+
+    def _monitor(self):
+        time.sleep(2)  # Wait for things to load before starting the monitor
+        while self.running:
+            try:
+                self.clean()
+            except Exception:
+                log.exception("Failed to clean object store cache %s", self.cache_index.cache_path)
+            self.sleeper.sleep(self.interval)
+
+    def _acquire_reconcile_lock(self):
+        """Return True if this process holds the reconcile lock, which is kept until it exits."""
+        if self._reconcile_lock_fd is None:
+            fd = os.open(os.path.join(self.cache_index.cache_path, CACHE_RECONCILE_LOCK_FILENAME), os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._reconcile_lock_fd = fd
+        return True
+
+    def clean(self):
+        self.cache_index.flush()
+        now = time.time()
+        if self.reconcile_interval and (self.last_reconcile is None or now - self.last_reconcile >= self.reconcile_interval):
+            self.last_reconcile = now
+            if self._acquire_reconcile_lock():
+                self.cache_index.reconcile()
+        total_size = self.cache_index.total_size()
+        if total_size > self.cache_size * CACHE_HIGH_WATERMARK:
+            cache_limit = self.cache_size * CACHE_LOW_WATERMARK
+            log.info("Initiating cache cleaning: current cache size: %s; clean until smaller than: %s",
+                     convert_bytes(total_size), convert_bytes(cache_limit))
+            freed = self.cache_index.evict(cache_limit)
+            log.debug("Cache cleaning done. Total space freed: %s", convert_bytes(freed))
+        log.debug("Object store cache %s: hits %s, misses %s, evictions %s", self.cache_index.cache_path,
+                  self.cache_index.hits, self.cache_index.misses, self.cache_index.evictions)
+
+
+class CacheTrackingMixin:
+    """Hooks used by cache backed object stores to keep a :class:`CacheIndex`
+    up to date. Stores set ``cache_size`` (in gigabytes), ``staging_path``
+    and optionally ``cache_reconcile_interval`` (in seconds). Failures to
+    update the index are logged, they must not fail dataset access.
+    """
+
+    cache_index = None
+    cache_monitor = None
+    cache_reconcile_interval = 0
+
+    def _start_cache_monitor(self):
+        # Convert GBs to bytes for comparison
+        self.cache_size = self.cache_size * 1073741824
+        self.cache_index = CacheIndex(self.staging_path)
+        self.cache_monitor = CacheMonitor(self.cache_index, self.cache_size, reconcile_interval=self.cache_reconcile_interval)
+        self.cache_monitor.start()
+        log.info("Cache cleaner manager started")
+
+    def _stop_cache_monitor(self):
+        if self.cache_monitor:
+            log.debug("Shutting down thread")
+            self.cache_monitor.shutdown()
+            self.cache_index.close()
+
+    def _record_cache_hit(self, rel_path):
+        if self.cache_index:
+            self.cache_index.hit(self._get_cache_path(rel_path))
+
+    def _record_cache_miss(self, rel_path):
+        if self.cache_index:
+            self.cache_index.miss()
+
+    def _record_cached(self, rel_path):
+        if self.cache_index:
+            try:
+                self.cache_index.record(self._get_cache_path(rel_path))
+            except Exception:
+                log.exception("Failed to add %s to the index of object store cache %s", rel_path, self.staging_path)
+
+    def _record_uncached(self, rel_path):
+        if self.cache_index:
+            try:
+                self.cache_index.remove(self._get_cache_path(rel_path))
+            except Exception:
+                log.exception("Failed to remove %s from the index of object store cache %s", rel_path, self.staging_path)
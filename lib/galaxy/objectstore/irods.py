@@ -582,14 +582,14 @@ class IRODSObjectStore(DiskObjectStore, CloudConfigMixin):
             log.debug("irods_pt _delete: %s", ipt_timer)
         return False
 
-    def _get_data(self, obj, start=0, count=-1, **kwargs):
+    def _get_data(self, obj, start=0, count=-1, binary=False, **kwargs):
         ipt_timer = ExecutionTimer()
         rel_path = self._construct_path(obj, **kwargs)
         # Check cache first and get file if not there
         if not self._in_cache(rel_path):
             self._pull_into_cache(rel_path)
         # Read the file content from cache
-        data_file = open(self._get_cache_path(rel_path))
+        data_file = open(self._get_cache_path(rel_path), 'rb' if binary else 'r')
         data_file.seek(start)
         content = data_file.read(count)
         data_file.close()
@@ -349,7 +349,7 @@ class PithosObjectStore(ConcreteObjectStore):
             log.exception(f'Could not delete {path} from Pithos, {ce}')
         return False
 
-    def _get_data(self, obj, start=0, count=-1, **kwargs):
+    def _get_data(self, obj, start=0, count=-1, binary=False, **kwargs):
         """Fetch (e.g., download) data
         :param start: Chunk of data starts here
         :param count: Fetch at most as many data, fetch all if negative
@@ -359,7 +359,7 @@ class PithosObjectStore(ConcreteObjectStore):
             cache_path = self._pull_into_cache(path)
         else:
             cache_path = self._get_cache_path(path)
-        data_file = open(cache_path)
+        data_file = open(cache_path, 'rb' if binary else 'r')
         data_file.seek(start)
         content = data_file.read(count)
         data_file.close()
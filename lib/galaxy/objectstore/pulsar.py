@@ -43,8 +43,11 @@ class PulsarObjectStore(BaseObjectStore):
         return self.pulsar_client.delete(**self.__build_kwds(obj, **kwds))
 
     # TODO: Optimize get_data.
-    def _get_data(self, obj, **kwds):
-        return self.pulsar_client.get_data(**self.__build_kwds(obj, **kwds))
+    def _get_data(self, obj, binary=False, **kwds):
+        content = self.pulsar_client.get_data(**self.__build_kwds(obj, **kwds))
+        if binary and isinstance(content, str):
+            content = content.encode('utf-8')
+        return content
 
     def _get_filename(self, obj, **kwds):
         return self.pulsar_client.get_filename(**self.__build_kwds(obj, **kwds))
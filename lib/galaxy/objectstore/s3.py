@@ -6,7 +6,6 @@ import multiprocessing
 import os
 import shutil
 import subprocess
-import threading
 import time
 from datetime import datetime
 
@@ -24,12 +23,17 @@ from galaxy.util import (
     directory_hash_id,
     string_as_bool,
     umask_fix_perms,
+    unicodify,
     which,
 )
 from galaxy.util.path import safe_relpath
-from galaxy.util.sleeper import Sleeper
-from .s3_multipart_upload import multipart_upload
-from ..objectstore import ConcreteObjectStore, convert_bytes
+from .caching import CacheTrackingMixin
+from .s3_multipart_upload import (
+    DEFAULT_TRANSFER_THREADS,
+    multipart_download,
+    multipart_upload,
+)
+from ..objectstore import ConcreteObjectStore
 
 NO_BOTO_ERROR_MESSAGE = ("S3/Swift object store configured, but no boto dependency available."
                          "Please install and properly configure boto or modify object store configuration.")
@@ -58,11 +62,13 @@ def parse_config_xml(config_xml):
         host = cn_xml.get('host', None)
         port = int(cn_xml.get('port', 6000))
         multipart = string_as_bool(cn_xml.get('multipart', 'True'))
+        transfer_threads = int(cn_xml.get('transfer_threads', DEFAULT_TRANSFER_THREADS))
         is_secure = string_as_bool(cn_xml.get('is_secure', 'True'))
         conn_path = cn_xml.get('conn_path', '/')
 
         c_xml = config_xml.findall('cache')[0]
         cache_size = float(c_xml.get('size', -1))
+        cache_reconcile_interval = int(c_xml.get('reconcile_interval', 0))
 
         staging_path = c_xml.get('path', None)
 
@@ -88,12 +94,14 @@ def parse_config_xml(config_xml):
                 'host': host,
                 'port': port,
                 'multipart': multipart,
+                'transfer_threads': transfer_threads,
                 'is_secure': is_secure,
                 'conn_path': conn_path,
             },
             'cache': {
                 'size': cache_size,
                 'path': staging_path,
+                'reconcile_interval': cache_reconcile_interval,
             },
             'extra_dirs': extra_dirs,
         }
@@ -119,18 +127,20 @@ class CloudConfigMixin:
                 'host': self.host,
                 'port': self.port,
                 'multipart': self.multipart,
+                'transfer_threads': self.transfer_threads,
                 'is_secure': self.is_secure,
                 'conn_path': self.conn_path,
             },
             'cache': {
                 'size': self.cache_size,
                 'path': self.staging_path,
+                'reconcile_interval': self.cache_reconcile_interval,
             },
             'enable_cache_monitor': False,
         }
 
 
-class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
+class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin, CacheTrackingMixin):
     """
     Object store that stores objects as items in an AWS S3 bucket. A local
     cache exists that is used as an intermediate location for files between
@@ -159,11 +169,13 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
         self.host = connection_dict.get('host', None)
         self.port = connection_dict.get('port', 6000)
         self.multipart = connection_dict.get('multipart', True)
+        self.transfer_threads = connection_dict.get('transfer_threads', DEFAULT_TRANSFER_THREADS)
         self.is_secure = connection_dict.get('is_secure', True)
         self.conn_path = connection_dict.get('conn_path', '/')
 
         self.cache_size = cache_dict.get('size', -1)
         self.staging_path = cache_dict.get('path') or self.config.object_store_cache_path
+        self.cache_reconcile_interval = cache_dict.get('reconcile_interval', 0)
 
         extra_dirs = {
             e['type']: e['path'] for e in config_dict.get('extra_dirs', [])}
@@ -183,7 +195,8 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
                          'host': self.host,
                          'port': self.port,
                          'use_rr': self.use_rr,
-                         'conn_path': self.conn_path}
+                         'conn_path': self.conn_path,
+                         'transfer_threads': self.transfer_threads}
 
         self._configure_connection()
         self._bucket = self._get_bucket(self.bucket)
@@ -197,13 +210,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
     def start_cache_monitor(self):
         # Clean cache only if value is set in galaxy.ini
         if self.cache_size != -1 and self.enable_cache_monitor:
-            # Convert GBs to bytes for comparison
-            self.cache_size = self.cache_size * 1073741824
-            # Helper for interruptable sleep
-            self.sleeper = Sleeper()
-            self.cache_monitor_thread = threading.Thread(target=self.__cache_monitor)
-            self.cache_monitor_thread.start()
-            log.info("Cache cleaner manager started")
+            self._start_cache_monitor()
 
     def _configure_connection(self):
         log.debug("Configuring S3 Connection")
@@ -222,70 +229,6 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
         as_dict.update(self._config_to_dict())
         return as_dict
 
-    def __cache_monitor(self):
-        time.sleep(2)  # Wait for things to load before starting the monitor
-        while self.running:
-            total_size = 0
-            # Is this going to be too expensive of an operation to be done frequently?
-            file_list = []
-            for dirpath, _, filenames in os.walk(self.staging_path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    file_size = os.path.getsize(filepath)
-                    total_size += file_size
-                    # Get the time given file was last accessed
-                    last_access_time = time.localtime(os.stat(filepath)[7])
-                    # Compose a tuple of the access time and the file path
-                    file_tuple = last_access_time, filepath, file_size
-                    file_list.append(file_tuple)
-            # Sort the file list (based on access time)
-            file_list.sort()
-            # Initiate cleaning once within 10% of the defined cache size?
-            cache_limit = self.cache_size * 0.9
-            if total_size > cache_limit:
-                log.info("Initiating cache cleaning: current cache size: %s; clean until smaller than: %s",
-                         convert_bytes(total_size), convert_bytes(cache_limit))
-                # How much to delete? If simply deleting up to the cache-10% limit,
-                # is likely to be deleting frequently and may run the risk of hitting
-                # the limit - maybe delete additional #%?
-                # For now, delete enough to leave at least 10% of the total cache free
-                delete_this_much = total_size - cache_limit
-                self.__clean_cache(file_list, delete_this_much)
-            self.sleeper.sleep(30)  # Test cache size every 30 seconds?
-
-    def __clean_cache(self, file_list, delete_this_much):
-        """ Keep deleting files from the file_list until the size of the deleted
-        files is greater than the value in delete_this_much parameter.
-
-        :type file_list: list
-        :param file_list: List of candidate files that can be deleted. This method
-            will start deleting files from the beginning of the list so the list
-            should be sorted accordingly. The list must contains 3-element tuples,
-            positioned as follows: position 0 holds file last accessed timestamp
-            (as time.struct_time), position 1 holds file path, and position 2 has
-            file size (e.g., (<access time>, /mnt/data/dataset_1.dat), 472394)
-
-        :type delete_this_much: int
-        :param delete_this_much: Total size of files, in bytes, that should be deleted.
-        """
-        # Keep deleting datasets from file_list until deleted_amount does not
-        # exceed delete_this_much; start deleting from the front of the file list,
-        # which assumes the oldest files come first on the list.
-        deleted_amount = 0
-        for entry in file_list:
-            if deleted_amount < delete_this_much:
-                deleted_amount += entry[2]
-                os.remove(entry[1])
-                # Debugging code for printing deleted files' stats
-                # folder, file_name = os.path.split(f[1])
-                # file_date = time.strftime("%m/%d/%y %H:%M:%S", f[0])
-                # log.debug("%s. %-25s %s, size %s (deleted %s/%s)" \
-                #     % (i, file_name, convert_bytes(f[2]), file_date, \
-                #     convert_bytes(deleted_amount), convert_bytes(delete_this_much)))
-            else:
-                log.debug("Cache cleaning done. Total space freed: %s", convert_bytes(deleted_amount))
-                return
-
     def _get_bucket(self, bucket_name):
         """ Sometimes a handle to a bucket is not established right away so try
         it a few times. Raise error is connection is not established. """
@@ -421,13 +364,29 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
         if not os.path.exists(self._get_cache_path(rel_path_dir)):
             os.makedirs(self._get_cache_path(rel_path_dir))
         # Now pull in the file
+        self._record_cache_miss(rel_path)
         file_ok = self._download(rel_path)
+        if file_ok:
+            self._record_cached(rel_path)
         self._fix_permissions(self._get_cache_path(rel_path_dir))
         return file_ok
 
     def _transfer_cb(self, complete, total):
         self.transfer_progress += 10
 
+    def _get_range(self, rel_path, start, count):
+        try:
+            key = self._bucket.get_key(rel_path)
+        except S3ResponseError:
+            log.exception("Could not get key '%s' from S3", rel_path)
+            key = None
+        if key is None:
+            raise ObjectNotFound(f"objectstore.get_data, no key: {rel_path}")
+        if start >= key.size or count == 0:
+            return b''
+        end = '' if count < 0 else min(start + count, key.size) - 1
+        return key.get_contents_as_string(headers={'Range': f"bytes={start}-{end}"})
+
     def _download(self, rel_path):
         try:
             log.debug("Pulling key '%s' into cache to %s", rel_path, self._get_cache_path(rel_path))
@@ -444,6 +403,10 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
                 ret_code = subprocess.call(['axel', '-a', '-n', str(ncores), url])
                 if ret_code == 0:
                     return True
+            elif self.multipart and key.size / 1e6 >= 10:
+                log.debug("Parallel pulled key '%s' into cache to %s", rel_path, self._get_cache_path(rel_path))
+                multipart_download(self.s3server, key, self._get_cache_path(rel_path))
+                return True
             else:
                 log.debug("Pulled key '%s' into cache to %s", rel_path, self._get_cache_path(rel_path))
                 self.transfer_progress = 0  # Reset transfer progress counter
@@ -575,6 +538,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
                 rel_path = os.path.join(rel_path, alt_name if alt_name else f"dataset_{self._get_object_id(obj)}.dat")
                 open(os.path.join(self.staging_path, rel_path), 'w').close()
                 self._push_to_os(rel_path, from_string='')
+                self._record_cached(rel_path)
 
     def _empty(self, obj, **kwargs):
         if self._exists(obj, **kwargs):
@@ -613,6 +577,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
             # but requires iterating through each individual key in S3 and deleing it.
             if entire_dir and extra_dir:
                 shutil.rmtree(self._get_cache_path(rel_path))
+                self._record_uncached(rel_path)
                 results = self._bucket.get_all_keys(prefix=rel_path)
                 for key in results:
                     log.debug("Deleting key %s", key.name)
@@ -621,6 +586,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
             else:
                 # Delete from cache first
                 os.unlink(self._get_cache_path(rel_path))
+                self._record_uncached(rel_path)
                 # Delete from S3 as well
                 if self._key_exists(rel_path):
                     key = Key(self._bucket, rel_path)
@@ -633,17 +599,18 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
             log.exception('%s delete error', self._get_filename(obj, **kwargs))
         return False
 
-    def _get_data(self, obj, start=0, count=-1, **kwargs):
+    def _get_data(self, obj, start=0, count=-1, binary=False, **kwargs):
         rel_path = self._construct_path(obj, **kwargs)
-        # Check cache first and get file if not there
+        # Read from the cache if the file is there, otherwise fetch just the
+        # requested range rather than pulling the whole object into cache.
         if not self._in_cache(rel_path):
-            self._pull_into_cache(rel_path)
-        # Read the file content from cache
-        data_file = open(self._get_cache_path(rel_path))
-        data_file.seek(start)
-        content = data_file.read(count)
-        data_file.close()
-        return content
+            self._record_cache_miss(rel_path)
+            content = self._get_range(rel_path, start, count)
+            return content if binary else unicodify(content)
+        self._record_cache_hit(rel_path)
+        with open(self._get_cache_path(rel_path), 'rb' if binary else 'r') as data_file:
+            data_file.seek(start)
+            return data_file.read(count)
 
     def _get_filename(self, obj, **kwargs):
         base_dir = kwargs.get('base_dir', None)
@@ -666,6 +633,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
         #     return cache_path
         # Check if the file exists in the cache first
         if self._in_cache(rel_path):
+            self._record_cache_hit(rel_path)
             return cache_path
         # Check if the file exists in persistent storage and, if it does, pull it into cache
         elif self._exists(obj, **kwargs):
@@ -703,6 +671,7 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
                 source_file = self._get_cache_path(rel_path)
             # Update the file on S3
             self._push_to_os(rel_path, source_file)
+            self._record_cached(rel_path)
         else:
             raise ObjectNotFound('objectstore.update_from_file, object does not exist: %s, kwargs: %s'
                                  % (str(obj), str(kwargs)))
@@ -721,12 +690,8 @@ class S3ObjectStore(ConcreteObjectStore, CloudConfigMixin):
         return 0.0
 
     def shutdown(self):
-        self.running = False
-        thread = getattr(self, 'cache_monitor_thread', None)
-        if thread:
-            log.debug("Shutting down thread")
-            self.sleeper.wake()
-            thread.join(5)
+        super().shutdown()
+        self._stop_cache_monitor()
 
 
 class SwiftObjectStore(S3ObjectStore):
@@ -1,14 +1,18 @@
 #!/usr/bin/env python
 """
-Split large file into multiple pieces for upload to S3.
-This parallelizes the task over available cores using multiprocessing.
-Code mostly taken form CloudBioLinux.
+Transfer large files to and from S3 in multiple pieces.
+
+Parts are transferred concurrently by a bounded pool of threads, each using
+its own connection since boto connections are not thread safe. Uploads read
+byte ranges of the source file directly and downloads issue ranged GETs into
+a preallocated temporary file next to the destination, which replaces the
+destination once every part has arrived.
+Code originally taken form CloudBioLinux.
 """
 
-import glob
 import os
-import subprocess
-import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import boto
@@ -16,65 +20,111 @@ try:
 except ImportError:
     boto = None  # type: ignore
 
+DEFAULT_TRANSFER_THREADS = 4
+MIN_PART_SIZE_MB = 5
 
-def mp_from_ids(s3server, mp_id, mp_keyname, mp_bucketname):
-    """Get the multipart upload from the bucket and multipart IDs.
 
-    This allows us to reconstitute a connection to the upload
-    from within multiprocessing functions.
-    """
+def connect(s3server):
+    """Open a new connection described by the ``s3server`` dictionary."""
     if s3server['host']:
-        conn = boto.connect_s3(aws_access_key_id=s3server['access_key'],
+        return boto.connect_s3(aws_access_key_id=s3server['access_key'],
                                aws_secret_access_key=s3server['secret_key'],
                                is_secure=s3server['is_secure'],
                                host=s3server['host'],
                                port=s3server['port'],
                                calling_format=boto.s3.connection.OrdinaryCallingFormat(),
                                path=s3server['conn_path'])
+    elif s3server['access_key']:
+        return S3Connection(s3server['access_key'], s3server['secret_key'])
     else:
-        if s3server['access_key']:
-            conn = S3Connection(s3server['access_key'], s3server['secret_key'])
-        else:
-            conn = S3Connection()
+        return S3Connection()
+
 
-    bucket = conn.lookup(mp_bucketname)
+def mp_from_ids(s3server, mp_id, mp_keyname, mp_bucketname):
+    """Get the multipart upload from the bucket and multipart IDs.
+
+    This allows us to reconstitute a connection to the upload
+    from within worker threads.
+    """
+    bucket = connect(s3server).get_bucket(mp_bucketname, validate=False)
     mp = boto.s3.multipart.MultiPartUpload(bucket)
     mp.key_name = mp_keyname
     mp.id = mp_id
     return mp
 
 
-def transfer_part(s3server, mp_id, mp_keyname, mp_bucketname, i, part):
+def transfer_part(s3server, mp_id, mp_keyname, mp_bucketname, i, source_file, offset, size):
     """Transfer a part of a multipart upload. Designed to be run in parallel.
     """
     mp = mp_from_ids(s3server, mp_id, mp_keyname, mp_bucketname)
-    with open(part, 'rb') as t_handle:
-        mp.upload_part_from_file(t_handle, i + 1)
-    os.remove(part)
+    with open(source_file, 'rb') as t_handle:
+        t_handle.seek(offset)
+        mp.upload_part_from_file(t_handle, i + 1, size=size)
+
+
+def download_part(s3server, bucket_name, key_name, dest_file, offset, size):
+    """Fetch ``size`` bytes of a key starting at ``offset`` into the same
+    position of ``dest_file``. Designed to be run in parallel.
+    """
+    bucket = connect(s3server).get_bucket(bucket_name, validate=False)
+    key = bucket.new_key(key_name)
+    with open(dest_file, 'r+b') as d_handle:
+        d_handle.seek(offset)
+        key.get_contents_to_file(d_handle, headers={'Range': f"bytes={offset}-{offset + size - 1}"})
+
+
+def _part_ranges(total_bytes, part_size):
+    return [(offset, min(part_size, total_bytes - offset)) for offset in range(0, total_bytes, part_size)]
+
+
+def _part_size(s3server, mb_size, split_num=5):
+    # Split chunks so they are 5MiB < chunk < 250MiB(max_chunk_size), S3
+    # rejects parts (but the last) smaller than 5MiB
+    max_chunk = s3server['max_chunk_size']
+    return int(max(min(mb_size / (split_num * 2.0), max_chunk), MIN_PART_SIZE_MB) * 1024 * 1024)
+
+
+def _run_parts(s3server, func, jobs):
+    max_workers = s3server.get('transfer_threads') or DEFAULT_TRANSFER_THREADS
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, *args) for args in jobs]
+        # Re-raise the first failure, if any, once all parts have settled.
+        for future in futures:
+            future.result()
 
 
 def multipart_upload(s3server, bucket, s3_key_name, tarball, mb_size):
     """Upload large files using Amazon's multipart upload functionality.
     """
-    def split_file(in_file, mb_size, split_num=5):
-        prefix = os.path.join(os.path.dirname(in_file),
-                              f"{os.path.basename(s3_key_name)}S3PART")
-        max_chunk = s3server['max_chunk_size']
-        # Split chunks so they are 5MB < chunk < 250MB(max_chunk_size)
-        split_size = int(max(min(mb_size / (split_num * 2.0), max_chunk), 5))
-        if not os.path.exists(f"{prefix}aa"):
-            cl = ["split", f"-b{split_size}m", in_file, prefix]
-            subprocess.check_call(cl)
-        return sorted(glob.glob(f"{prefix}*"))
-
+    part_size = _part_size(s3server, mb_size)
     mp = bucket.initiate_multipart_upload(s3_key_name,
                                           reduced_redundancy=s3server['use_rr'])
+    jobs = [(s3server, mp.id, mp.key_name, mp.bucket_name, i, tarball, offset, size)
+            for i, (offset, size) in enumerate(_part_ranges(os.path.getsize(tarball), part_size))]
+    try:
+        _run_parts(s3server, transfer_part, jobs)
+    except Exception:
+        mp.cancel_upload()
+        raise
+    mp.complete_upload()
 
-    for (i, part) in enumerate(split_file(tarball, mb_size)):
-        t = threading.Thread(
-            target=transfer_part,
-            args=(s3server, mp.id, mp.key_name, mp.bucket_name, i, part))
-        t.start()
-        t.join()
 
-    mp.complete_upload()
+def multipart_download(s3server, key, dest_file):
+    """Download large keys using concurrent ranged GET requests.
+
+    ``dest_file`` only appears once complete, so its size can be used to tell
+    whether the download has finished.
+    """
+    part_size = _part_size(s3server, key.size / 1e6)
+    dest_dir, dest_name = os.path.split(dest_file)
+    fd, temp_file = tempfile.mkstemp(dir=dest_dir, prefix=f".{dest_name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as d_handle:
+            d_handle.truncate(key.size)
+        jobs = [(s3server, key.bucket.name, key.name, temp_file, offset, size)
+                for (offset, size) in _part_ranges(key.size, part_size)]
+        _run_parts(s3server, download_part, jobs)
+        os.replace(temp_file, dest_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
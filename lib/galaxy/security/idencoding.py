@@ -1,7 +1,11 @@
 import codecs
 import collections
 import logging
-from typing import Optional
+import threading
+from typing import (
+    List,
+    Optional,
+)
 
 from Crypto.Cipher import Blowfish
 from Crypto.Random import get_random_bytes
@@ -17,6 +21,8 @@ log = logging.getLogger(__name__)
 MAXIMUM_ID_SECRET_BITS = 448
 MAXIMUM_ID_SECRET_LENGTH = int(MAXIMUM_ID_SECRET_BITS / 8)
 KIND_TOO_LONG_MESSAGE = "Galaxy coding error, keep encryption 'kinds' smaller to utilize more bites of randomness from id_secret values."
+# Number of recently encoded integer ids (of all kinds) remembered by each helper.
+ENCODED_ID_CACHE_SIZE = 10000
 
 
 class IdEncodingHelper:
@@ -28,17 +34,53 @@ class IdEncodingHelper:
 
         per_kind_id_secret_base = config.get('per_kind_id_secret_base', self.id_secret)
         self.id_ciphers_for_kind = _cipher_cache(per_kind_id_secret_base)
+        self.encoded_id_cache = _lru_cache(ENCODED_ID_CACHE_SIZE)
 
     def encode_id(self, obj_id, kind=None):
         if obj_id is None:
             raise galaxy.exceptions.MalformedId("Attempted to encode None id")
+        cacheable = type(obj_id) is int
+        if cacheable:
+            encoded_id = self.encoded_id_cache.get((obj_id, kind))
+            if encoded_id is not None:
+                return encoded_id
         id_cipher = self.__id_cipher(kind)
-        # Convert to bytes
-        s = smart_str(obj_id)
-        # Pad to a multiple of 8 with leading "!"
-        s = (b"!" * (8 - len(s) % 8)) + s
         # Encrypt
-        return unicodify(codecs.encode(id_cipher.encrypt(s), 'hex'))
+        encoded_id = unicodify(codecs.encode(id_cipher.encrypt(_pad_id(obj_id)), 'hex'))
+        if cacheable:
+            self.encoded_id_cache.set((obj_id, kind), encoded_id)
+        return encoded_id
+
+    def encode_ids(self, obj_ids, kind=None) -> List[str]:
+        """
+        Encode each id in `obj_ids`, encrypting all ids that were not recently
+        encoded with a single cipher call.
+        """
+        if any(obj_id is None for obj_id in obj_ids):
+            raise galaxy.exceptions.MalformedId("Attempted to encode None id")
+        encoded_ids: List[Optional[str]] = []
+        uncached = []
+        for i, obj_id in enumerate(obj_ids):
+            encoded_id = None
+            if type(obj_id) is int:
+                encoded_id = self.encoded_id_cache.get((obj_id, kind))
+            if encoded_id is None:
+                uncached.append(i)
+            encoded_ids.append(encoded_id)
+        if uncached:
+            padded_ids = [_pad_id(obj_ids[i]) for i in uncached]
+            # Blowfish in ECB mode encrypts each 8 byte block on its own, so
+            # the concatenated ids encrypt to the concatenated encrypted ids.
+            encrypted = codecs.encode(self.__id_cipher(kind).encrypt(b"".join(padded_ids)), 'hex')
+            offset = 0
+            for i, padded_id in zip(uncached, padded_ids):
+                end = offset + 2 * len(padded_id)
+                encoded_id = unicodify(encrypted[offset:end])
+                encoded_ids[i] = encoded_id
+                if type(obj_ids[i]) is int:
+                    self.encoded_id_cache.set((obj_ids[i], kind), encoded_id)
+                offset = end
+        return encoded_ids  # type: ignore[return-value]
 
     def encode_dict_ids(self, a_dict, kind=None, skip_startswith=None):
         """
@@ -59,26 +101,68 @@ class IdEncodingHelper:
         """
         if not isinstance(rval, dict):
             return rval
-        for k, v in rval.items():
-            if (k == 'id' or k.endswith('_id')) and v is not None and k not in ['tool_id', 'external_id']:
+        # collect the ids of rval (and nested values if recursive) first to
+        # encode them in one go
+        id_slots: List[tuple] = []
+        self._collect_id_slots(rval, recursive, id_slots)
+        if not id_slots:
+            return rval
+        try:
+            encoded_ids = self.encode_ids([slot[2] for slot in id_slots])
+        except Exception:
+            encoded_ids = []
+            for container, key, obj_id in id_slots:
                 try:
-                    rval[k] = self.encode_id(v)
+                    encoded_ids.append(self.encode_id(obj_id))
                 except Exception:
-                    pass  # probably already encoded
+                    encoded_ids.append(obj_id)  # probably already encoded
+        for (container, key, _), encoded_id in zip(id_slots, encoded_ids):
+            container[key] = encoded_id
+        return rval
+
+    def _collect_id_slots(self, rval, recursive, id_slots):
+        """
+        Append a (container, key, id) tuple to `id_slots` for each id that
+        `encode_all_ids` encodes in the dict `rval`.
+        """
+        for k, v in rval.items():
+            if (k == 'id' or k.endswith('_id')) and v is not None and k not in ['tool_id', 'external_id']:
+                if not (recursive and isinstance(v, (dict, list))):
+                    id_slots.append((rval, k, v))
             if (k.endswith("_ids") and isinstance(v, list)):
-                try:
-                    o = []
-                    for i in v:
-                        o.append(self.encode_id(i))
-                    rval[k] = o
-                except Exception:
-                    pass
+                if not any(i is None for i in v):
+                    # copy the list rather than encoding the ids in place
+                    rval[k] = v = list(v)
+                    id_slots.extend((v, i, obj_id) for i, obj_id in enumerate(v))
             else:
                 if recursive and isinstance(v, dict):
-                    rval[k] = self.encode_all_ids(v, recursive)
+                    self._collect_id_slots(v, recursive, id_slots)
                 elif recursive and isinstance(v, list):
-                    rval[k] = [self.encode_all_ids(el, True) for el in v]
-        return rval
+                    for el in v:
+                        if isinstance(el, dict):
+                            self._collect_id_slots(el, True, id_slots)
+
+    def decode_ids(self, obj_ids, kind=None, object_name: Optional[str] = None) -> List[int]:
+        """
+        Decode each encoded id in `obj_ids` with a single cipher call.
+        """
+        if not obj_ids:
+            return []
+        try:
+            decoded = [codecs.decode(obj_id, 'hex') for obj_id in obj_ids]
+            if any(len(d) % 8 for d in decoded):
+                raise ValueError("encoded id is not a multiple of the block size")
+            decrypted = self.__id_cipher(kind).decrypt(b"".join(decoded))
+            rval = []
+            offset = 0
+            for d in decoded:
+                end = offset + len(d)
+                rval.append(int(unicodify(decrypted[offset:end]).lstrip("!")))
+                offset = end
+            return rval
+        except (TypeError, ValueError):
+            # decode one at a time to report the offending id
+            return [self.decode_id(obj_id, kind=kind, object_name=object_name) for obj_id in obj_ids]
 
     def decode_id(self, obj_id, kind=None, object_name: Optional[str] = None):
         try:
@@ -114,6 +198,29 @@ class IdEncodingHelper:
         return id_cipher
 
 
+class _lru_cache:
+    """Thread safe mapping holding the `maxsize` most recently used items."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
 class _cipher_cache(collections.defaultdict):
 
     def __init__(self, secret_base):
@@ -125,6 +232,12 @@ class _cipher_cache(collections.defaultdict):
         return Blowfish.new(_last_bits(secret), mode=Blowfish.MODE_ECB)
 
 
+def _pad_id(obj_id):
+    """Convert `obj_id` to bytes padded to a multiple of 8 with leading "!"."""
+    s = smart_str(obj_id)
+    return (b"!" * (8 - len(s) % 8)) + s
+
+
 def _last_bits(secret):
     """We append the kind at the end, so just use the bits at the end.
     """
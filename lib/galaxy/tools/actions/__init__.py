@@ -31,6 +31,7 @@ class ToolExecutionCache:
         self.current_user_roles = trans.get_current_user_roles()
         self.chrom_info = {}
         self.cached_collection_elements = {}
+        self.history_default_permissions = {}
 
     def get_chrom_info(self, tool_id, input_dbkey):
         genome_builds = self.trans.app.genome_builds
@@ -44,6 +45,12 @@ class ToolExecutionCache:
 
         return chrom_info_pair
 
+    def get_history_default_permissions(self, history):
+        history_id = history.id
+        if history_id not in self.history_default_permissions:
+            self.history_default_permissions[history_id] = self.trans.app.security_agent.history_get_default_permissions(history)
+        return self.history_default_permissions[history_id]
+
 
 class ToolAction:
     """
@@ -347,7 +354,7 @@ class DefaultToolAction:
                 output_permissions = app.security_agent.guess_derived_permissions(all_permissions)
             else:
                 # No valid inputs, we will use history defaults
-                output_permissions = app.security_agent.history_get_default_permissions(history)
+                output_permissions = execution_cache.get_history_default_permissions(history)
 
         # Add the dbkey to the incoming parameters
         incoming["dbkey"] = input_dbkey
@@ -537,7 +544,10 @@ class DefaultToolAction:
         for name, data in out_data.items():
             if name not in child_dataset_names and name not in incoming:  # don't add children; or already existing datasets, i.e. async created
                 history.stage_addition(data)
-        history.add_pending_items(set_output_hid=set_output_hid)
+        # When executing a batch of jobs (flush_job=False) the caller allocates
+        # the HIDs of all staged outputs at once.
+        if flush_job or rerun_remap_job_id is not None:
+            history.add_pending_items(set_output_hid=set_output_hid)
 
         # Add all the children to their parents
         for parent_name, child_name in parent_to_child_pairs:
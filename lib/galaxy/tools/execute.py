@@ -101,6 +101,8 @@ def execute(trans, tool, mapping_params, history, rerun_remap_job_id=None, colle
     has_remaining_jobs = False
     execution_slice = None
     job_datasets = {}  # job: list of dataset instances created by job
+    # Histories with staged job outputs, their HIDs are allocated once for all jobs.
+    histories = {}
 
     for i, execution_slice in enumerate(execution_tracker.new_execution_slices()):
         if max_num_jobs is not None and jobs_executed >= max_num_jobs:
@@ -109,6 +111,7 @@ def execute(trans, tool, mapping_params, history, rerun_remap_job_id=None, colle
         else:
             execute_single_job(execution_slice, completed_jobs[i])
             history = execution_slice.history or history
+            histories[id(history)] = history
             jobs_executed += 1
 
     if job_datasets:
@@ -116,8 +119,8 @@ def execute(trans, tool, mapping_params, history, rerun_remap_job_id=None, colle
             for dataset_instance in datasets:
                 dataset_instance.dataset.job = job
 
-    if execution_slice:
-        history.add_pending_items()
+    for pending_history in histories.values():
+        pending_history.add_pending_items()
     # Make sure collections, implicit jobs etc are flushed even if there are no precreated output datasets
     trans.sa_session.flush()
 
@@ -32,6 +32,7 @@ from . import (
     validation
 )
 from .dataset_matcher import (
+    DatasetMatcherFactory,
     get_dataset_matcher_factory,
 )
 from .sanitize import ToolParameterSanitizer
@@ -874,6 +875,9 @@ class SelectToolParameter(ToolParameter):
 
     def get_options(self, trans, other_values):
         if self.options:
+            dataset_matcher_factory = getattr(trans, "dataset_matcher_factory", None)
+            if isinstance(dataset_matcher_factory, DatasetMatcherFactory):
+                return dataset_matcher_factory.get_options(self, trans, other_values)
             return self.options.get_options(trans, other_values)
         elif self.dynamic_options:
             call_other_values = self._get_dynamic_options_call_other_values(trans, other_values)
@@ -26,6 +26,8 @@ class DatasetMatcherFactory:
         self._tool = tool
         self._data_inputs = []
         self._matches_format_cache = {}
+        self._direct_match_cache = {}
+        self._options_cache = {}
         if tool:
             valid_input_states = tool.valid_input_states
         else:
@@ -63,6 +65,28 @@ class DatasetMatcherFactory:
 
         return formats[format]
 
+    def matches_formats_directly(self, hda_extension, formats):
+        """Return True if datasets with extension ``hda_extension`` can be
+        used as one of ``formats`` without a conversion. Cached for each
+        combination of extension and formats.
+        """
+        key = (hda_extension, tuple(formats))
+        if key not in self._direct_match_cache:
+            datatype = self._trans.app.datatypes_registry.get_datatype_by_extension(hda_extension)
+            self._direct_match_cache[key] = datatype is not None and datatype.matches_any(formats)
+        return self._direct_match_cache[key]
+
+    def get_options(self, param, trans, other_values):
+        """Return the dynamic options of ``param``. Options that do not depend
+        on other parameter values are only generated once per request.
+        """
+        options = param.options
+        if options.depends_on_other_values:
+            return options.get_options(trans, other_values)
+        if param not in self._options_cache:
+            self._options_cache[param] = options.get_options(trans, other_values)
+        return list(self._options_cache[param])
+
     def _collect_data_inputs(self, input):
         type_name = input.type
         if type_name == "repeat" or type_name == "upload_dataset" or type_name == "section":
@@ -116,7 +140,10 @@ class DatasetMatcher:
         """
         rval = False
         formats = self.param.formats
-        direct_match, target_ext, converted_dataset = hda.find_conversion_destination(formats)
+        if self.dataset_matcher_factory.matches_formats_directly(hda.extension, formats):
+            direct_match, target_ext, converted_dataset = True, None, None
+        else:
+            direct_match, target_ext, converted_dataset = hda.find_conversion_destination(formats)
         if direct_match:
             rval = HdaDirectMatch(hda)
         else:
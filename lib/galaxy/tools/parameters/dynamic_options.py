@@ -576,6 +576,10 @@ class DynamicOptions:
         for filter_elem in elem.findall('filter'):
             self.filters.append(Filter.from_element(self, filter_elem))
 
+        # Options depending only on the tool, data tables and the current user
+        # are the same for every set of parameter values of a request.
+        self.depends_on_other_values = bool(self.get_dependency_names()) or any(isinstance(filter, RemoveValueFilter) for filter in self.filters)
+
         # Load Validators
         for validator in elem.findall('validator'):
             self.validators.append(validation.Validator.from_element(self.tool_param, validator))
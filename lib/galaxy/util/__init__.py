@@ -217,6 +217,35 @@ def file_reader(fp, chunk_size=CHUNK_SIZE):
     fp.close()
 
 
+def concatenate_files(source_paths, destination_path):
+    """
+    Write the contents of the files ``source_paths`` one after the other to
+    ``destination_path``. Where the platform allows it, the data is copied
+    by the kernel (``os.sendfile``) without passing through Python.
+    """
+    with open(destination_path, 'wb', buffering=0) as fdst:
+        for source_path in source_paths:
+            with open(source_path, 'rb', buffering=0) as fsrc:
+                _append_file_contents(fsrc, fdst)
+
+
+def _append_file_contents(fsrc, fdst):
+    offset = 0
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is not None:
+        try:
+            while True:
+                sent = sendfile(fdst.fileno(), fsrc.fileno(), offset, 2 ** 30)
+                if sent == 0:
+                    return
+                offset += sent
+        except OSError:
+            # e.g. platforms only supporting sockets as destination
+            pass
+    fsrc.seek(offset)
+    shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+
+
 def chunk_iterable(it: typing.Iterable, size: int = 1000):
     """
     Break an iterable into chunks of ``size`` elements.
@@ -1,6 +1,8 @@
 """Entry point for the usage of Cheetah templating within Galaxy."""
 
+import threading
 import traceback
+from collections import OrderedDict
 from lib2to3.refactor import RefactoringTool
 
 import packaging.version
@@ -16,6 +18,7 @@ from . import unicodify
 # This is not needed, we only translate code on py3.
 myfixes = [f for f in myfixes if not f.startswith('libpasteurize')]
 refactoring_tool = RefactoringTool(myfixes, {'print_function': True})
+COMPILED_TEMPLATE_CACHE_SIZE = 1000
 
 
 class FixedModuleCodeCompiler(Compiler):
@@ -27,6 +30,70 @@ class FixedModuleCodeCompiler(Compiler):
         return self._moduleDef
 
 
+class CompiledTemplateCache:
+    """Bounded, thread-safe LRU cache of compiled Cheetah template classes.
+
+    Compiled classes are keyed on the template text and the compiler class
+    used, or for compiler classes created by :func:`create_compiler_class` on
+    the (futurized or otherwise rewritten) module code they carry.
+    :func:`fill_template` also records the class a template was successfully
+    filled with, keyed on the template text, the requested compiler class and
+    the python template version, so that the retry and futurize steps needed
+    for python 2 templates only run once per template.
+    """
+
+    def __init__(self, maxsize=COMPILED_TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._classes = OrderedDict()
+        self._resolved = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, entries, key, klass):
+        with self._lock:
+            entries[key] = klass
+            entries.move_to_end(key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def get(self, template_text, compiler_class):
+        key = (template_text, getattr(compiler_class, 'module_code', None) or compiler_class)
+        with self._lock:
+            klass = self._classes.get(key)
+            if klass is not None:
+                self._classes.move_to_end(key)
+                self.hits += 1
+                return klass
+            self.misses += 1
+        # Cheetah's own compilation cache is unbounded and keyed on the
+        # identity of the compiler class, so it is not used here.
+        klass = Template.compile(source=template_text, compilerClass=compiler_class, cacheCompilationResults=False)
+        self._put(self._classes, key, klass)
+        return klass
+
+    def get_resolved(self, template_text, compiler_class, python_template_version):
+        """Return the class ``template_text`` was last filled with, or None."""
+        key = (template_text, compiler_class, python_template_version)
+        with self._lock:
+            klass = self._resolved.get(key)
+            if klass is not None:
+                self._resolved.move_to_end(key)
+                self.hits += 1
+            return klass
+
+    def set_resolved(self, template_text, compiler_class, python_template_version, klass):
+        self._put(self._resolved, (template_text, compiler_class, python_template_version), klass)
+
+    def clear(self):
+        with self._lock:
+            self._classes.clear()
+            self._resolved.clear()
+
+
+compiled_template_cache = CompiledTemplateCache()
+
+
 def create_compiler_class(module_code):
 
     class CustomCompilerClass(FixedModuleCodeCompiler):
@@ -56,8 +123,40 @@ def fill_template(template_text,
         context = kwargs
     if isinstance(python_template_version, str):
         python_template_version = packaging.version.parse(python_template_version)
+    klass = compiled_template_cache.get_resolved(template_text, compiler_class, python_template_version)
+    if klass is not None:
+        try:
+            return unicodify(klass(searchList=[context]), log_exception=False)
+        except Exception:
+            if python_template_version.release[0] >= 3:
+                raise
+            # A python 2 template may need other fixes for this context.
+    filled, klass = _fill_template(
+        template_text=template_text,
+        context=context,
+        retry=retry,
+        compiler_class=compiler_class,
+        first_exception=first_exception,
+        futurized=futurized,
+        python_template_version=python_template_version,
+    )
+    compiled_template_cache.set_resolved(template_text, compiler_class, python_template_version, klass)
+    return filled
+
+
+def _fill_template(template_text,
+                   context,
+                   retry,
+                   compiler_class,
+                   python_template_version,
+                   first_exception=None,
+                   futurized=False):
+    """Fill ``template_text``, retrying with fixed up python 2 template code.
+
+    Return the filled template and the template class that filled it.
+    """
     try:
-        klass = Template.compile(source=template_text, compilerClass=compiler_class)
+        klass = compiled_template_cache.get(template_text, compiler_class)
     except ParseError as e:
         # Might happen on invalid syntax within a cheetah statement, like `#if $smxsize <> 128.0`
         if first_exception is None:
@@ -66,7 +165,7 @@ def fill_template(template_text,
             module_code = Template.compile(source=template_text, compilerClass=compiler_class, returnAClass=False).decode('utf-8')
             module_code = futurize_preprocessor(module_code)
             compiler_class = create_compiler_class(module_code)
-            return fill_template(
+            return _fill_template(
                 template_text=template_text,
                 context=context,
                 retry=retry - 1,
@@ -77,7 +176,7 @@ def fill_template(template_text,
         raise first_exception or e
     t = klass(searchList=[context])
     try:
-        return unicodify(t, log_exception=False)
+        return unicodify(t, log_exception=False), klass
     except NotFound as e:
         if first_exception is None:
             first_exception = e
@@ -97,13 +196,13 @@ def fill_template(template_text,
                 module_code[lineno] = module_code[lineno].replace(replace_str, var_not_found)
                 module_code = "\n".join(module_code)
                 compiler_class = create_compiler_class(module_code)
-                return fill_template(template_text=template_text,
-                                     context=context,
-                                     retry=retry - 1,
-                                     compiler_class=compiler_class,
-                                     first_exception=first_exception,
-                                     python_template_version=python_template_version,
-                                     )
+                return _fill_template(template_text=template_text,
+                                      context=context,
+                                      retry=retry - 1,
+                                      compiler_class=compiler_class,
+                                      first_exception=first_exception,
+                                      python_template_version=python_template_version,
+                                      )
         raise first_exception or e
     except Exception as e:
         if first_exception is None:
@@ -115,14 +214,14 @@ def fill_template(template_text,
             module_code = t._CHEETAH_generatedModuleCode
             module_code = futurize_preprocessor(module_code)
             compiler_class = create_compiler_class(module_code)
-            return fill_template(template_text=template_text,
-                                 context=context,
-                                 retry=retry,
-                                 compiler_class=compiler_class,
-                                 first_exception=first_exception,
-                                 futurized=True,
-                                 python_template_version=python_template_version,
-                                 )
+            return _fill_template(template_text=template_text,
+                                  context=context,
+                                  retry=retry,
+                                  compiler_class=compiler_class,
+                                  first_exception=first_exception,
+                                  futurized=True,
+                                  python_template_version=python_template_version,
+                                  )
         raise first_exception or e
 
 
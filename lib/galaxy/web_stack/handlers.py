@@ -15,7 +15,8 @@ from sqlalchemy.orm import object_session
 from galaxy.exceptions import HandlerAssignmentError
 from galaxy.util import (
     ExecutionTimer,
-    listify
+    listify,
+    string_as_bool
 )
 
 log = logging.getLogger(__name__)
@@ -89,6 +90,12 @@ class ConfiguresHandlers:
             ready_window_size_str = config_element.attrib.get("ready_window_size", None)
             if ready_window_size_str:
                 handling_config_dict["ready_window_size"] = int(ready_window_size_str)
+            incremental_readiness_str = config_element.attrib.get("incremental_readiness", None)
+            if incremental_readiness_str:
+                handling_config_dict["incremental_readiness"] = string_as_bool(incremental_readiness_str)
+            readiness_full_check_interval_str = config_element.attrib.get("readiness_full_check_interval", None)
+            if readiness_full_check_interval_str:
+                handling_config_dict["readiness_full_check_interval"] = int(readiness_full_check_interval_str)
 
         return handling_config_dict
 
@@ -15,7 +15,6 @@ from galaxy import (
 )
 from galaxy.exceptions import Conflict
 from galaxy.managers import users
-from galaxy.queue_worker import send_local_control_task
 from galaxy.security.validate_user_input import (
     validate_email,
     validate_publicname
@@ -221,16 +220,6 @@ class User(BaseUIController, UsesFormDefinitionsMixin, CreatesApiKeysMixin):
         message = trans.check_csrf_token(kwd)
         if message:
             return self.message_exception(trans, message)
-        if trans.user:
-            if trans.app.config.enable_celery_tasks:
-                # Queue a quota recalculation (async) task -- this takes a
-                # while sometimes, so we don't want to block on logout.
-                from galaxy.celery.tasks import recalculate_user_disk_usage
-                recalculate_user_disk_usage.delay(user_id=trans.user.id)
-            else:
-                send_local_control_task(trans.app,
-                                        "recalculate_user_disk_usage",
-                                        kwargs={"user_id": trans.security.encode_id(trans.user.id)})
         # Since logging an event requires a session, we'll log prior to ending the session
         trans.log_event("User logged out")
         trans.handle_user_logout(logout_all=logout_all)
@@ -227,6 +227,7 @@ class HistoriesContentsService(ServiceBase):
         hda_deserializer: hdas.HDADeserializer,
         hdca_serializer: hdcas.HDCASerializer,
         history_contents_filters: history_contents.HistoryContentsFilters,
+        history_contents_serializer: history_contents.HistoryContentsSerializer,
     ):
         super().__init__(security)
         self.history_manager = history_manager
@@ -239,6 +240,7 @@ class HistoriesContentsService(ServiceBase):
         self.hda_deserializer = hda_deserializer
         self.hdca_serializer = hdca_serializer
         self.history_contents_filters = history_contents_filters
+        self.history_contents_serializer = history_contents_serializer
 
     def index(
         self,
@@ -931,6 +933,27 @@ class HistoriesContentsService(ServiceBase):
         # TODO: > 16.04: remove these
         # TODO: remove 'dataset_details' and the following section when the UI doesn't need it
         parsed_legacy_params = self._parse_legacy_contents_params(legacy_params)
+        dataset_details = parsed_legacy_params.get("dataset_details")
+
+        # serialize straight from the contents query rows when every requested key can be,
+        # avoiding loading (and eager loading the relationships of) each item
+        keys_by_type = self._serialization_keys_by_type(serialization_params)
+        inaccessible_dataset_keys = self.hda_serializer.views['inaccessible']
+        if (keys_by_type and not dataset_details
+                and not any(f.filter_type == 'function' for f in filters)
+                and self.history_contents_serializer.can_serialize_rows(keys_by_type, inaccessible_dataset_keys)):
+            rows = self.history_contents_manager.contents(
+                history,
+                filters=filters,
+                limit=filter_query_params.limit,
+                offset=filter_query_params.offset,
+                order_by=order_by,
+                expand_models=False,
+                columns=self.history_contents_serializer.row_columns(keys_by_type, inaccessible_dataset_keys),
+            )
+            return self.history_contents_serializer.serialize_rows(rows, keys_by_type, inaccessible_dataset_keys,
+                                                                   user=trans.user, trans=trans)
+
         contents = self.history_contents_manager.contents(
             history,
             filters=filters,
@@ -942,12 +965,31 @@ class HistoriesContentsService(ServiceBase):
         return [
             self._serialize_content_item(
                 trans, content,
-                dataset_details=parsed_legacy_params.get("dataset_details"),
+                dataset_details=dataset_details,
                 serialization_params=serialization_params,
             )
             for content in contents
         ]
 
+    def _serialization_keys_by_type(
+        self,
+        serialization_params: SerializationParams,
+        default_view: str = "summary",
+    ) -> Optional[Dict[str, List[str]]]:
+        """
+        Returns the keys `_serialize_content_item` would serialize for each type of
+        contents (keyed by `history_content_type`) or None if the view is unknown.
+        """
+        view = serialization_params.view or default_view
+        keys_by_type: Dict[str, List[str]] = {}
+        for content_type, serializer in (('dataset', self.hda_serializer), ('dataset_collection', self.hdca_serializer)):
+            if view not in serializer.views:
+                return None
+            keys = serializer.views[view] + (serialization_params.keys or [])
+            # the serializers ignore unknown keys and only return each key once
+            keys_by_type[content_type] = [key for key in dict.fromkeys(keys) if key in serializer.serializable_keyset]
+        return keys_by_type
+
     def _serialize_legacy_content_item(
         self,
         trans,
@@ -0,0 +1,123 @@
+import datetime
+from unittest import TestCase
+
+from galaxy import model
+from galaxy.app_unittest_utils.galaxy_mock import MockApp
+from galaxy.jobs import handler
+from galaxy.jobs.handler import (
+    JobHandlerQueue,
+    ready_window_saturated,
+)
+from galaxy.util.bunch import Bunch
+
+HANDLER = "handler0"
+
+
+class IncrementalReadinessTestCase(TestCase):
+
+    def setUp(self):
+        self.app = MockApp()
+        self.app.config.server_name = HANDLER
+        self.app.config.track_jobs_in_database = True
+        self.app.job_config = Bunch(
+            handler_assignment_methods=None,
+            handler_max_grab=None,
+            self_handler_tags=None,
+            handler_tags=None,
+            handler_ready_window_size=100,
+            handler_incremental_readiness=True,
+            handler_readiness_full_check_interval=3,
+        )
+        self.sa_session = self.app.model.context
+        self.history = model.History()
+        self.sa_session.add(self.history)
+        self.queue = JobHandlerQueue(self.app, None)
+
+    def test_first_check_is_full(self):
+        ready = self._new_job()
+        waiting = self._new_job(input_state=model.Dataset.states.RUNNING)
+        assert self._fetch() == {ready.id}
+        assert waiting.id not in self._fetch()
+
+    def test_unchanged_jobs_skipped(self):
+        ready = self._new_job()
+        assert self._fetch() == {ready.id}
+        assert self._fetch() == set()
+        # deferred jobs (e.g. because of limits) are checked again
+        self.queue.readiness_recheck_job_ids = {ready.id}
+        assert self._fetch() == {ready.id}
+
+    def test_jobs_failing_readiness_check_checked_again(self):
+        ready_id = self._new_job().id
+
+        def check_job_state(job):
+            raise Exception("Failed to check job state")
+
+        self.queue._JobHandlerQueue__check_job_state = check_job_state
+        self.queue._JobHandlerQueue__handle_waiting_jobs()
+        assert self.queue.readiness_recheck_job_ids == {ready_id}
+        assert self._fetch() == {ready_id}
+
+    def test_full_check_after_too_many_deferred_jobs(self):
+        ready = self._new_job()
+        self._fetch()
+        self.queue.readiness_recheck_job_ids = set(range(-handler.READINESS_MAX_RECHECK_JOBS - 1, 0))
+        assert self._fetch() == {ready.id}
+
+    def test_created_jobs_checked(self):
+        self._fetch()
+        created = self._new_job(age=None)
+        assert self._fetch() == {created.id}
+
+    def test_jobs_with_changed_inputs_checked(self):
+        waiting = self._new_job(input_state=model.Dataset.states.RUNNING)
+        assert self._fetch() == set()
+        assert self._fetch() == set()
+        dataset = waiting.input_datasets[0].dataset.dataset
+        dataset.state = model.Dataset.states.OK
+        self.sa_session.flush()
+        assert self._fetch() == {waiting.id}
+
+    def test_full_check_interval(self):
+        ready = self._new_job()
+        assert self._fetch() == {ready.id}
+        for _ in range(3):
+            assert self._fetch() == set()
+        assert self._fetch() == {ready.id}
+
+    def test_full_check_after_saturated_window(self):
+        ready = self._new_job()
+        self._fetch()
+        # a window filled by some user may have left ready jobs out, they
+        # have not changed since and would be missed by an incremental check
+        self.queue.readiness_window_saturated = True
+        assert self._fetch() == {ready.id}
+        assert self._fetch() == set()
+
+    def test_ready_window_saturated(self):
+        jobs = [Bunch(user_id=1), Bunch(user_id=1), Bunch(user_id=2)]
+        assert ready_window_saturated(jobs, 2)
+        assert not ready_window_saturated(jobs, 3)
+        assert not ready_window_saturated([], 1)
+
+    def _fetch(self):
+        return {job.id for job in self.queue._fetch_new_jobs()}
+
+    def _new_job(self, input_state=None, age=datetime.timedelta(hours=1)):
+        job = model.Job()
+        job.state = model.Job.states.NEW
+        job.handler = HANDLER
+        self.sa_session.add(job)
+        if input_state:
+            hda = self.history.add_dataset(model.HistoryDatasetAssociation(create_dataset=True, sa_session=self.sa_session))
+            hda.dataset.state = input_state
+            job.add_input_dataset("input1", hda)
+        self.sa_session.flush()
+        if age:
+            # pretend the job and its inputs were last changed before the first check
+            update_time = datetime.datetime.utcnow() - age
+            job.update_time = update_time
+            for assoc in job.input_datasets:
+                assoc.dataset.dataset.update_time = update_time
+            self.sa_session.flush()
+        return job
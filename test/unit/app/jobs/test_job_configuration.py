@@ -170,6 +170,10 @@ class SimpleJobConfXmlParserTestCase(BaseJobConfXmlParserTestCase):
         assert "handler0" in self.job_config.handlers["handlers"]
         assert "handler1" in self.job_config.handlers["handlers"]
 
+    def test_default_incremental_readiness(self):
+        assert self.job_config.handler_incremental_readiness is False
+        assert self.job_config.handler_readiness_full_check_interval == 60
+
     def test_implict_db_self_handler_assign(self):
         assert self.job_config.handler_assignment_methods == ['db-skip-locked']
         assert self.job_config.default_handler_id is None
@@ -1,6 +1,8 @@
 import os
 import tempfile
 
+from sqlalchemy import event
+
 from galaxy import model
 from galaxy.job_execution.output_collect import (
     dataset_collector,
@@ -42,10 +44,8 @@ def setup_data(job_working_directory):
             out.write(str(i))
 
 
-def test_job_context_discover_outputs_flushes_once(mocker):
-    app = _mock_app()
+def _setup_job_context(app, flush_per_n_datasets=None):
     sa_session = app.model.context
-    # mocker is a pytest-mock fixture
 
     u = model.User(email="collection@example.com", password="password")
     h = model.History(name="Test History", user=u)
@@ -63,21 +63,34 @@ def test_job_context_discover_outputs_flushes_once(mocker):
     object_store = app.object_store
     input_dbkey = '?'
     final_job_state = 'ok'
-    collection_description = FilePatternDatasetCollectionDescription(pattern="__name__")
     collection = model.DatasetCollection(collection_type='list', populated=False)
     sa_session.add(collection)
-    job_context = JobContext(tool, tool_provided_metadata, job, job_working_directory, permission_provider, metadata_source_provider, input_dbkey, object_store, final_job_state)
+    job_context = JobContext(tool, tool_provided_metadata, job, job_working_directory, permission_provider, metadata_source_provider, input_dbkey, object_store, final_job_state, flush_per_n_datasets=flush_per_n_datasets)
+    return job_context, collection
+
+
+def _populate_collection(job_context, collection):
+    collection_description = FilePatternDatasetCollectionDescription(pattern="__name__")
     collection_builder = builder.BoundCollectionBuilder(collection)
     dataset_collectors = [dataset_collector(collection_description)]
     output_name = 'output'
     filenames = job_context.find_files(output_name, collection, dataset_collectors)
     assert len(filenames) == 10
+    return collection_builder, filenames
+
+
+def test_job_context_discover_outputs_flushes_once(mocker):
+    app = _mock_app()
+    sa_session = app.model.context
+    # mocker is a pytest-mock fixture
+    job_context, collection = _setup_job_context(app)
+    collection_builder, filenames = _populate_collection(job_context, collection)
     spy = mocker.spy(sa_session, 'flush')
     job_context.populate_collection_elements(
         collection,
         collection_builder,
         filenames,
-        name=output_name,
+        name='output',
         metadata_source_name='',
         final_job_state=job_context.final_job_state,
     )
@@ -86,3 +99,37 @@ def test_job_context_discover_outputs_flushes_once(mocker):
     sa_session.flush()
     assert len(collection.dataset_instances) == 10
     assert collection.dataset_instances[0].dataset.file_size == 1
+
+
+def test_job_context_discover_outputs_per_chunk():
+    app = _mock_app()
+    sa_session = app.model.context
+    job_context, collection = _setup_job_context(app, flush_per_n_datasets=5)
+    collection_builder, filenames = _populate_collection(job_context, collection)
+    hda_selects = []
+
+    def count_hda_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "history_dataset_association" in statement:
+            hda_selects.append(statement)
+
+    engine = sa_session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_hda_selects)
+    try:
+        job_context.populate_collection_elements(
+            collection,
+            collection_builder,
+            filenames,
+            name='output',
+            metadata_source_name='',
+            final_job_state=job_context.final_job_state,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count_hda_selects)
+    # New HDAs are reloaded once per chunk, not lazily one at a time
+    assert len(hda_selects) == 2 * 3
+    # and the elements of each chunk were written along with its datasets.
+    assert collection.element_count == 10
+    collection_builder.populate()
+    sa_session.flush()
+    assert [dce.element_index for dce in collection.elements] == list(range(10))
+    assert collection.dataset_instances[0].dataset.file_size == 1
@@ -1,9 +1,14 @@
 import abc
 import os
+import threading
 from contextlib import contextmanager
 from typing import Dict, Type
-from unittest import TestCase
+from unittest import (
+    mock,
+    TestCase,
+)
 
+from galaxy import jobs
 from galaxy.app_unittest_utils.tools_support import UsesApp
 from galaxy.jobs import (
     JobWrapper,
@@ -81,6 +86,47 @@ class JobWrapperTestCase(BaseWrapperTestCase, TestCase):
         with self._prepared_wrapper() as wrapper:
             assert TEST_VERSION_COMMAND in wrapper.write_version_cmd, wrapper.write_version_cmd
 
+    def test_finish_stage_timer(self):
+        wrapper = self._wrapper()
+        timer = wrapper._finish_stage_timer("persist")
+        assert timer.timer_id == "internals.galaxy.jobs.job_wrapper_finish.persist"
+        assert timer.to_str(job_id=345).startswith("job_wrapper.finish stage persist for job 345 executed (")
+
+    def test_wait_for_output_datasets(self):
+        self.app.config.retry_job_output_collection = 3
+        datasets = [MockDataset(i, self.working_directory) for i in range(4)]
+        datasets[1].purged = True
+        datasets[2].external_filename = "/external/path"
+        missing = MockDataset(5, os.path.join(self.working_directory, "missing"))
+        datasets.append(missing)
+        touched_threads = set()
+        touch = jobs._touch_output_file
+
+        def touch_output_file(dataset_path):
+            touched_threads.add(threading.current_thread().name)
+            return touch(dataset_path)
+
+        for finish_io_workers in (1, 4):
+            for dataset in datasets:
+                dataset.resolved_by = []
+            touched_threads.clear()
+            wrapper = self._wrapper()
+            wrapper.get_destination_configuration = lambda key, default=None: finish_io_workers if key == "finish_io_workers" else default
+            with mock.patch.object(jobs, "_touch_output_file", touch_output_file), mock.patch.object(jobs.time, "sleep") as sleep:
+                wrapper._wait_for_output_datasets(datasets)
+            # paths are only ever resolved in the calling thread
+            main_thread = threading.current_thread().name
+            assert datasets[0].resolved_by == [main_thread]
+            assert datasets[1].resolved_by == datasets[2].resolved_by == []
+            assert datasets[3].resolved_by == [main_thread]
+            # the missing output is retried retry_job_output_collection times
+            assert missing.resolved_by == [main_thread] * 3
+            assert sleep.call_count == 2
+            if finish_io_workers == 1:
+                assert touched_threads == {main_thread}
+            else:
+                assert main_thread not in touched_threads
+
 
 class TaskWrapperTestCase(BaseWrapperTestCase, TestCase):
 
@@ -114,6 +160,23 @@ class MockEvaluator:
         return TEST_COMMAND, [], []
 
 
+class MockDataset:
+
+    def __init__(self, id, directory):
+        self.id = id
+        self.purged = False
+        self.external_filename = None
+        self.path = os.path.join(directory, f"dataset_{id}.dat")
+        if os.path.isdir(directory):
+            open(self.path, "w").close()
+        self.resolved_by = []
+
+    @property
+    def file_name(self):
+        self.resolved_by.append(threading.current_thread().name)
+        return self.path
+
+
 class MockJobQueue:
 
     def __init__(self, app):
@@ -0,0 +1,234 @@
+from queue import Queue
+from unittest import mock
+
+from galaxy import model
+from galaxy.jobs import runners
+from galaxy.jobs.runners import (
+    cli,
+    drmaa,
+    kubernetes,
+    slurm,
+)
+from galaxy.util import bunch
+from galaxy.util.commands import CommandLineException
+
+FAKE_DRMAA = bunch.Bunch(
+    JobState=bunch.Bunch(QUEUED_ACTIVE="queued_active", RUNNING="running", DONE="done", FAILED="failed"),
+    InternalException=type("InternalException", (Exception,), {}),
+    InvalidJobException=type("InvalidJobException", (Exception,), {}),
+    DrmCommunicationException=type("DrmCommunicationException", (Exception,), {}),
+)
+
+
+class MockJobWrapper:
+
+    def __init__(self, id_tag, state=model.Job.states.QUEUED):
+        self.app = bunch.Bunch(config=bunch.Bunch(redact_email_in_job_name=True))
+        self.tool = bunch.Bunch(old_id="cat1")
+        self.id_tag = id_tag
+        self.state = state
+        self.states = []
+        self.job_destination = bunch.Bunch(params={})
+
+    def get_id_tag(self):
+        return self.id_tag
+
+    def get_state(self):
+        return self.state
+
+    def change_state(self, state):
+        self.states.append(state)
+
+    def has_limits(self):
+        return False
+
+    def check_for_entry_points(self):
+        pass
+
+
+def _job_state(job_id, destination_id="default"):
+    return runners.AsynchronousJobState(
+        job_id=job_id,
+        job_wrapper=MockJobWrapper(job_id),
+        job_destination=bunch.Bunch(id=destination_id, params={}),
+    )
+
+
+def _runner(runner_class, **attributes):
+    # Skip the constructors, they connect to the DRM.
+    runner = runner_class.__new__(runner_class)
+    runner.app = bunch.Bunch(config=bunch.Bunch(server_name="main.handler_1"))
+    runner.work_queue = Queue()
+    runner.watched = []
+    runner.__dict__.update(attributes)
+    return runner
+
+
+class BatchedRunner(runners.AsynchronousJobRunner):
+    runner_name = "BatchedRunner"
+
+    def __init__(self, remote_states):
+        self.remote_states = remote_states
+        self.requested = []
+        self.checked = {}
+        self.watched = []
+
+    def get_watched_item_states(self, job_states):
+        self.requested.append([ajs.job_id for ajs in job_states])
+        if isinstance(self.remote_states, Exception):
+            raise self.remote_states
+        return self.remote_states
+
+    def check_watched_item(self, job_state):
+        self.checked[job_state.job_id] = job_state.remote_state
+        return job_state
+
+
+def test_prefetch_watched_item_states():
+    runner = BatchedRunner({"1": "running", "3": "queued"})
+    runner.watched = [_job_state(job_id) for job_id in ("1", "2", "3")]
+    runner.check_watched_items()
+    assert runner.requested == [["1", "2", "3"]]
+    # job 2 is missing from the batch result and is checked individually
+    assert runner.checked == {"1": "running", "2": None, "3": "queued"}
+
+
+def test_prefetch_watched_item_states_failure():
+    runner = BatchedRunner(Exception("DRM unavailable"))
+    runner.watched = [_job_state(job_id) for job_id in ("1", "2")]
+    runner.watched[0].remote_state = "stale"
+    runner.check_watched_items()
+    assert runner.checked == {"1": None, "2": None}
+
+
+def test_default_get_watched_item_states_is_empty():
+    assert runners.AsynchronousJobRunner.get_watched_item_states(None, [_job_state("1")]) == {}
+
+
+class MockCliJobInterface:
+
+    def __init__(self, batch_states, single_states):
+        self.batch_states = batch_states
+        self.single_states = single_states
+
+    def get_status(self, job_ids):
+        return ("status", tuple(job_ids))
+
+    def parse_status(self, status, job_ids):
+        return {job_id: self.batch_states[job_id] for job_id in job_ids if job_id in self.batch_states}
+
+    def get_single_status(self, job_id):
+        return ("single_status", job_id)
+
+    def parse_single_status(self, status, job_id):
+        return self.single_states[job_id]
+
+
+class MockShell:
+
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, cmd):
+        self.commands.append(cmd)
+        return bunch.Bunch(returncode=0, stdout=cmd, stderr="")
+
+
+def test_cli_batched_status():
+    shell = MockShell()
+    job_interface = MockCliJobInterface({"1": model.Job.states.RUNNING, "3": model.Job.states.QUEUED}, {"2": model.Job.states.QUEUED})
+    runner = _runner(cli.ShellJobRunner)
+    runner.get_cli_plugins = lambda shell_params, job_params: (shell, job_interface)
+    job_states = [_job_state("1", "cluster_a"), _job_state("2", "cluster_a"), _job_state("3", "cluster_b")]
+    runner.watched = list(job_states)
+    runner.check_watched_items()
+    # one status query per destination, plus one for the job missing from the results
+    assert shell.commands == [
+        ("status", ("1", "2")),
+        ("status", ("3",)),
+        ("single_status", "2"),
+    ]
+    assert [ajs.job_wrapper.states for ajs in job_states] == [
+        [model.Job.states.RUNNING], [model.Job.states.QUEUED], [model.Job.states.QUEUED]
+    ]
+    assert runner.watched == job_states
+    assert job_states[0].running
+
+
+def test_slurm_squeue_batches():
+    job_states = [_job_state(str(job_id)) for job_id in range(1, 2501)]
+    job_states.append(_job_state("2501.cluster2"))
+    job_states.append(_job_state("None"))
+    commands = []
+
+    def execute(cmd):
+        commands.append(cmd)
+        job_ids = cmd[-1].split(",")
+        if "1001" in job_ids:
+            raise CommandLineException(" ".join(cmd), "", "slurm_load_jobs error", 1)
+        # "3" is no longer known to squeue, "4" has completed
+        lines = [f"{job_id} RUNNING" for job_id in job_ids if job_id not in ("3", "4")]
+        lines.append("4 COMPLETED")
+        return "\n".join(lines)
+
+    runner = _runner(slurm.SlurmJobRunner, drmaa_job_states=FAKE_DRMAA.JobState)
+    with mock.patch.object(slurm.commands, "execute", execute):
+        states = runner.get_watched_item_states(job_states)
+    assert [len(cmd[-1].split(",")) for cmd in commands] == [1000, 1000, 500]
+    assert all(cmd[:-1] == ["squeue", "-h", "-o", "%i %T", "-j"] for cmd in commands)
+    # cluster qualified and invalid job ids are not queried
+    assert "2501.cluster2" not in commands[-1][-1]
+    assert states["1"] == states["2001"] == FAKE_DRMAA.JobState.RUNNING
+    # missing, completed and failed batch jobs are left to DRMAA
+    assert "3" not in states
+    assert "4" not in states
+    assert "1001" not in states and "2000" not in states
+    assert len(states) == 2500 - 2 - 1000
+
+
+def test_slurm_missing_jobs_checked_with_drmaa():
+    ds = mock.Mock()
+    ds.job_status.return_value = FAKE_DRMAA.JobState.QUEUED_ACTIVE
+    runner = _runner(
+        slurm.SlurmJobRunner,
+        ds=ds,
+        drmaa_job_states=FAKE_DRMAA.JobState,
+        drmaa_job_state_strings={state: state for state in FAKE_DRMAA.JobState.values()},
+    )
+    job_states = [_job_state("1"), _job_state("2")]
+    runner.watched = list(job_states)
+    with mock.patch.object(drmaa, "drmaa", FAKE_DRMAA), \
+            mock.patch.object(slurm.commands, "execute", return_value="1 RUNNING\n"):
+        runner.check_watched_items()
+    ds.job_status.assert_called_once_with("2")
+    assert [ajs.remote_state for ajs in job_states] == [FAKE_DRMAA.JobState.RUNNING, None]
+    assert job_states[0].running
+    assert job_states[0].job_wrapper.states == [model.Job.states.RUNNING]
+    assert [ajs.old_state for ajs in job_states] == [FAKE_DRMAA.JobState.RUNNING, FAKE_DRMAA.JobState.QUEUED_ACTIVE]
+    assert runner.watched == job_states
+
+
+def test_drmaa_uses_remote_state():
+    ds = mock.Mock()
+    runner = _runner(drmaa.DRMAAJobRunner, ds=ds)
+    job_state = _job_state("1")
+    job_state.remote_state = FAKE_DRMAA.JobState.RUNNING
+    assert runner.check_watched_item(job_state, []) == FAKE_DRMAA.JobState.RUNNING
+    ds.job_status.assert_not_called()
+    job_state.remote_state = None
+    ds.job_status.return_value = FAKE_DRMAA.JobState.DONE
+    assert runner.check_watched_item(job_state, []) == FAKE_DRMAA.JobState.DONE
+    ds.job_status.assert_called_once_with("1")
+
+
+def test_kubernetes_label_selector():
+    k8s_jobs = [{"metadata": {"name": "gxy-1"}}, {"metadata": {"name": "gxy-2"}}]
+    find_job_objects_by_selector = mock.Mock(return_value=bunch.Bunch(response={"items": k8s_jobs}))
+    runner = _runner(kubernetes.KubernetesJobRunner, _pykube_api="api", runner_params={"k8s_namespace": "galaxy"})
+    with mock.patch.object(kubernetes, "find_job_objects_by_selector", find_job_objects_by_selector):
+        assert runner.get_watched_item_states([]) == {}
+        find_job_objects_by_selector.assert_not_called()
+        states = runner.get_watched_item_states([_job_state("gxy-1"), _job_state("gxy-3")])
+    find_job_objects_by_selector.assert_called_once_with("api", {"app.galaxyproject.org/handler": "main.handler_1"}, "galaxy")
+    # gxy-3 is missing from the result and will be looked up by name
+    assert states == {"gxy-1": k8s_jobs[0], "gxy-2": k8s_jobs[1]}
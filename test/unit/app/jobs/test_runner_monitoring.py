@@ -0,0 +1,130 @@
+import datetime
+import threading
+from unittest import mock
+
+from galaxy.jobs import runners
+from galaxy.util import bunch
+
+
+class MockAsynchronousJobRunner(runners.AsynchronousJobRunner):
+    runner_name = "MockRunner"
+
+    def __init__(self, walltime_delta=None, **kwargs):
+        app = bunch.Bunch(
+            config=bunch.Bunch(redact_email_in_job_name=True, job_runner_monitor_sleep=1),
+            model=bunch.Bunch(context=None),
+            job_config=bunch.Bunch(limits=bunch.Bunch(walltime_delta=walltime_delta)),
+        )
+        super().__init__(app, 1, **kwargs)
+        self.checked = []
+        self.remote_states = {}
+        self.on_check = None
+
+    def check_watched_item(self, job_state):
+        self.checked.append(job_state.job_id)
+        if self.on_check:
+            self.on_check(job_state)
+        job_state.old_state = self.remote_states.get(job_state.job_id, job_state.old_state)
+        return job_state
+
+
+def _runner(**kwargs):
+    runner = MockAsynchronousJobRunner(monitor_backoff_max_interval="8", monitor_backoff_factor="2", **kwargs)
+    for job_id in ("1", "2"):
+        runner.watched.append(runners.AsynchronousJobState(job_id=job_id))
+    return runner
+
+
+def _check_at(runner, now):
+    runner.checked = []
+    with mock.patch("galaxy.jobs.runners.time.time", return_value=now):
+        runner.check_due_watched_items()
+    return sorted(runner.checked)
+
+
+def test_backoff_without_max_interval_checks_every_job():
+    runner = MockAsynchronousJobRunner()
+    runner.watched.append(runners.AsynchronousJobState(job_id="1"))
+    for now in (0, 0.1, 0.2):
+        assert _check_at(runner, now) == ["1"]
+
+
+def test_backoff_grows_interval_until_max():
+    runner = _runner()
+    job_state = runner.watched[0]
+    now = 0
+    intervals = []
+    for _ in range(5):
+        assert "1" in _check_at(runner, now)
+        intervals.append(job_state.check_interval)
+        now = job_state.next_check_time
+    assert intervals == [1, 2, 4, 8, 8]
+
+
+def test_backoff_resets_on_state_change():
+    runner = _runner()
+    job_state = runner.watched[0]
+    now = 0
+    for _ in range(3):
+        _check_at(runner, now)
+        now = job_state.next_check_time
+    assert job_state.check_interval == 4
+    runner.remote_states["1"] = "running"
+    _check_at(runner, now)
+    assert job_state.check_interval == 1
+    assert job_state.next_check_time == now + 1
+
+
+def test_backoff_near_walltime_uses_min_interval():
+    runner = _runner(walltime_delta=datetime.timedelta(seconds=5))
+    job_state = runner.watched[0]
+    job_state.running = True
+    job_state.start_time = datetime.datetime.now()
+    now = 0
+    intervals = []
+    for _ in range(5):
+        _check_at(runner, now)
+        intervals.append(job_state.check_interval)
+        now = job_state.next_check_time
+    # an interval of 8 seconds would overshoot the walltime limit
+    assert intervals == [1, 2, 4, 1, 2]
+
+
+def test_only_due_and_expedited_jobs_checked():
+    runner = _runner()
+    assert _check_at(runner, 0) == ["1", "2"]
+    # both jobs are next due at 1
+    assert _check_at(runner, 0.5) == []
+    runner.expedite_monitoring("2")
+    assert _check_at(runner, 0.5) == ["2"]
+    assert _check_at(runner, 1) == ["1"]
+
+
+def test_expedite_ignored_without_backoff():
+    runner = MockAsynchronousJobRunner()
+    runner.expedite_monitoring("1")
+    assert runner.expedite_queue.empty()
+
+
+def test_unwatch_during_check():
+    runner = _runner()
+    _check_at(runner, 0)
+    runner.watched.append(runners.AsynchronousJobState(job_id="3"))
+    unwatched = []
+
+    def unwatch(job_state):
+        # other threads (e.g. a condor stop_job) drop jobs from the watch
+        # list while the monitor thread checks the due jobs, without waiting
+        # for the check to finish
+        for job_id in ("2", "3"):
+            thread = threading.Thread(target=lambda job_id=job_id: unwatched.append(runner.unwatch(job_id)))
+            thread.start()
+            thread.join()
+
+    runner.on_check = unwatch
+    # only job 3 is due, jobs 1 and 2 are not
+    assert _check_at(runner, 0.5) == ["3"]
+    assert sorted(ajs.job_id for ajs in unwatched) == ["2", "3"]
+    # job 3 is not put back by the check that was in progress
+    assert [ajs.job_id for ajs in runner.watched] == ["1"]
+    assert runner.unwatch("2") is None
@@ -659,10 +659,10 @@ class HDAFilterParserTestCase(HDATestCase):
         self.assertFnFilter(self.filter_parser.parse_filter('genome_build', 'eq', 'wot'))
         self.assertFnFilter(self.filter_parser.parse_filter('genome_build', 'contains', 'wot'))
         # data_type
-        self.assertFnFilter(self.filter_parser.parse_filter('data_type', 'eq', 'wot'))
-        self.assertFnFilter(self.filter_parser.parse_filter('data_type', 'isinstance', 'wot'))
+        self.assertORMFunctionFilter(self.filter_parser.parse_filter('data_type', 'eq', 'wot'))
+        self.assertORMFunctionFilter(self.filter_parser.parse_filter('data_type', 'isinstance', 'wot'))
         # annotatable
-        self.assertFnFilter(self.filter_parser.parse_filter('annotation', 'has', 'wot'))
+        self.assertORMFunctionFilter(self.filter_parser.parse_filter('annotation', 'has', 'wot'))
 
 #     def test_genome_build_filters( self ):
 #         pass
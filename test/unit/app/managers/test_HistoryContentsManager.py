@@ -6,8 +6,10 @@ import unittest
 
 from sqlalchemy import column, desc, false, true
 
-from galaxy.managers import base, collections, hdas, history_contents
+from galaxy import exceptions
+from galaxy.managers import base, collections, hdas, hdcas, history_contents
 from galaxy.managers.histories import HistoryManager
+from galaxy.model.tags import GalaxyTagHandler
 from .base import BaseTestCase
 from .base import CreatesCollectionsMixin
 
@@ -351,6 +353,96 @@ class HistoryContentsFilterParserTestCase(HistoryAsContainerBaseTestCase):
         self.assertRaises(ValueError, self.filter_parser.parse_date, '2009-02-13 18:13:00.1234567')
 
 
+# =============================================================================
+# web.url_for doesn't work well in the framework
+def testable_url_for(*a, **k):
+    return f'(fake url): {a}, {k}'
+
+
+hdas.HDASerializer.url_for = staticmethod(testable_url_for)
+hdcas.HDCASerializer.url_for = staticmethod(testable_url_for)
+history_contents.HistoryContentsSerializer.url_for = staticmethod(testable_url_for)
+
+
+class HistoryContentsSerializerTestCase(HistoryAsContainerBaseTestCase):
+
+    def set_up_managers(self):
+        super().set_up_managers()
+        self.hda_serializer = hdas.HDASerializer(self.app)
+        self.hdca_serializer = hdcas.HDCASerializer(self.app)
+        self.contents_serializer = history_contents.HistoryContentsSerializer(self.app)
+        self.tag_handler = self.app[GalaxyTagHandler]
+
+    def _keys_by_type(self, view, keys=None):
+        keys_by_type = {}
+        for content_type, serializer in (('dataset', self.hda_serializer), ('dataset_collection', self.hdca_serializer)):
+            view_keys = serializer.views[view] + (keys or [])
+            keys_by_type[content_type] = [key for key in dict.fromkeys(view_keys) if key in serializer.serializable_keyset]
+        return keys_by_type
+
+    def test_serialize_rows(self):
+        user2 = self.user_manager.create(**user2_data)
+        history = self.history_manager.create(name='history', user=user2)
+        contents = [self.add_hda_to_history(history, name=('hda-' + str(x))) for x in range(3)]
+        contents.append(self.add_list_collection_to_history(history, contents[:2]))
+        self.tag_handler.apply_item_tags(user=user2, item=contents[0], tags_str='tag1,name:group1')
+        self.tag_handler.apply_item_tags(user=user2, item=contents[3], tags_str='tag2')
+        contents[2].state = 'error'
+        self.app.model.context.flush()
+
+        self.log("summary views should be serializable from the contents rows")
+        keys_by_type = self._keys_by_type('summary')
+        inaccessible_keys = self.hda_serializer.views['inaccessible']
+        self.assertTrue(self.contents_serializer.can_serialize_rows(keys_by_type, inaccessible_keys))
+
+        self.log("serializing the rows should match serializing the models")
+        rows = self.contents_manager.contents(history, expand_models=False,
+            columns=self.contents_serializer.row_columns(keys_by_type, inaccessible_keys))
+        expected = [self.hda_serializer.serialize_to_view(content, view='summary', user=user2) for content in contents[:3]]
+        expected.append(self.hdca_serializer.serialize_to_view(contents[3], view='summary', user=user2))
+        self.assertEqual(self.contents_serializer.serialize_rows(rows, keys_by_type, inaccessible_keys, user=user2), expected)
+
+        self.log("keys that need the models should not be serializable from the rows")
+        self.assertFalse(self.contents_serializer.can_serialize_rows(self._keys_by_type('summary', keys=['peek']), inaccessible_keys))
+        self.assertFalse(self.contents_serializer.can_serialize_rows(self._keys_by_type('detailed'), inaccessible_keys))
+
+        self.log("unknown columns should raise an error")
+        self.assertRaises(exceptions.RequestParameterInvalidException,
+            self.contents_manager.contents, history, expand_models=False, columns=['peek'])
+
+    def test_serialize_rows_inaccessible(self):
+        owner = self.user_manager.create(**user2_data)
+        other = self.user_manager.create(**user3_data)
+        history = self.history_manager.create(name='history', user=owner)
+        owner_private_role = self.user_manager.private_role(owner)
+        public_hda = self.add_hda_to_history(history, name='public')
+        private_dataset = self.hda_manager.dataset_manager.create(
+            manage_roles=[owner_private_role], access_roles=[owner_private_role])
+        private_hda = self.hda_manager.create(history=history, dataset=private_dataset, name='private')
+        self.tag_handler.apply_item_tags(user=owner, item=private_hda, tags_str='secret')
+        self.app.model.context.flush()
+
+        keys_by_type = self._keys_by_type('summary', keys=['accessible'])
+        inaccessible_keys = self.hda_serializer.views['inaccessible']
+        rows = self.contents_manager.contents(history, expand_models=False,
+            columns=self.contents_serializer.row_columns(keys_by_type, inaccessible_keys))
+
+        for user in (owner, other, None):
+            self.log("serializing the rows should match serializing the models for each viewer")
+            expected = [self.hda_serializer.serialize_to_view(hda, view='summary', keys=['accessible'], user=user)
+                        for hda in (public_hda, private_hda)]
+            serialized = self.contents_serializer.serialize_rows(rows, keys_by_type, inaccessible_keys, user=user)
+            self.assertEqual(serialized, expected)
+
+        self.log("datasets the viewer cannot access should only show the inaccessible keys")
+        serialized = self.contents_serializer.serialize_rows(rows, keys_by_type, inaccessible_keys, user=other)
+        self.assertTrue(serialized[0]['accessible'])
+        self.assertEqual(set(serialized[1].keys()), set(inaccessible_keys))
+        self.assertFalse(serialized[1]['accessible'])
+        self.assertNotIn('tags', serialized[1])
+        self.assertNotIn('extension', serialized[1])
+
+
 if __name__ == '__main__':
     # or more generally, nosetests test_resourcemanagers.py -s -v
     unittest.main()
@@ -761,14 +761,11 @@ class HistoryFiltersTestCase(BaseTestCase):
         history3 = self.history_manager.create(name='history3', user=user2)
 
         filters = self.filter_parser.parse_filters([('annotation', 'has', 'no play'), ])
-        anno_filter = filters[0].filter
+        self.assertORMFunctionFilter(filters[0])
 
         history3.add_item_annotation(self.trans.sa_session, user2, history3, "All work and no play")
         self.trans.sa_session.flush()
 
-        self.assertTrue(anno_filter(history3))
-        self.assertFalse(anno_filter(history2))
-
         self.assertEqual(self.history_manager.list(filters=filters), [history3])
 
         self.log('should allow combinations of orm and fn filters')
@@ -906,6 +903,17 @@ class HistoryFiltersTestCase(BaseTestCase):
         found = self.history_manager.list(filters=filters, offset=-1)
         self.assertEqual(found, deleted_and_annotated)
 
+        self.log("fn filtered lists should be paged through in windows")
+        self.history_manager.list_window_size = 1
+        filters = [
+            model.History.deleted == true(),
+            base.parsed_filter(filter_type='function', filter=lambda h: h.name != 'history2'),
+        ]
+        found = self.history_manager.list(filters=filters)
+        self.assertEqual(found, [history1, history3])
+        found = self.history_manager.list(filters=filters, offset=1, limit=1)
+        self.assertEqual(found, [history3])
+
     # TODO: eq, ge, le
     # def test_ratings( self ):
     #     pass
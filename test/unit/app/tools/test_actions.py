@@ -111,6 +111,22 @@ class DefaultToolActionTestCase(unittest.TestCase, tools_support.UsesTools):
         # Again this is a stupid way to ensure data parameters are wrapped.
         self.assertEqual(output["out1"].name, "Output (%s)" % hda1.dataset.get_file_name())
 
+    def test_batch_execution_defers_hids(self):
+        self._init_tool(TWO_OUTPUTS)
+        outputs = []
+        for _ in range(3):
+            _, out_data, _ = self.action.execute(
+                tool=self.tool,
+                trans=self.trans,
+                history=self.history,
+                incoming=dict(param1="moo"),
+                flush_job=False,
+            )
+            outputs.extend(out_data.values())
+        assert all(output.hid is None for output in outputs)
+        self.history.add_pending_items()
+        assert [output.hid for output in outputs] == list(range(1, 7))
+
     def test_inactive_user_job_create_failure(self):
         self.trans.user_is_active = False
         try:
@@ -1,3 +1,4 @@
+import json
 import os
 import subprocess
 import unittest
@@ -6,6 +7,7 @@ from galaxy import model
 from galaxy.app_unittest_utils import tools_support
 from galaxy.job_execution.datasets import DatasetPath
 from galaxy.metadata import get_metadata_compute_strategy
+from galaxy.metadata.cache import claim_metadata_cache
 from galaxy.objectstore import ObjectStorePopulator
 from galaxy.util import galaxy_directory, safe_makedirs
 
@@ -63,6 +65,57 @@ class MetadataTestCase(unittest.TestCase, tools_support.UsesTools):
         assert output_dataset.metadata.data_lines == 2
         assert output_dataset.metadata.sequences == 1
 
+    def test_metadata_cache_directory(self):
+        self.app.config.metadata_strategy = "directory"
+        source_file_name = os.path.join(galaxy_directory(), "test/functional/tools/for_workflows/cat.xml")
+        self._init_tool_for_path(source_file_name)
+        metadata_cache_dir = os.path.join(self.test_directory, "metadata_cache")
+        sa_session = self.app.model.session
+
+        def set_metadata(output_dataset):
+            sa_session.flush()
+            command = self.metadata_command({"out_file1": output_dataset}, metadata_cache_dir=metadata_cache_dir)
+            self._write_output_dataset_contents(output_dataset, ">seq1\nGCTGCATG\n")
+            self._write_job_files()
+            self.exec_metadata_command(command)
+            assert self.metadata_compute_strategy.external_metadata_set_successfully(output_dataset, "out_file1", sa_session, working_directory=self.job_working_directory)
+            self.metadata_compute_strategy.load_metadata(output_dataset, "out_file1", sa_session, working_directory=self.job_working_directory)
+
+        def cache_files(kind):
+            return [os.path.join(root, f) for root, _, files in os.walk(os.path.join(metadata_cache_dir, kind)) for f in files]
+
+        # Not claimed by this host, the cache is left alone.
+        unclaimed_output = self._create_output_dataset(extension="fasta")
+        set_metadata(unclaimed_output)
+        assert unclaimed_output.metadata.sequences == 1
+        assert not os.path.exists(metadata_cache_dir)
+
+        assert claim_metadata_cache(metadata_cache_dir, 0) is None
+        first_output = self._create_output_dataset(extension="fasta")
+        set_metadata(first_output)
+        assert first_output.metadata.sequences == 1
+        # Only the signature is remembered, nothing was hashed.
+        assert len(cache_files("signatures")) == 1
+        assert not cache_files("hashes")
+        assert not cache_files("entries")
+
+        second_output = self._create_output_dataset(extension="fasta")
+        set_metadata(second_output)
+        assert second_output.metadata.sequences == 1
+        assert len(cache_files("hashes")) == 1
+        cache_entries = cache_files("entries")
+        assert len(cache_entries) == 1
+        # Tamper with the entry to verify the third dataset's metadata comes from the cache.
+        with open(cache_entries[0]) as f:
+            cached_metadata = json.load(f)
+        cached_metadata["sequences"] = 7
+        with open(cache_entries[0], "w") as f:
+            json.dump(cached_metadata, f)
+        third_output = self._create_output_dataset(extension="fasta")
+        set_metadata(third_output)
+        assert third_output.metadata.data_lines == 2
+        assert third_output.metadata.sequences == 7
+
     def test_primary_dataset_output_extension_directory(self):
         self.app.config.metadata_strategy = "directory"
         self._test_primary_dataset_output_extension()
@@ -182,7 +235,7 @@ class MetadataTestCase(unittest.TestCase, tools_support.UsesTools):
         with open(os.path.join(self.job_working_directory, "tool_stderr"), "wb") as f:
             f.write(stderr.encode("utf-8"))
 
-    def metadata_command(self, output_datasets, output_collections=None):
+    def metadata_command(self, output_datasets, output_collections=None, **kwds):
         output_collections = output_collections or {}
         metadata_compute_strategy = get_metadata_compute_strategy(self.app.config, self.job.id)
         self.metadata_compute_strategy = metadata_compute_strategy
@@ -210,7 +263,8 @@ class MetadataTestCase(unittest.TestCase, tools_support.UsesTools):
                                                                     tool=self.tool,
                                                                     job=self.job,
                                                                     object_store_conf=self.app.object_store.to_dict(),
-                                                                    max_metadata_value_size=10000)
+                                                                    max_metadata_value_size=10000,
+                                                                    **kwds)
         return command
 
     def exec_metadata_command(self, command):
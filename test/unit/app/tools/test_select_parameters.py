@@ -4,6 +4,7 @@ import pytest
 
 from galaxy import model
 from galaxy.tools.parameters import basic
+from galaxy.tools.parameters.dataset_matcher import set_dataset_matcher_factory
 from .util import BaseParameterTestCase
 
 
@@ -50,6 +51,21 @@ class SelectToolParameterTestCase(BaseParameterTestCase):
         assert ("testname2", "testpath2", False) in self.param.get_options(self.trans, {"input_bam": "testpath2"})
         assert len(self.param.get_options(self.trans, {"input_bam": "testpath3"})) == 0
 
+    def test_options_cached_per_request(self):
+        self.options_xml = '''<options from_data_table="test_table"><filter type="static_value" value="testname1" column="0" /></options>'''
+        set_dataset_matcher_factory(self.trans, None)
+        table = self.app.tool_data_tables["test_table"]
+        table.get_fields = Mock(wraps=table.get_fields)
+        for _ in range(3):
+            assert self.param.get_options(self.trans, {}) == [("testname1", "testpath1", False)]
+        assert table.get_fields.call_count == 1
+
+    def test_dependent_options_not_cached(self):
+        self.options_xml = '''<options from_data_table="test_table"><filter type="param_value" ref="input_bam" column="0" /></options>'''
+        set_dataset_matcher_factory(self.trans, None)
+        assert self.param.get_options(self.trans, {"input_bam": "testname1"}) == [("testname1", "testpath1", False)]
+        assert self.param.get_options(self.trans, {"input_bam": "testname2"}) == [("testname2", "testpath2", False)]
+
     # TODO: Good deal of overlap here with DataToolParameterTestCase,
     # refactor.
     def setUp(self):
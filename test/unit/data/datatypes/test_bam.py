@@ -1,5 +1,10 @@
+import shutil
+import subprocess
+from unittest import mock
+
 import pysam
 
+from galaxy.datatypes import binary
 from galaxy.datatypes.binary import Bam
 from .util import (
     get_dataset,
@@ -38,6 +43,23 @@ def test_groom_dataset_content():
     raise Exception('Bam grooming did not occur in-place')
 
 
+def test_dataset_content_needs_grooming_checks_once():
+    b = Bam()
+    with get_input_files('2.shuffled.unsorted.bam') as input_files, get_tmp_path(suffix='.bam') as bam_path:
+        shutil.copy(input_files[0], bam_path)
+        with mock.patch.object(binary.subprocess, "check_call", wraps=subprocess.check_call) as check_call:
+            assert b.dataset_content_needs_grooming(bam_path) is True
+            assert b.dataset_content_needs_grooming(bam_path) is True
+            assert check_call.call_count == 1
+            b.groom_dataset_content(bam_path)
+            # the sorted file is known not to need grooming
+            assert b.dataset_content_needs_grooming(bam_path) is False
+            assert check_call.call_count == 1
+        # a modified file is checked again
+        shutil.copy(input_files[0], bam_path)
+        assert b.dataset_content_needs_grooming(bam_path) is True
+
+
 def test_set_meta_presorted():
     b = Bam()
     with get_dataset('1.bam') as dataset:
@@ -3,17 +3,20 @@ Unit tests for base DataTypes.
 .. seealso:: galaxy.datatypes.data
 """
 import os
+import tempfile
 
 from galaxy.datatypes.anvio import AnvioStructureDB
 from galaxy.datatypes.data import (
     Data,
     get_file_peek,
+    Text,
 )
 from galaxy.datatypes.interval import (
     Bed,
     BedStrict
 )
 from galaxy.util import galaxy_directory
+from .util import MockDataset
 
 
 def test_get_file_peek():
@@ -29,3 +32,12 @@ def test_is_datatype_change_allowed():
     assert AnvioStructureDB.is_datatype_change_allowed() is False
     # BedStrict explictly disallows datatype change with `allow_datatype_change = False`
     assert BedStrict.is_datatype_change_allowed() is False
+
+
+def test_count_data_lines():
+    with tempfile.NamedTemporaryFile(mode='w', delete=False) as tf:
+        tf.write("#header\n1\t2\n\n  \n  # comment\r\n3\t4\r5\t6")
+    dataset = MockDataset(1)
+    dataset.file_name = tf.name
+    assert Text().count_data_lines(dataset) == 3
+    os.remove(tf.name)
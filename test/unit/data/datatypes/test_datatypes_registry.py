@@ -114,3 +114,19 @@ def test_sniff_compressed_dynamic_datatypes_default_off():
     assert 'fastq' not in sniff.guess_ext(fname, sniff_order)
     fname = sniff.get_test_fname('1.fastqsanger.bz2')
     assert 'fastq' not in sniff.guess_ext(fname, sniff_order)
+
+
+def test_find_conversion_destination():
+    datatypes_registry = example_datatype_registry_for_sample()
+    datatypes_registry.datatype_converters['fasta'] = {'tabular': object()}
+    fastq_datatype = datatypes_registry.get_datatype_by_extension('fastq')
+    tabular_datatype = datatypes_registry.get_datatype_by_extension('tabular')
+
+    # Direct matches, by instance and by class.
+    assert datatypes_registry.find_conversion_destination_for_dataset_by_extensions('fastqsanger', [fastq_datatype]) == (True, None, None)
+    assert datatypes_registry.find_conversion_destination_for_dataset_by_extensions('fastqsanger', [fastq_datatype.__class__]) == (True, None, None)
+
+    # Implicit conversions.
+    assert datatypes_registry.find_conversion_destination_for_dataset_by_extensions('fasta', [tabular_datatype]) == (False, 'tabular', None)
+    assert datatypes_registry.find_conversion_destination_for_dataset_by_extensions('fasta', [tabular_datatype], converter_safe=False) == (False, None, None)
+    assert datatypes_registry.find_conversion_destination_for_dataset_by_extensions('fastq', [tabular_datatype]) == (False, None, None)
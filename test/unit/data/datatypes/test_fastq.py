@@ -0,0 +1,60 @@
+import json
+
+from galaxy.datatypes.sequence import FastqSanger
+from .util import (
+    get_dataset,
+    get_input_files,
+    MockDataset,
+    MockMetadata,
+)
+
+
+def test_fastq_sequence_index():
+    fastq = FastqSanger()
+    fastq.sequence_index_interval = 1
+    with get_dataset('1.fastqsanger', index_attr='sequence_index') as dataset:
+        fastq.set_meta(dataset)
+        assert dataset.metadata.sequences == 2
+        with open(dataset.metadata.sequence_index.file_name) as fh:
+            sections = json.load(fh)['sections']
+        with open(dataset.file_name, 'rb') as fh:
+            contents = fh.read()
+        assert [section['sequences'] for section in sections] == [1, 1]
+        assert sections[0]['start'] == 0
+        assert sections[0]['end'] == sections[1]['start']
+        assert sections[1]['end'] == len(contents)
+        assert contents[sections[1]['start']:].startswith(b'@')
+
+
+def test_fastq_sequence_index_compressed(tmp_path):
+    fastq = FastqSanger()
+    fastq.sequence_index_interval = 1
+    with get_input_files('1.fastqsanger.gz') as input_files:
+        dataset = MockDataset(1)
+        dataset.file_name = input_files[0]
+        dataset.metadata.sequence_index = MockMetadata()
+        dataset.metadata.sequence_index.file_name = str(tmp_path / 'index.fqtoc')
+        fastq.set_meta(dataset)
+        assert dataset.metadata.sequences == 2
+        assert dataset.metadata.sequence_index is None
+
+
+def test_fastq_sequence_index_quality_at_sign(tmp_path):
+    # Sanger quality strings may start with '@' (Phred 31)
+    records = [b'@read%d\nACGT\n+\n@III\n' % i for i in range(3)]
+    dataset = MockDataset(1)
+    dataset.file_name = str(tmp_path / 'reads.fastqsanger')
+    with open(dataset.file_name, 'wb') as fh:
+        fh.write(b''.join(records))
+    dataset.metadata.sequence_index = MockMetadata()
+    dataset.metadata.sequence_index.file_name = str(tmp_path / 'reads.fqtoc')
+    fastq = FastqSanger()
+    fastq.sequence_index_interval = 1
+    fastq.set_meta(dataset)
+    assert dataset.metadata.sequences == 3
+    with open(dataset.metadata.sequence_index.file_name) as fh:
+        sections = json.load(fh)['sections']
+    starts = [sum(len(record) for record in records[:i]) for i in range(3)]
+    assert [section['start'] for section in sections] == starts
+    assert [section['sequences'] for section in sections] == [1, 1, 1]
+    assert sections[-1]['end'] == len(b''.join(records))
@@ -5,7 +5,9 @@ import pytest
 from galaxy.datatypes.sniff import (
     convert_newlines,
     convert_newlines_sep2tabs,
+    FilePrefix,
     get_test_fname,
+    run_sniffers_raw,
 )
 
 
@@ -76,3 +78,36 @@ def test_convert_sep2tabs(source, expected):
         assert_converts_to_1234_convert_sep2tabs(source, expected=expected)
     else:
         assert_converts_to_1234_convert_sep2tabs(source)
+
+
+class MagicSniffer:
+    file_ext = "magic"
+    is_binary = True
+    sniff_magic = (b"MAGIC",)
+
+    def __init__(self):
+        self.sniffed = []
+
+    def sniff(self, filename):
+        self.sniffed.append(filename)
+        return True
+
+
+def test_file_prefix_lines():
+    with tempfile.NamedTemporaryFile(delete=False, mode='w') as tf:
+        tf.write("1 2\n3 4\n5 6")
+    file_prefix = FilePrefix(tf.name)
+    assert file_prefix.lines() == ["1 2\n", "3 4\n", "5 6"]
+    assert file_prefix.lines() is file_prefix.lines()
+    assert list(file_prefix.line_iterator()) == file_prefix.lines()
+    assert file_prefix.startswith("1 2")
+
+
+def test_run_sniffers_raw_sniff_magic():
+    sniffer = MagicSniffer()
+    assert run_sniffers_raw(get_test_fname("wiggle.wig"), [sniffer]) is None
+    assert sniffer.sniffed == []
+    with tempfile.NamedTemporaryFile(delete=False, mode='wb') as tf:
+        tf.write(b"MAGIC\x00\x01")
+    assert run_sniffers_raw(tf.name, [sniffer]) == "magic"
+    assert sniffer.sniffed == [tf.name]
@@ -5344,6 +5344,35 @@ class TestUserAuthnzToken(BaseTest):
             assert stored_obj.user.id == user.id
 
 
+class TestUserDiskUsageLedger(BaseTest):
+    def test_table(self, cls_):
+        assert cls_.__tablename__ == "user_disk_usage_ledger"
+
+    def test_columns(self, session, cls_, user):
+        create_time = datetime.now()
+        amount = 42
+        obj = cls_()
+        obj.create_time = create_time
+        obj.user_id = user.id
+        obj.amount = amount
+
+        with dbcleanup(session, obj) as obj_id:
+            stored_obj = get_stored_obj(session, cls_, obj_id)
+            assert stored_obj.id == obj_id
+            assert stored_obj.create_time == create_time
+            assert stored_obj.user_id == user.id
+            assert stored_obj.amount == amount
+
+    def test_relationships(self, session, cls_, user):
+        obj = cls_()
+        obj.user = user
+        obj.amount = 1
+
+        with dbcleanup(session, obj) as obj_id:
+            stored_obj = get_stored_obj(session, cls_, obj_id)
+            assert stored_obj.user.id == user.id
+
+
 class TestUserGroupAssociation(BaseTest):
     def test_table(self, cls_):
         assert cls_.__tablename__ == "user_group_association"
@@ -1,4 +1,6 @@
+from galaxy.exceptions import MalformedId
 from galaxy.security import idencoding
+from galaxy.util import ExecutionTimer
 
 
 test_helper_1 = idencoding.IdEncodingHelper(id_secret="secu1")
@@ -129,3 +131,51 @@ def test_encode_decode_guid():
     encoded_key = test_helper_1.encode_guid(session_key)
     decoded_key = test_helper_1.decode_guid(encoded_key)
     assert session_key == decoded_key, f"{session_key} != {decoded_key}"
+
+
+def test_encode_decode_ids():
+    ids = [1, 2, 3, 123456789012, 1]
+    encoded_ids = test_helper_1.encode_ids(ids)
+    assert encoded_ids == [test_helper_1.encode_id(id_) for id_ in ids]
+    assert test_helper_1.decode_ids(encoded_ids) == ids
+    assert test_helper_1.encode_ids([]) == []
+    # Batch encoding of ids not in the cache gives the same result
+    uncached_helper = idencoding.IdEncodingHelper(id_secret="secu1")
+    assert uncached_helper.encode_ids(ids, kind="k1") == [test_helper_1.encode_id(id_, kind="k1") for id_ in ids]
+
+
+def test_decode_ids_malformed():
+    encoded_ids = test_helper_1.encode_ids([1, 2])
+    malformed_id_raised = False
+    try:
+        test_helper_1.decode_ids(encoded_ids + ["123"])
+    except MalformedId:
+        malformed_id_raised = True
+    assert malformed_id_raised
+
+
+def test_encoded_id_cache_eviction():
+    helper = idencoding.IdEncodingHelper(id_secret="secu1")
+    helper.encoded_id_cache.maxsize = 2
+    encoded_id = helper.encode_id(1)
+    helper.encode_id(2)
+    helper.encode_id(3)
+    assert helper.encoded_id_cache.get((1, None)) is None
+    assert helper.encoded_id_cache.get((3, None)) == helper.encode_id(3)
+    assert helper.encode_id(1) == encoded_id
+
+
+def test_encode_ids_benchmark(num_ids=10000):
+    ids = list(range(num_ids))
+    helper = idencoding.IdEncodingHelper(id_secret="secu1")
+    timer = ExecutionTimer()
+    for id_ in ids:
+        helper.encode_id(id_)
+    print(f"encoded {num_ids} ids one at a time {timer}")
+    helper = idencoding.IdEncodingHelper(id_secret="secu1")
+    timer = ExecutionTimer()
+    helper.encode_ids(ids)
+    print(f"encoded {num_ids} ids in a batch {timer}")
+    timer = ExecutionTimer()
+    helper.encode_ids(ids)
+    print(f"encoded {num_ids} cached ids in a batch {timer}")
@@ -103,6 +103,42 @@ def test_history_collection_copy(list_size=NUM_DATASETS):
             assert annotation_str == "annotation #%d" % hdca.hid, annotation_str
 
 
+def test_history_copy_to_other_user_adjusts_usage_once(num_datasets=NUM_DATASETS):
+    with _setup_mapping_and_user() as (test_config, object_store, model, old_history):
+        for i in range(num_datasets):
+            hda_path = test_config.write("moo", "test_metadata_original_%d" % i)
+            _create_hda(model, object_store, old_history, hda_path)
+        other_user = User(email="historycopyother@example.com", password="password")
+        model.context.add(other_user)
+        model.context.flush()
+
+        new_history = old_history.copy(target_user=other_user)
+        assert len(new_history.active_datasets) == num_datasets
+        ledger = model.context.query(galaxy.model.UserDiskUsageLedger).filter_by(user_id=other_user.id).all()
+        assert len(ledger) == 1
+        assert ledger[0].amount == 3 * num_datasets
+        assert other_user.get_disk_usage() == 3 * num_datasets
+
+
+def test_history_copy_filters_contents():
+    with _setup_mapping_and_user() as (test_config, object_store, model, old_history):
+        hdas = []
+        for i in range(3):
+            hda_path = test_config.write("moo", "test_metadata_original_%d" % i)
+            hdas.append(_create_hda(model, object_store, old_history, hda_path))
+        hdas[1].deleted = True
+        hdas[2].dataset.deleted = True
+        model.context.flush()
+
+        def copied_hids(**kwd):
+            new_history = old_history.copy(target_user=old_history.user, **kwd)
+            return [hda.hid for hda in new_history.datasets]
+
+        assert copied_hids() == [hdas[0].hid, hdas[2].hid]
+        assert copied_hids(all_datasets=True) == [hda.hid for hda in hdas]
+        assert copied_hids(activatable=True) == [hdas[0].hid, hdas[1].hid]
+
+
 @contextlib.contextmanager
 def _setup_mapping_and_user():
     with TestConfig(DISK_TEST_CONFIG) as (test_config, object_store):
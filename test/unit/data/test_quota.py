@@ -33,6 +33,40 @@ class CalculateUsageTestCase(BaseModelTestCase):
 
         assert u.calculate_disk_usage() == 10
 
+    def test_usage_ledger(self):
+        u = model.User(email="usage_ledger@example.com", password="password")
+        self.persist(u)
+
+        u.adjust_total_disk_usage(10)
+        u.adjust_total_disk_usage(-3)
+        self.model.session.flush()
+        assert u.disk_usage is None
+        assert u.get_disk_usage() == 7
+
+        model.UserDiskUsageLedger.compact(self.model.session, batch_size=1)
+        assert u.disk_usage == 7
+        assert model.UserDiskUsageLedger.pending_amount(self.model.session, u.id) == 0
+        assert u.get_disk_usage() == 7
+
+        # recalculation replaces compacted and pending usage
+        u.adjust_total_disk_usage(5)
+        self.model.session.flush()
+        u.calculate_and_set_disk_usage()
+        assert u.get_disk_usage() == 0
+
+    def test_usage_ledger_discard_up_to_max_id(self):
+        u = model.User(email="usage_ledger_discard@example.com", password="password")
+        self.persist(u)
+
+        u.adjust_total_disk_usage(10)
+        self.model.session.flush()
+        max_id = model.UserDiskUsageLedger.max_id(self.model.session, u.id)
+        # recorded after the recalculation started, must not be lost
+        u.adjust_total_disk_usage(4)
+        self.model.session.flush()
+        model.UserDiskUsageLedger.discard(self.model.session, u.id, max_id=max_id)
+        assert model.UserDiskUsageLedger.pending_amount(self.model.session, u.id) == 4
+
 
 class QuotaTestCase(BaseModelTestCase):
 
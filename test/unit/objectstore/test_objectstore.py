@@ -1,18 +1,28 @@
 import os
+import time
 from tempfile import mkdtemp
+from unittest import mock
 from uuid import uuid4
 
+import pytest
+
 from galaxy.exceptions import ObjectInvalid
 from galaxy.objectstore.azure_blob import AzureBlobObjectStore
+from galaxy.objectstore.caching import (
+    CacheIndex,
+    CacheMonitor,
+)
 from galaxy.objectstore.cloud import Cloud
 from galaxy.objectstore.pithos import PithosObjectStore
 from galaxy.objectstore.s3 import S3ObjectStore
+from galaxy.objectstore.s3_multipart_upload import _part_ranges, _part_size, multipart_download
 from galaxy.objectstore.unittest_utils import (
     Config as TestConfig,
     DISK_TEST_CONFIG,
     DISK_TEST_CONFIG_YAML,
 )
 from galaxy.util import directory_hash_id
+from galaxy.util.bunch import Bunch
 
 
 def test_disk_store():
@@ -38,6 +48,7 @@ def test_disk_store():
             # Test get_data
             data = object_store.get_data(hello_world_dataset)
             assert data == "Hello World!"
+            assert object_store.get_data(hello_world_dataset, start=6, count=5, binary=True) == b"World"
 
             data = object_store.get_data(hello_world_dataset, start=1, count=6)
             assert data == "ello W"
@@ -273,6 +284,39 @@ def test_hierarchical_store():
             _assert_key_has_value(as_dict, "type", "hierarchical")
 
 
+def test_hierarchical_store_location_cache():
+    with TestConfig(HIERARCHICAL_TEST_CONFIG) as (directory, object_store):
+        location_cache = object_store.location_cache
+        directory.write("Hello World!", "files2/000/dataset_3.dat")
+        assert object_store.exists(MockDataset(3))
+        assert (location_cache.hits, location_cache.misses) == (0, 1)
+
+        # Backend found by exists is reused without probing the others.
+        assert object_store.get_data(MockDataset(3)) == "Hello World!"
+        assert object_store.size(MockDataset(3)) == 12
+        assert (location_cache.hits, location_cache.misses) == (2, 1)
+
+        # Deleting the object invalidates its location.
+        object_store.delete(MockDataset(3))
+        assert not object_store.exists(MockDataset(3))
+        assert location_cache.misses == 2
+
+
+def test_hierarchical_store_location_cache_moved_object():
+    with TestConfig(HIERARCHICAL_TEST_CONFIG) as (directory, object_store):
+        location_cache = object_store.location_cache
+        directory.write("Hello World!", "files2/000/dataset_3.dat")
+        assert object_store.get_data(MockDataset(3)) == "Hello World!"
+
+        # Moved to another backend behind the object store's back, the stale
+        # location is dropped and the object is found again.
+        directory.write("Hello Moved World!", "files1/000/dataset_3.dat")
+        os.remove(os.path.join(directory.temp_directory, "files2/000/dataset_3.dat"))
+        assert object_store.get_data(MockDataset(3)) == "Hello Moved World!"
+        assert object_store.get_filename(MockDataset(3)).startswith(os.path.join(directory.temp_directory, "files1"))
+        assert location_cache.hits == 2
+
+
 def test_concrete_name_without_objectstore_id():
     for config_str in [HIERARCHICAL_TEST_CONFIG, HIERARCHICAL_TEST_CONFIG_YAML]:
         with TestConfig(config_str) as (directory, object_store):
@@ -374,6 +418,17 @@ def test_distributed_store():
             assert len(extra_dirs) == 2
 
 
+def test_distributed_store_weight_by_free_space():
+    with TestConfig(DISTRIBUTED_TEST_CONFIG) as (directory, object_store):
+        object_store.weight_by_free_space = True
+        now = time.time()
+        object_store.backend_usage = {"files1": (100.0, now), "files2": (50.0, now)}
+        for i in range(20):
+            dataset = MockDataset(100 + i)
+            object_store.create(dataset)
+            assert dataset.object_store_id == "files2"
+
+
 # Unit testing the cloud and advanced infrastructure object stores is difficult, but
 # we can at least stub out initializing and test the configuration of these things from
 # XML and dicts.
@@ -468,7 +523,7 @@ def test_config_parse_pithos():
 S3_TEST_CONFIG = """<object_store type="s3">
      <auth access_key="access_moo" secret_key="secret_cow" />
      <bucket name="unique_bucket_name_all_lowercase" use_reduced_redundancy="False" />
-     <cache path="database/object_store_cache" size="1000" />
+     <cache path="database/object_store_cache" size="1000" reconcile_interval="600" />
      <extra_dir type="job_work" path="database/job_working_directory_s3"/>
      <extra_dir type="temp" path="database/tmp_s3"/>
 </object_store>
@@ -488,6 +543,7 @@ bucket:
 cache:
   path: database/object_store_cache
   size: 1000
+  reconcile_interval: 600
 
 extra_dirs:
 - type: job_work
@@ -509,11 +565,13 @@ def test_config_parse_s3():
             assert object_store.host is None
             assert object_store.port == 6000
             assert object_store.multipart is True
+            assert object_store.transfer_threads == 4
             assert object_store.is_secure is True
             assert object_store.conn_path == "/"
 
             assert object_store.cache_size == 1000
             assert object_store.staging_path == "database/object_store_cache"
+            assert object_store.cache_reconcile_interval == 600
             assert object_store.extra_dirs["job_work"] == "database/job_working_directory_s3"
             assert object_store.extra_dirs["temp"] == "database/tmp_s3"
 
@@ -536,10 +594,12 @@ def test_config_parse_s3():
             _assert_key_has_value(connection_dict, "host", None)
             _assert_key_has_value(connection_dict, "port", 6000)
             _assert_key_has_value(connection_dict, "multipart", True)
+            _assert_key_has_value(connection_dict, "transfer_threads", 4)
             _assert_key_has_value(connection_dict, "is_secure", True)
 
             _assert_key_has_value(cache_dict, "size", 1000)
             _assert_key_has_value(cache_dict, "path", "database/object_store_cache")
+            _assert_key_has_value(cache_dict, "reconcile_interval", 600)
 
             extra_dirs = as_dict["extra_dirs"]
             assert len(extra_dirs) == 2
@@ -776,6 +836,148 @@ def test_config_parse_azure():
             assert len(extra_dirs) == 2
 
 
+def test_cache_index():
+    cache_dir = mkdtemp()
+    old_path = os.path.join(cache_dir, "000", "dataset_1.dat")
+    os.makedirs(os.path.dirname(old_path))
+    with open(old_path, "w") as f:
+        f.write("a" * 10)
+    # Existing cache contents are indexed when the index is first created.
+    cache_index = CacheIndex(cache_dir)
+    assert cache_index.total_size() == 10
+
+    new_path = os.path.join(cache_dir, "000", "dataset_2.dat")
+    with open(new_path, "w") as f:
+        f.write("b" * 20)
+    cache_index.record(new_path)
+    cache_index.hit(new_path)
+    cache_index.miss()
+    assert cache_index.total_size() == 30
+
+    assert cache_index.evict(20) == 10
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+    assert cache_index.total_size() == 20
+    assert (cache_index.hits, cache_index.misses, cache_index.evictions) == (1, 1, 1)
+
+    cache_index.remove(os.path.join(cache_dir, "000"))
+    assert cache_index.total_size() == 0
+    cache_index.close()
+
+    # The index persists across restarts.
+    cache_index = CacheIndex(cache_dir)
+    assert cache_index.total_size() == 0
+    cache_index.close()
+
+
+def test_cache_index_reconcile():
+    cache_dir = mkdtemp()
+    cache_index = CacheIndex(cache_dir)
+    indexed_path = os.path.join(cache_dir, "000", "dataset_1.dat")
+    os.makedirs(os.path.dirname(indexed_path))
+    with open(indexed_path, "w") as f:
+        f.write("a" * 10)
+    cache_index.record(indexed_path)
+
+    # Written by another process, without going through the index.
+    unindexed_path = os.path.join(cache_dir, "000", "dataset_2.dat")
+    with open(unindexed_path, "w") as f:
+        f.write("b" * 20)
+    with open(indexed_path, "a") as f:
+        f.write("a" * 5)
+    assert cache_index.total_size() == 10
+    cache_index.reconcile()
+    assert cache_index.total_size() == 35
+
+    os.remove(unindexed_path)
+    cache_index.reconcile()
+    assert cache_index.total_size() == 15
+
+    # Monitors only reconcile if configured to, and only one at a time.
+    with open(unindexed_path, "w") as f:
+        f.write("b" * 20)
+    CacheMonitor(cache_index, 100).clean()
+    assert cache_index.total_size() == 15
+    monitor = CacheMonitor(cache_index, 20, reconcile_interval=600)
+    other_monitor = CacheMonitor(CacheIndex(cache_dir), 20, reconcile_interval=600)
+    assert monitor._acquire_reconcile_lock()
+    with open(os.path.join(cache_dir, "000", "dataset_3.dat"), "w") as f:
+        f.write("c" * 20)
+    other_monitor.clean()
+    assert cache_index.total_size() == 15
+    monitor.clean()
+    assert cache_index.total_size() <= 20 * 0.8
+    other_monitor.shutdown()
+    monitor.shutdown()
+    cache_index.close()
+
+
+def test_cache_index_hits_flushed():
+    cache_dir = mkdtemp()
+    cache_index = CacheIndex(cache_dir)
+    indexed_path = os.path.join(cache_dir, "dataset_1.dat")
+    unindexed_path = os.path.join(cache_dir, "dataset_2.dat")
+    for path in (indexed_path, unindexed_path):
+        with open(path, "w") as f:
+            f.write("a" * 10)
+    cache_index.record(indexed_path)
+    (recorded_access,), = cache_index._fetchall("SELECT last_access FROM cache_entry")
+
+    # Hits are only written to the index when flushed.
+    cache_index.hit(indexed_path)
+    cache_index.hit(unindexed_path)
+    assert cache_index.total_size() == 10
+    cache_index.flush()
+    assert cache_index.total_size() == 20
+    (last_access,), = cache_index._fetchall("SELECT last_access FROM cache_entry WHERE path = 'dataset_1.dat'")
+    assert last_access >= recorded_access
+    assert cache_index.hits == 2
+    cache_index.close()
+
+
+def test_multipart_part_size():
+    s3server = {'max_chunk_size': 250}
+    # S3 requires all parts but the last to be at least 5MiB
+    for mb_size in (10, 10.5, 20, 52, 60):
+        part_size = _part_size(s3server, mb_size)
+        assert part_size >= 5 * 1024 * 1024
+        ranges = _part_ranges(int(mb_size * 1e6), part_size)
+        assert all(size >= 5 * 1024 * 1024 for _, size in ranges[:-1])
+        assert sum(size for _, size in ranges) == int(mb_size * 1e6)
+    assert _part_size(s3server, 1e6) == 250 * 1024 * 1024
+
+
+def test_multipart_download_replaces_destination():
+    directory = mkdtemp()
+    dest_file = os.path.join(directory, "dataset_1.dat")
+    key = Bunch(name="dataset_1.dat", size=12, bucket=Bunch(name="bucket"))
+    s3server = {'max_chunk_size': 250}
+
+    def download_part(s3server, bucket_name, key_name, part_file, offset, size):
+        # the destination is only created once all parts have arrived
+        assert not os.path.exists(dest_file)
+        assert os.path.dirname(part_file) == directory
+        with open(part_file, "r+b") as f:
+            f.seek(offset)
+            f.write(b"x" * size)
+
+    with mock.patch("galaxy.objectstore.s3_multipart_upload.download_part", download_part):
+        multipart_download(s3server, key, dest_file)
+    with open(dest_file, "rb") as f:
+        assert f.read() == b"x" * 12
+    assert os.listdir(directory) == ["dataset_1.dat"]
+
+    os.remove(dest_file)
+
+    def failing_download_part(*args):
+        raise Exception("connection reset")
+
+    with mock.patch("galaxy.objectstore.s3_multipart_upload.download_part", failing_download_part):
+        with pytest.raises(Exception, match="connection reset"):
+            multipart_download(s3server, key, dest_file)
+    assert os.listdir(directory) == []
+
+
 class MockDataset:
 
     def __init__(self, id):
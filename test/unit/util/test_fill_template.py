@@ -1,9 +1,16 @@
 import sys
+from unittest import mock
 
 import pytest
+from Cheetah.Compiler import Compiler
 from Cheetah.NameMapper import NotFound
 
-from galaxy.util.template import fill_template
+from galaxy.util import template
+from galaxy.util.template import (
+    compiled_template_cache,
+    CompiledTemplateCache,
+    fill_template,
+)
 
 SIMPLE_TEMPLATE = """#for item in $a_list:
     echo $item
@@ -86,3 +93,33 @@ def test_fix_template_two_to_three():
 def test_fix_template_invalid_cheetah():
     template_str = fill_template(INVALID_CHEETAH_SYNTAX, python_template_version='2', retry=1)
     assert template_str == "1 is 1\n"
+
+
+def test_compiled_template_cache():
+    cache = CompiledTemplateCache(maxsize=1)
+    klass = cache.get(SIMPLE_TEMPLATE, Compiler)
+    assert cache.get(SIMPLE_TEMPLATE, Compiler) is klass
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Least recently used template is evicted.
+    cache.get(TWO_TO_THREE_TEMPLATE, Compiler)
+    assert cache.get(SIMPLE_TEMPLATE, Compiler) is not klass
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_fill_template_reuses_compiled_template():
+    hits = compiled_template_cache.hits
+    for _ in range(3):
+        assert str(fill_template(SIMPLE_TEMPLATE, {'a_list': [1, 2]})) == FILLED_SIMPLE_TEMPLATE
+    assert compiled_template_cache.hits >= hits + 2
+
+
+def test_fill_template_reuses_fixed_python_2_template():
+    compiled_template_cache.clear()
+    with mock.patch.object(template, "futurize_preprocessor", wraps=template.futurize_preprocessor) as futurize:
+        assert fill_template(TWO_TO_THREE_TEMPLATE, python_template_version='2', retry=1) == 'a a 1'
+        assert futurize.call_count == 1
+        hits, misses = compiled_template_cache.hits, compiled_template_cache.misses
+        assert fill_template(TWO_TO_THREE_TEMPLATE, python_template_version='2', retry=1) == 'a a 1'
+        # the futurized template class is used right away
+        assert futurize.call_count == 1
+        assert (compiled_template_cache.hits, compiled_template_cache.misses) == (hits + 1, misses)
@@ -1,4 +1,5 @@
 import errno
+import os
 import tempfile
 from typing import Dict
 
@@ -73,6 +74,18 @@ def test_parse_xml_enoent():
     assert excinfo.value.errno == errno.ENOENT
 
 
+def test_concatenate_files(tmp_path):
+    contents = [b"", b"first\n", os.urandom(100000), b"last"]
+    source_paths = []
+    for i, content in enumerate(contents):
+        source_path = tmp_path / f"part_{i}"
+        source_path.write_bytes(content)
+        source_paths.append(str(source_path))
+    destination_path = tmp_path / "merged"
+    util.concatenate_files(source_paths, str(destination_path))
+    assert destination_path.read_bytes() == b"".join(contents)
+
+
 def test_clean_multiline_string():
     x = util.clean_multiline_string("""
         a